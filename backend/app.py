@@ -1,31 +1,40 @@
+import hmac
 import os
+import uuid
 from datetime import datetime
-from flask import Flask, request, render_template, redirect, url_for, send_file, session
+from flask import Flask, request, render_template, redirect, url_for, send_file, session, jsonify, Response, g
 from werkzeug.utils import secure_filename
 from product_system.processor import DocumentProcessor  # Impor DocumentProcessor untuk dokumen tunggal
 from product_system.multi_processor import MultiDocumentProcessor, process_multiple_files  # Impor untuk dokumen multi
+from product_system.extraction_cache import get_extraction_cache
+from product_system import metrics, profiling, tracing
+from product_system.jobs import get_job_queue, start_job_workers, DONE, FAILED
+from product_system.outputs import save_json_output, delete_json_output, iter_json_chunks, expand_json, prune_outlet_artifacts
+from product_system.output_index import get_output_index, parsed_fields, LIST_LIMIT
+from product_system.upload_history import get_upload_history
+from utils.config import SAVE_DEBUG_CSV, JOB_WORKERS, UPLOAD_FOLDER, CSV_FOLDER, JSON_FOLDER, LOG_REQUEST_DEBUG, PROFILE_ADMIN_TOKEN, TRACE_ENABLED, TRACE_REQUEST_HEADER, OUTLET_ARTIFACTS
+from utils.log import configure_logging, get_logger, debug_enabled, DEBUG_LOGGING
 import json
 
+configure_logging()
+logger = get_logger(__name__)
+
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'  # Diperlukan untuk menggunakan session
 
-# Konfigurasi folder (gunakan path absolut)
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Direktori backend/
-UPLOAD_FOLDER = os.path.join(BASE_DIR, 'database', 'product_system', 'uploads')
-CSV_FOLDER = os.path.join(BASE_DIR, 'database', 'product_system', 'csv_outputs')
-JSON_FOLDER = os.path.join(BASE_DIR, 'database', 'product_system', 'json_outputs')
+# Konfigurasi folder (path absolut, didefinisikan di utils/config.py)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['CSV_FOLDER'] = CSV_FOLDER
 app.config['JSON_FOLDER'] = JSON_FOLDER
 
 
 for folder in [UPLOAD_FOLDER, CSV_FOLDER, JSON_FOLDER]:
-    print(f"Checking if folder exists: {folder}")
+    logger.debug("Checking if folder exists: %s", folder)
     if not os.path.exists(folder):
-        print(f"Folder does not exist, creating: {folder}")
+        logger.debug("Folder does not exist, creating: %s", folder)
         os.makedirs(folder, exist_ok=True)
     else:
-        print(f"Folder already exists: {folder}")
+        logger.debug("Folder already exists: %s", folder)
 
     # xxx
     try:
@@ -33,89 +42,166 @@ for folder in [UPLOAD_FOLDER, CSV_FOLDER, JSON_FOLDER]:
         with open(test_file, 'w') as f:
             f.write("Test write permission")
         os.remove(test_file)
-        print(f"Write permission confirmed for folder: {folder}")
+        logger.debug("Write permission confirmed for folder: %s", folder)
     except Exception as e:
-        print(f"Error: No write permission for folder {folder}: {str(e)}")
+        logger.error("No write permission for folder %s: %s", folder, e)
         raise Exception(f"Cannot proceed due to lack of write permission in {folder}")
 
+# Saat dijalankan dengan python app.py, proses forkserver pool mengimpor ulang modul ini sebagai
+# __mp_main__; sync index dan worker job hanya untuk proses aplikasi
+if __name__ != '__mp_main__':
+    # Index output disamakan dengan isi JSON_FOLDER sekali saat start, setelah itu dijaga oleh save/delete
+    try:
+        get_output_index().sync(JSON_FOLDER)
+        prune_outlet_artifacts()
+    except Exception as e:
+        logger.error("Error syncing output index: %s", e)
+
+    # Worker job async berjalan sebagai thread di setiap proses gunicorn
+    start_job_workers(JOB_WORKERS)
+
+TRACED_ENDPOINTS = {'upload_single_file', 'upload_multiple_files'}
+
+@app.before_request
+def enable_request_flags():
+    # Log DEBUG hanya untuk request ini (dan job yang dibuatnya), level global tidak berubah
+    if LOG_REQUEST_DEBUG and (request.values.get('debug') == '1' or request.headers.get('X-Debug-Log') == '1'):
+        g.debug_log_token = DEBUG_LOGGING.set(True)
+    # Profil cProfile untuk pemrosesan di request ini (dan job yang dibuatnya), hanya dengan token admin
+    if PROFILE_ADMIN_TOKEN and hmac.compare_digest(request.headers.get('X-Profile', ''), PROFILE_ADMIN_TOKEN):
+        g.profile_token = profiling.PROFILE_REQUESTED.set(True)
+    # Trace span hanya untuk upload; request ringan (index, download, /metrics) tidak membuat file trace
+    if request.endpoint in TRACED_ENDPOINTS and (TRACE_ENABLED or (TRACE_REQUEST_HEADER and request.headers.get('X-Trace') == '1')):
+        g.trace, g.trace_token = tracing.begin(request.endpoint, root_name=f"{request.method} {request.path}")
+
+@app.teardown_request
+def reset_request_flags(exc):
+    token = g.pop('debug_log_token', None)
+    if token is not None:
+        DEBUG_LOGGING.reset(token)
+    token = g.pop('profile_token', None)
+    if token is not None:
+        profiling.PROFILE_REQUESTED.reset(token)
+    token = g.pop('trace_token', None)
+    if token is not None:
+        tracing.end(g.pop('trace'), token)
+
+@app.after_request
+def flush_metrics(response):
+    # Metrik request ini langsung dijumlahkan ke store bersama agar /metrics di worker lain ikut melihatnya
+    metrics.flush()
+    return response
+
 ALLOWED_EXTENSIONS = {'pdf'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def upload_history_id():
+    # Cookie session hanya menyimpan id kecil ini, riwayat upload ada di server
+    if 'history_id' not in session:
+        session['history_id'] = uuid.uuid4().hex
+    return session['history_id']
+
+def remember_uploads(nomors, upload_time):
+    # Jika nomor sudah ada, hanya waktu upload yang diperbarui
+    get_upload_history().remember(upload_history_id(), [(nomor, upload_time) for nomor in nomors])
+
+def enqueue_upload(kind, file_list):
+    job_id = get_job_queue().enqueue(
+        kind, file_list, debug=debug_enabled(), profile=bool(profiling.PROFILE_REQUESTED.get()), trace_id=tracing.hand_off()
+    )
+    pending_jobs = session.get('pending_jobs', [])
+    pending_jobs.append(job_id)
+    session['pending_jobs'] = pending_jobs
+    logger.info("Queued %s job %s for %s", kind, job_id, [f['filename'] for f in file_list])
+    return job_id
+
 @app.route('/')
 def index():
     error = request.args.get('error')
     success = request.args.get('success')
-    print(f"Rendering index with error: {error}, success: {success}")  # Debugging
-
-    # Ambil daftar nomor dokumen dan waktu upload dari session
-    uploaded_files = session.get('uploaded_files', [])
-    print(f"Uploaded files from session: {uploaded_files}")  # Debugging
-
-    # Konversi data lama (jika ada) dari list string ke list dictionary
-    converted_files = []
-    for item in uploaded_files:
-        if isinstance(item, str):
-            # Jika item adalah string (data lama), konversi ke dictionary
-            converted_files.append({
-                'nomor': item,
-                'upload_time': 'Unknown'  # Waktu tidak diketahui untuk data lama
-            })
-        elif isinstance(item, dict) and 'nomor' in item and 'upload_time' in item:
-            # Jika item sudah dalam format dictionary yang benar, gunakan langsung
-            converted_files.append(item)
-        else:
-            # Abaikan item yang tidak sesuai format
-            print(f"Skipping invalid session item: {item}")
-            continue
+    logger.debug("Rendering index with error: %s, success: %s", error, success)
+
+    # Riwayat lama di cookie session dipindahkan sekali ke riwayat server
+    legacy_files = session.pop('uploaded_files', None)
+    if legacy_files:
+        converted_files = []
+        for item in legacy_files:
+            if isinstance(item, str):
+                # Jika item adalah string (data lama), waktu upload tidak diketahui
+                converted_files.append((item, 'Unknown'))
+            elif isinstance(item, dict) and 'nomor' in item and 'upload_time' in item:
+                converted_files.append((item['nomor'], item['upload_time']))
+            else:
+                # Abaikan item yang tidak sesuai format
+                logger.warning("Skipping invalid session item: %s", item)
+        get_upload_history().remember(upload_history_id(), converted_files)
+        logger.info("Moved %s uploaded files from session to server history", len(converted_files))
+
+    # Job async yang sudah selesai dipindahkan ke daftar file, yang gagal ditampilkan sebagai error
+    pending_jobs = []
+    if session.get('pending_jobs'):
+        queue = get_job_queue()
+        for job_id in session['pending_jobs']:
+            job = queue.get(job_id)
+            if job is None:
+                continue
+            if job['status'] == DONE:
+                upload_time = datetime.fromtimestamp(job['finished_at']).strftime("%Y-%m-%d %H:%M:%S")
+                remember_uploads(job['nomors'], upload_time)
+            elif job['status'] == FAILED:
+                error = f"Terjadi kesalahan: {job['error']}"
+            else:
+                pending_jobs.append(job)
+        session['pending_jobs'] = [job['id'] for job in pending_jobs]
 
-    # Simpan kembali data yang telah dikonversi ke session
-    session['uploaded_files'] = converted_files
-    print(f"Converted uploaded files: {converted_files}")  # Debugging
+    # Ambil daftar nomor dokumen dan waktu upload dari riwayat server
+    uploaded_files = get_upload_history().entries(upload_history_id())
+    logger.debug("Uploaded files from history: %s", uploaded_files)
 
-    # Siapkan daftar file JSON yang akan ditampilkan
+    # Siapkan daftar file JSON yang akan ditampilkan dari index ringkasan;
+    # isi JSON lengkap hanya dibaca saat diunduh
     json_files = []
-    for file_info in converted_files:
+    try:
+        summaries = get_output_index().summaries([file_info['nomor'] for file_info in uploaded_files], app.config['JSON_FOLDER'])
+    except Exception as e:
+        logger.error("Error reading output index: %s", e)
+        error = f"Gagal membaca JSON: {str(e)}"
+        summaries = {}
+    for file_info in uploaded_files:
         nomor = file_info['nomor']
-        upload_time = file_info['upload_time']
-        json_path = os.path.join(app.config['JSON_FOLDER'], f"{nomor}.json")
-        if os.path.exists(json_path):
-            try:
-                with open(json_path, 'r', encoding='utf-8') as json_file:
-                    json_data = json.load(json_file)
-                json_files.append({
-                    'nomor': nomor,
-                    'json_data': json_data,
-                    'upload_time': upload_time
-                })
-            except Exception as e:
-                print(f"Error reading JSON file {json_path}: {str(e)}")
-                error = f"Gagal membaca JSON: {str(e)}"
+        if nomor in summaries:
+            json_files.append({
+                'nomor': nomor,
+                'summary': summaries[nomor],
+                'upload_time': file_info['upload_time']
+            })
 
-    return render_template('upload.html', error=error, success=success, json_files=json_files)
+    return render_template('upload.html', error=error, success=success, json_files=json_files, pending_jobs=pending_jobs)
 
 @app.route('/upload-single', methods=['POST'])
 def upload_single_file():
-    print("Route /upload-single called")  # Debugging
+    logger.debug("Route /upload-single called")
     if 'file' not in request.files:
-        print("No file part in request")  # Debugging
+        logger.debug("No file part in request")
         return redirect(url_for('index', error="Harap pilih satu file PDF."))
     
     file = request.files['file']
-    print("File received:", file.filename)  # Debugging
+    logger.debug("File received: %s", file.filename)
     
     if file.filename == '':
-        print("No file selected")  # Debugging
+        logger.debug("No file selected")
         return redirect(url_for('index', error="Harap pilih satu file PDF."))
     
     if not file or not allowed_file(file.filename):
-        print("File not allowed:", file.filename)  # Debugging
+        logger.debug("File not allowed: %s", file.filename)
         return redirect(url_for('index', error="File harus berupa PDF."))
 
     pdf_path = None
     csv_path = None
     json_path = None
+    queued = False
     try:
         # Simpan file PDF
         filename = secure_filename(file.filename)
@@ -124,97 +210,96 @@ def upload_single_file():
         csv_filename = f"{timestamp}_{filename.rsplit('.', 1)[0]}.csv"
         csv_path = os.path.join(app.config['CSV_FOLDER'], csv_filename)
 
-        print("Saving file to:", pdf_path)  # Debugging
-        file.save(pdf_path)
+        logger.debug("Saving file to: %s", pdf_path)
+        with metrics.timed("save_pdf"), tracing.span("save_pdf", filename=filename):
+            file.save(pdf_path)
+
+        if JOB_WORKERS:
+            # Proses di background, PDF dihapus oleh worker setelah selesai
+            job_id = enqueue_upload("single", [{"pdf_path": pdf_path, "csv_path": csv_path, "filename": filename}])
+            queued = True
+            return redirect(url_for('index', success=f"File diterima dan sedang diproses (job {job_id})."))
 
         # Proses file menggunakan DocumentProcessor
-        print("Processing file with DocumentProcessor")  # Debugging
+        logger.debug("Processing file with DocumentProcessor")
         processor = DocumentProcessor()
-        print(f"Processor class used: {processor.__class__.__name__}")  # Debugging
+        logger.debug("Processor class used: %s", processor.__class__.__name__)
         json_data = processor.process(pdf_path, csv_path)
 
         # Validasi json_data
-        print("json_data:", json_data)  # Debugging
+        logger.debug("json_data: %s", json_data)
         if not json_data:
-            print("Error: json_data is empty or None")  # Debugging
+            logger.error("json_data is empty or None")
             return redirect(url_for('index', error="Gagal memproses file: Data JSON kosong."))
 
         # Gunakan nomor dokumen sebagai nama file JSON
         nomor = json_data.get('list_break')[0].get('name').split()[0]  # Ambil nomor dari JSON
         if not nomor:
-            print("Error: Nomor dokumen tidak ditemukan di data")  # Debugging
+            logger.error("Nomor dokumen tidak ditemukan di data")
             return redirect(url_for('index', error="Gagal memproses file: Nomor dokumen tidak ditemukan."))
         
         json_filename = f"{nomor}.json"
         json_path = os.path.join(app.config['JSON_FOLDER'], json_filename)
 
         # Simpan JSON
-        print("Saving JSON to:", json_path)  # Debugging
+        logger.debug("Saving JSON to: %s", json_path)
         try:
-            with open(json_path, 'w', encoding='utf-8') as json_file:
-                json.dump(json_data, json_file, indent=4)
-            print("JSON successfully saved to:", json_path)  # Debugging
+            save_json_output(json_data, nomor, parsed_fields(processor.data))
+            logger.debug("JSON successfully saved to: %s", json_path)
             # Verifikasi bahwa file benar-benar ada
             if os.path.exists(json_path):
-                print(f"Verified: JSON file exists at {json_path}")
+                logger.debug("Verified: JSON file exists at %s", json_path)
             else:
-                print(f"Error: JSON file does not exist at {json_path} after saving")
+                logger.error("JSON file does not exist at %s after saving", json_path)
                 return redirect(url_for('index', error="Gagal menyimpan JSON: File tidak ditemukan setelah disimpan."))
         except Exception as e:
-            print("Error saving JSON:", str(e))  # Debugging
+            logger.error("Error saving JSON: %s", e)
             return redirect(url_for('index', error=f"Gagal menyimpan JSON: {str(e)}"))
 
         # Verifikasi ulang setelah semua proses selesai
         if os.path.exists(json_path):
-            print(f"Final verification: JSON file still exists at {json_path}")
+            logger.debug("Final verification: JSON file still exists at %s", json_path)
         else:
-            print(f"Final verification failed: JSON file no longer exists at {json_path}")
+            logger.error("Final verification failed: JSON file no longer exists at %s", json_path)
             return redirect(url_for('index', error="Gagal menyimpan JSON: File hilang setelah disimpan."))
 
-        # Tambahkan nomor dokumen dan waktu upload ke session
+        # Tambahkan nomor dokumen dan waktu upload ke riwayat
         upload_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        uploaded_files = session.get('uploaded_files', [])
-        # Periksa apakah nomor sudah ada, jika ya, update waktu upload
-        for file_info in uploaded_files:
-            if isinstance(file_info, dict) and file_info.get('nomor') == nomor:
-                file_info['upload_time'] = upload_time
-                break
-        else:
-            uploaded_files.append({'nomor': nomor, 'upload_time': upload_time})
-        session['uploaded_files'] = uploaded_files
-        print(f"Updated session uploaded_files: {uploaded_files}")  # Debugging
+        remember_uploads([nomor], upload_time)
+        logger.info("Updated upload history: %s", nomor)
 
         return redirect(url_for('index', success="Berhasil mengunggah dan memproses file."))
 
     except Exception as e:
-        print("Error during processing:", str(e))  # Debugging
+        logger.error("Error during processing: %s", e)
         return redirect(url_for('index', error=f"Terjadi kesalahan: {str(e)}"))
 
     finally:
-        # Hapus file sementara
-        if pdf_path and os.path.exists(pdf_path):
-            print("Removing temporary PDF file:", pdf_path)  # Debugging
-            os.remove(pdf_path)
-        if csv_path and os.path.exists(csv_path):
-            print("Removing temporary CSV file:", csv_path)  # Debugging
-            os.remove(csv_path)
+        # Hapus file sementara, kecuali sudah diserahkan ke worker job
+        if not queued:
+            if pdf_path and os.path.exists(pdf_path):
+                logger.debug("Removing temporary PDF file: %s", pdf_path)
+                os.remove(pdf_path)
+            if csv_path and not SAVE_DEBUG_CSV and os.path.exists(csv_path):
+                logger.debug("Removing temporary CSV file: %s", csv_path)
+                os.remove(csv_path)
 
 @app.route('/upload-multiple', methods=['POST'])
 def upload_multiple_files():
-    print("Route /upload-multiple called")  # Debugging
+    logger.debug("Route /upload-multiple called")
     if 'files[]' not in request.files:
-        print("No files part in request")  # Debugging
+        logger.debug("No files part in request")
         return redirect(url_for('index', error="Harap pilih setidaknya satu file PDF."))
 
     files = request.files.getlist('files[]')
-    print("Files received:", [file.filename for file in files])  # Debugging
+    logger.debug("Files received: %s", [file.filename for file in files])
     if not files or all(file.filename == '' for file in files):
-        print("No files selected")  # Debugging
+        logger.debug("No files selected")
         return redirect(url_for('index', error="Harap pilih setidaknya satu file PDF."))
 
     # Pastikan setidaknya satu file diunggah
     if len(files) < 1:
-        print("No valid files uploaded")  # Debugging
+        logger.debug("No valid files uploaded")
         return redirect(url_for('index', error="Harap unggah setidaknya satu file PDF."))
 
     valid_files = []
@@ -222,14 +307,15 @@ def upload_multiple_files():
         if file and allowed_file(file.filename):
             valid_files.append(file)
         else:
-            print("File not allowed:", file.filename)  # Debugging
+            logger.debug("File not allowed: %s", file.filename)
             return redirect(url_for('index', error="Semua file harus berupa PDF."))
     
     if len(valid_files) < 1:
-        print("No valid files after filtering:", len(valid_files))  # Debugging
+        logger.debug("No valid files after filtering: %s", len(valid_files))
         return redirect(url_for('index', error="Harap unggah setidaknya satu file PDF yang valid."))
 
     file_list = []
+    queued = False
     try:
         # Simpan file PDF sementara dan siapkan untuk pemrosesan
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -239,118 +325,187 @@ def upload_multiple_files():
             csv_filename = f"{timestamp}_{idx}_{filename.rsplit('.', 1)[0]}.csv"
             csv_path = os.path.join(app.config['CSV_FOLDER'], csv_filename)
 
-            print("Saving file to:", pdf_path)  # Debugging
-            file.save(pdf_path)
+            logger.debug("Saving file to: %s", pdf_path)
+            with metrics.timed("save_pdf"), tracing.span("save_pdf", filename=filename):
+                file.save(pdf_path)
             file_list.append({
                 "pdf_path": pdf_path,
                 "csv_path": csv_path,
                 "filename": filename
             })
 
+        if JOB_WORKERS:
+            # Proses di background, PDF dihapus oleh worker setelah selesai
+            job_id = enqueue_upload("multiple", file_list)
+            queued = True
+            return redirect(url_for('index', success=f"{len(valid_files)} file diterima dan sedang diproses (job {job_id})."))
+
         # Proses multiple files menggunakan multi_processor.py
-        print("Processing files with multi_processor.py")  # Debugging
+        logger.debug("Processing files with multi_processor.py")
         json_outputs = process_multiple_files(file_list)
 
         # Validasi json_outputs
-        print("json_outputs:", json_outputs)  # Debugging
+        logger.debug("json_outputs: %s", json_outputs)
         if not json_outputs:
-            print("Error: json_outputs is empty or None")  # Debugging
+            logger.error("json_outputs is empty or None")
             return redirect(url_for('index', error="Gagal memproses file: Data JSON kosong."))
 
         # Simpan JSON dengan nama berdasarkan nomor dokumen
         upload_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        uploaded_files = session.get('uploaded_files', [])
-        for json_data, nomor in json_outputs:
+        for json_data, nomor, fields in json_outputs:
             json_filename = f"{nomor}.json"
             json_path = os.path.join(app.config['JSON_FOLDER'], json_filename)
 
-            print("Saving JSON to:", json_path)  # Debugging
+            logger.debug("Saving JSON to: %s", json_path)
             try:
-                with open(json_path, 'w', encoding='utf-8') as json_file:
-                    json.dump(json_data, json_file, indent=4)
-                print("JSON successfully saved to:", json_path)  # Debugging
+                save_json_output(json_data, nomor, fields)
+                logger.debug("JSON successfully saved to: %s", json_path)
                 # Verifikasi bahwa file benar-benar ada
                 if os.path.exists(json_path):
-                    print(f"Verified: JSON file exists at {json_path}")
+                    logger.debug("Verified: JSON file exists at %s", json_path)
                 else:
-                    print(f"Error: JSON file does not exist at {json_path} after saving")
+                    logger.error("JSON file does not exist at %s after saving", json_path)
                     return redirect(url_for('index', error="Gagal menyimpan JSON: File tidak ditemukan setelah disimpan."))
             except Exception as e:
-                print("Error saving JSON:", str(e))  # Debugging
+                logger.error("Error saving JSON: %s", e)
                 return redirect(url_for('index', error=f"Gagal menyimpan JSON: {str(e)}"))
 
-            # Tambahkan nomor dokumen dan waktu upload ke session
-            for file_info in uploaded_files:
-                if isinstance(file_info, dict) and file_info.get('nomor') == nomor:
-                    file_info['upload_time'] = upload_time
-                    break
-            else:
-                uploaded_files.append({'nomor': nomor, 'upload_time': upload_time})
-
         # Verifikasi ulang setelah semua proses selesai
-        for json_data, nomor in json_outputs:
+        for json_data, nomor, fields in json_outputs:
             json_filename = f"{nomor}.json"
             json_path = os.path.join(app.config['JSON_FOLDER'], json_filename)
             if os.path.exists(json_path):
-                print(f"Final verification: JSON file still exists at {json_path}")
+                logger.debug("Final verification: JSON file still exists at %s", json_path)
             else:
-                print(f"Final verification failed: JSON file no longer exists at {json_path}")
+                logger.error("Final verification failed: JSON file no longer exists at %s", json_path)
                 return redirect(url_for('index', error="Gagal menyimpan JSON: File hilang setelah disimpan."))
 
-        session['uploaded_files'] = uploaded_files
-        print(f"Updated session uploaded_files: {uploaded_files}")  # Debugging
+        nomors = [nomor for json_data, nomor, fields in json_outputs]
+        remember_uploads(nomors, upload_time)
+        logger.info("Updated upload history: %s", nomors)
 
         return redirect(url_for('index', success=f"Berhasil mengunggah dan memproses {len(valid_files)} file."))
 
     except Exception as e:
-        print("Error during processing:", str(e))  # Debugging
+        logger.error("Error during processing: %s", e)
         return redirect(url_for('index', error=f"Terjadi kesalahan: {str(e)}"))
 
     finally:
-        # Hapus file sementara
-        for file_info in file_list:
-            pdf_path = file_info['pdf_path']
-            csv_path = file_info['csv_path']
-            if os.path.exists(pdf_path):
-                print("Removing temporary PDF file:", pdf_path)  # Debugging
-                os.remove(pdf_path)
-            if os.path.exists(csv_path):
-                print("Removing temporary CSV file:", csv_path)  # Debugging
-                os.remove(csv_path)
+        # Hapus file sementara, kecuali sudah diserahkan ke worker job
+        if not queued:
+            for file_info in file_list:
+                pdf_path = file_info['pdf_path']
+                csv_path = file_info['csv_path']
+                if os.path.exists(pdf_path):
+                    logger.debug("Removing temporary PDF file: %s", pdf_path)
+                    os.remove(pdf_path)
+                if not SAVE_DEBUG_CSV and os.path.exists(csv_path):
+                    logger.debug("Removing temporary CSV file: %s", csv_path)
+                    os.remove(csv_path)
+
+def shared_outlet_ref(nomor):
+    # summaries() mengindeks ulang file yang berubah sejak terakhir diindeks, jadi outlet_ref selalu sesuai isi file
+    summary = get_output_index().summaries([nomor], app.config['JSON_FOLDER']).get(nomor)
+    return summary["outlet_ref"] if summary else None
 
 @app.route('/download/<filename>')
 def download_json(filename):
-    print(f"Route /download/{filename} called")  # Debugging
+    logger.debug("Route /download/%s called", filename)
     json_path = os.path.join(app.config['JSON_FOLDER'], f"{filename}.json")
-    print(f"Looking for JSON file at: {json_path}")  # Debugging
+    logger.debug("Looking for JSON file at: %s", json_path)
     if os.path.exists(json_path):
-        print(f"JSON file found, sending: {json_path}")  # Debugging
+        # JSON dengan daftar outlet bersama dikirim dalam format lama (list_customer lengkap),
+        # kecuali diminta apa adanya lewat ?shared=1. Rujukan dicek dari index, bukan dengan membaca
+        # file; JSON hanya dibaca utuh jika memang perlu diperluas.
+        if OUTLET_ARTIFACTS and request.args.get('shared') != '1' and shared_outlet_ref(filename):
+            logger.debug("Expanding shared outlet list for: %s", json_path)
+            with open(json_path, 'r', encoding='utf-8') as json_file:
+                json_data = json.load(json_file)
+            return Response(
+                iter_json_chunks(expand_json(json_data)),
+                mimetype='application/json',
+                headers={'Content-Disposition': f'attachment; filename={filename}.json'}
+            )
+        logger.debug("JSON file found, sending: %s", json_path)
         return send_file(json_path, as_attachment=True, download_name=f"{filename}.json")
     else:
-        print(f"JSON file not found: {json_path}")  # Debugging
+        logger.debug("JSON file not found: %s", json_path)
         return redirect(url_for('index', error="File JSON tidak ditemukan."))
 
 @app.route('/delete/<filename>', methods=['POST'])
 def delete_json(filename):
-    print(f"Route /delete/{filename} called")  # Debugging
+    logger.debug("Route /delete/%s called", filename)
     json_path = os.path.join(app.config['JSON_FOLDER'], f"{filename}.json")
-    print(f"Looking for JSON file to delete at: {json_path}")  # Debugging
+    logger.debug("Looking for JSON file to delete at: %s", json_path)
     if os.path.exists(json_path):
         try:
-            os.remove(json_path)
-            print(f"JSON file deleted: {json_path}")  # Debugging
-            # Hapus nomor dari session
-            uploaded_files = session.get('uploaded_files', [])
-            uploaded_files = [file_info for file_info in uploaded_files if file_info.get('nomor') != filename]
-            session['uploaded_files'] = uploaded_files
-            print(f"Updated session uploaded_files after deletion: {uploaded_files}")  # Debugging
+            delete_json_output(filename)
+            logger.debug("JSON file deleted: %s", json_path)
+            # Hapus nomor dari riwayat upload
+            get_upload_history().forget(upload_history_id(), filename)
+            logger.debug("Removed %s from upload history", filename)
             return redirect(url_for('index', success=f"Berhasil menghapus file {filename}.json"))
         except Exception as e:
-            print(f"Error deleting JSON file: {str(e)}")  # Debugging
+            logger.error("Error deleting JSON file: %s", e)
             return redirect(url_for('index', error=f"Gagal menghapus file: {str(e)}"))
     else:
-        print(f"JSON file not found for deletion: {json_path}")  # Debugging
+        logger.debug("JSON file not found for deletion: %s", json_path)
         return redirect(url_for('index', error="File JSON tidak ditemukan."))
 
+@app.route('/cache/stats')
+def cache_stats():
+    cache = get_extraction_cache()
+    if cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **cache.stats()})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Total semua worker gunicorn dan proses pool, format teks Prometheus
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job tidak ditemukan."}), 404
+    return jsonify({
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "files": [file_info["filename"] for file_info in job["files"]],
+        "nomors": job["nomors"],
+        "error": job["error"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"]
+    })
+
+@app.route('/api/outputs')
+def list_outputs():
+    # Daftar output dari index SQLite, tanpa membaca file JSON per baris
+    valid_from = request.args.get('valid_from')
+    valid_to = request.args.get('valid_to')
+    for value in (valid_from, valid_to):
+        if value and not (len(value) == 8 and value.isdigit()):
+            return jsonify({"error": "Format tanggal harus YYYYMMDD."}), 400
+    try:
+        limit = int(request.args.get('limit', LIST_LIMIT))
+        items, next_cursor = get_output_index().search(
+            brand=request.args.get('brand'),
+            area=request.args.get('area'),
+            sub_promo_type=request.args.get('sub_promo_type'),
+            valid_from=valid_from,
+            valid_to=valid_to,
+            cursor=request.args.get('cursor'),
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Parameter tidak valid: {str(e)}"}), 400
+    for item in items:
+        item["download_url"] = url_for('download_json', filename=item["nomor"])
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)  # Bukan hanya app.run()
@@ -0,0 +1,376 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# python -m benchmarks.run [--save-baseline base.json] [--compare base.json] (dari folder backend)
+# Setiap kasus dijalankan di proses Python baru agar peak RSS tidak tercampur antar kasus.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_FOLDER = os.path.join(BACKEND_DIR, 'database', 'product_system', 'uploads')
+
+# Default benchmark: ekstraksi selalu dingin (tanpa cache) dan tidak menulis metrics.db/profil produksi.
+# Nilai dari environment tetap dipakai, jadi variasi konfigurasi bisa dibandingkan dengan baseline.
+BENCH_ENV = {
+    "EXTRACTION_CACHE_ENABLED": "0",
+    "METRICS_ENABLED": "0",
+    "PROFILE_ENABLED": "0",
+}
+
+# Konfigurasi yang mempengaruhi hasil, dicatat di laporan agar baseline yang berbeda setelan terlihat
+CONFIG_KEYS = (
+    "EXTRACTION_CACHE_ENABLED", "PDF_SINGLE_PASS", "PDF_EXTRACT_WORKERS", "PDF_PARALLEL_MIN_PAGES",
+    "PDF_EXCLUDE_TABLE_ROWS", "PDF_TEXT_FIRST", "PDF_STREAMING", "BATCH_WORKERS", "BATCH_MODE",
+    "BATCH_HEADER_SCAN", "OUTLET_ARTIFACTS", "METRICS_ENABLED", "LOG_LEVEL",
+)
+
+# Metrik yang dibandingkan dengan baseline: nama -> True jika nilai lebih besar berarti lebih baik
+COMPARED = {
+    "p50_ms": False,
+    "docs_per_sec": True,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(values, pct):
+    # Interpolasi linear antar sampel terurut
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def rss_mb(who):
+    # ru_maxrss dalam KB di Linux, byte di macOS
+    maxrss = resource.getrusage(who).ru_maxrss
+    return maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class DescendantMemory:
+    # Proses pool dibuat lewat forkserver, jadi bukan anak langsung proses ini dan tidak masuk
+    # RUSAGE_CHILDREN. VmHWM semua proses turunan dibaca berkala dari /proc (Linux).
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak_kb = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def __enter__(self):
+        if os.path.isdir("/proc"):
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        return False
+
+    def _run(self):
+        while True:
+            self.sample()
+            if self.stopped.wait(self.interval):
+                return
+
+    def sample(self):
+        parents = {}
+        for entry in os.scandir("/proc"):
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry.name}/stat", 'r') as f:
+                    # Field setelah nama proses (dalam kurung): state, ppid
+                    parents[int(entry.name)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+        descendants = {os.getpid()}
+        changed = True
+        while changed:
+            found = {pid for pid, ppid in parents.items() if ppid in descendants and pid not in descendants}
+            descendants |= found
+            changed = bool(found)
+        descendants.discard(os.getpid())
+        for pid in descendants:
+            try:
+                with open(f"/proc/{pid}/status", 'r') as f:
+                    for line in f:
+                        if line.startswith("VmHWM:"):
+                            self.peak_kb = max(self.peak_kb, int(line.split()[1]))
+                            break
+            except (OSError, ValueError):
+                continue
+
+
+def stage_totals(events):
+    # Total durasi span per nama untuk satu iterasi. Span dari pool dijumlahkan, jadi tahap yang
+    # berjalan paralel bisa lebih besar dari latency; span juga bertingkat (process_document > extract_page).
+    totals = {}
+    for event in events:
+        if event["ph"] == "X":
+            totals[event["name"]] = totals.get(event["name"], 0) + event["dur"] / 1e6
+    return totals
+
+
+def build_cases(args, work_dir):
+    from benchmarks import synthetic
+
+    cases = []
+    if not args.no_samples:
+        for pdf in sorted(glob.glob(os.path.join(args.samples, "*.pdf"))):
+            cases.append({"name": f"single:{os.path.basename(pdf)}", "kind": "single", "pdfs": [pdf]})
+
+    for outlets in args.scales:
+        pdf = synthetic.write_document(os.path.join(work_dir, f"synthetic-{outlets}.pdf"), 1, outlets)
+        cases.append({"name": f"single:synthetic-{outlets}", "kind": "single", "pdfs": [pdf]})
+
+    if args.batch_size > 1:
+        # Nomor CP berbeda per dokumen, sesuai validasi batch
+        pdfs = [
+            synthetic.write_document(os.path.join(work_dir, f"batch-{seq}.pdf"), seq, args.batch_outlets)
+            for seq in range(1, args.batch_size + 1)
+        ]
+        cases.append({"name": f"batch:synthetic-{args.batch_outlets}x{args.batch_size}", "kind": "batch", "pdfs": pdfs})
+
+    if args.only:
+        cases = [case for case in cases if any(text in case["name"] for text in args.only)]
+    return cases
+
+
+def run_case(case, repeat, warmup, stages):
+    from product_system import profiling, tracing
+    from product_system.extraction import count_pages
+    from product_system.multi_processor import process_multiple_files
+    from product_system.processor import DocumentProcessor
+
+    pages = sum(count_pages(pdf) for pdf in case["pdfs"])
+    latencies = []
+    stage_runs = []
+    with DescendantMemory() as descendants:
+        for iteration in range(warmup + repeat):
+            # process_multiple_files menghapus PDF input, jadi setiap iterasi memproses salinan baru
+            work_dir = tempfile.mkdtemp(prefix="bench_")
+            try:
+                paths = []
+                for idx, pdf in enumerate(case["pdfs"]):
+                    pdf_path = os.path.join(work_dir, f"{idx}_{os.path.basename(pdf)}")
+                    shutil.copy(pdf, pdf_path)
+                    paths.append(pdf_path)
+
+                trace, token = tracing.begin("bench") if stages else (None, None)
+                start = time.perf_counter()
+                try:
+                    with profiling.request_profile(False):
+                        if case["kind"] == "single":
+                            DocumentProcessor().process(paths[0])
+                        else:
+                            process_multiple_files([
+                                {"pdf_path": pdf_path, "csv_path": None, "filename": os.path.basename(pdf_path)}
+                                for pdf_path in paths
+                            ])
+                finally:
+                    elapsed = time.perf_counter() - start
+                    events = []
+                    if trace is not None:
+                        tracing.CURRENT_TRACE.reset(token)
+                        events = trace.collect_events()
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+            if iteration >= warmup:
+                latencies.append(elapsed)
+                stage_runs.append(stage_totals(events))
+
+    total = sum(latencies)
+    documents = len(case["pdfs"])
+    stage_names = sorted({name for run in stage_runs for name in run})
+    return {
+        "kind": case["kind"],
+        "documents": documents,
+        "pages": pages,
+        "repeat": repeat,
+        "latencies_ms": [round(latency * 1000, 3) for latency in latencies],
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "mean_ms": round(total / len(latencies) * 1000, 3),
+        "docs_per_sec": round(documents * len(latencies) / total, 3),
+        "pages_per_sec": round(pages * len(latencies) / total, 3),
+        "peak_rss_mb": round(rss_mb(resource.RUSAGE_SELF), 1),
+        # Proses pool: terbesar dari anak langsung (fork) dan turunan yang tersampel (forkserver)
+        "peak_rss_children_mb": round(max(rss_mb(resource.RUSAGE_CHILDREN), descendants.peak_kb / 1024), 1),
+        # Median per tahap (detik) dari semua iterasi terukur
+        "stages": {
+            name: round(percentile([run.get(name, 0) for run in stage_runs], 50), 4)
+            for name in stage_names
+        },
+    }
+
+
+def spawn_case(case, args, work_dir):
+    case_file = os.path.join(work_dir, "case.json")
+    result_file = os.path.join(work_dir, "result.json")
+    with open(case_file, 'w', encoding='utf-8') as f:
+        json.dump(case, f)
+    command = [
+        sys.executable, "-m", "benchmarks.run", "--case-file", case_file, "--result-file", result_file,
+        "--repeat", str(args.repeat), "--warmup", str(args.warmup),
+    ]
+    if args.no_stages:
+        command.append("--no-stages")
+    completed = subprocess.run(command, cwd=BACKEND_DIR)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark case {case['name']} failed (exit {completed.returncode})")
+    with open(result_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    from utils import config
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit,
+        "config": {key: getattr(config, key, None) for key in CONFIG_KEYS},
+    }
+
+
+def print_report(report):
+    width = max([len(name) for name in report["cases"]] + [4])
+    print(
+        f"{'case':<{width}} {'docs':>4} {'pages':>5} {'p50 ms':>10} {'p95 ms':>10} {'docs/s':>8} {'pages/s':>8} "
+        f"{'rss MB':>8} {'child MB':>8}"
+    )
+    for name, result in report["cases"].items():
+        print(
+            f"{name:<{width}} {result['documents']:>4} {result['pages']:>5} {result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} "
+            f"{result['docs_per_sec']:>8.2f} {result['pages_per_sec']:>8.2f} {result['peak_rss_mb']:>8.1f} "
+            f"{result['peak_rss_children_mb']:>8.1f}"
+        )
+    for name, result in report["cases"].items():
+        if not result["stages"]:
+            continue
+        print(f"\n{name} stages (median s per run, summed across processes):")
+        for stage, seconds in sorted(result["stages"].items(), key=lambda item: -item[1]):
+            print(f"  {stage:<28} {seconds:>10.4f}")
+
+
+def compare(report, baseline, threshold):
+    # Regresi: metrik lebih buruk dari baseline lebih dari threshold persen
+    regressions = []
+    if baseline.get("environment", {}).get("config") != report["environment"]["config"]:
+        print("\nWarning: configuration differs from baseline")
+    print(f"\nComparison with baseline ({baseline.get('created', '?')}, commit {baseline.get('environment', {}).get('git_commit')}):")
+    for name, result in report["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            print(f"  {name}: not in baseline")
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = base[metric], result[metric]
+            if not old:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            status = "REGRESSION" if worse > threshold else "ok"
+            print(f"  {name} {metric:<14} {old:>10.2f} -> {new:>10.2f} ({change:+.1f}%) {status}")
+            if worse > threshold:
+                regressions.append((name, metric))
+    return regressions
+
+
+def parse_scales(value):
+    return [int(scale) for scale in value.split(",") if scale.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DocumentProcessor.process dan process_multiple_files.")
+    parser.add_argument("--samples", default=SAMPLE_FOLDER, help="Folder PDF sampel (default: uploads)")
+    parser.add_argument("--no-samples", action="store_true", help="Hanya dokumen sintetis")
+    parser.add_argument("--scales", type=parse_scales, default=[0, 500, 2000], help="Jumlah outlet dokumen sintetis, dipisah koma")
+    parser.add_argument("--batch-size", type=int, default=3, help="Jumlah dokumen sintetis per batch (0 = tanpa batch)")
+    parser.add_argument("--batch-outlets", type=int, default=500, help="Jumlah outlet per dokumen batch")
+    parser.add_argument("--only", action="append", help="Hanya kasus yang namanya mengandung teks ini")
+    parser.add_argument("--repeat", type=int, default=3, help="Iterasi terukur per kasus")
+    parser.add_argument("--warmup", type=int, default=1, help="Iterasi pemanasan per kasus (tidak diukur)")
+    parser.add_argument("--no-stages", action="store_true", help="Tanpa span per tahap (tanpa overhead tracing)")
+    parser.add_argument("--output", help="Tulis laporan JSON ke file ini")
+    parser.add_argument("--save-baseline", help="Simpan laporan sebagai baseline JSON")
+    parser.add_argument("--compare", help="Bandingkan dengan baseline JSON")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Batas regresi dalam persen (default 10)")
+    parser.add_argument("--case-file", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+
+    if args.case_file:
+        # Proses anak: satu kasus
+        with open(args.case_file, 'r', encoding='utf-8') as f:
+            case = json.load(f)
+        result = run_case(case, args.repeat, args.warmup, not args.no_stages)
+        with open(args.result_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    work_dir = tempfile.mkdtemp(prefix="bench_cases_")
+    try:
+        cases = build_cases(args, work_dir)
+        results = {}
+        for case in cases:
+            print(f"Running {case['name']} ...", flush=True)
+            results[case["name"]] = spawn_case(case, args, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "environment": environment(),
+        "settings": {
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "scales": args.scales,
+            "batch_size": args.batch_size,
+            "batch_outlets": args.batch_outlets,
+            "stages": not args.no_stages,
+        },
+        "cases": results,
+    }
+    print()
+    print_report(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"\nReport written to {path}")
+
+    if baseline is not None and compare(report, baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
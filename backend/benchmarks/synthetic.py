@@ -0,0 +1,198 @@
+import zlib
+
+# Dokumen CP sintetis untuk benchmark: teks header dan tabel bergaris seperti sampel di
+# database/product_system/uploads, ditambah lampiran LIST TOKO sebanyak `outlets` baris.
+# PDF ditulis langsung (Helvetica, tanpa dependency) dan deterministik untuk parameter yang sama.
+
+PAGE_WIDTH = 842
+PAGE_HEIGHT = 595
+MARGIN = 30
+TEXT_SIZE = 9
+CELL_SIZE = 6
+CELL_PADDING = 2
+CHAR_WIDTH = 0.6  # perkiraan lebar rata-rata Helvetica per ukuran font
+OUTLET_HEADER = ["NO", "ID OUTLET", "NAMA OUTLET", "ALAMAT"]
+
+SKUS = [("FORTUNE PREMIUM\nRICE @5KG", "73.900,00", "71.860,36", "2,76", "'15/0", "250/0"),
+        ("FORTUNE PREMIUM\nRICE @10KG", "147.800,00", "142.715,68", "3,44", "'5/0", "50/0")]
+
+
+def header_lines(seq, outlets):
+    lines = [
+        "CONFIRMATION PROMOTION",
+        f"NOMOR: CP20DJFAJ001-24{seq:05d}",
+        "PRODUCT CATEGORY : RICE REF DOC: APP-KC1102-20DJFAJ001-24-00001531",
+        "BRAND : FORTUNE REF CP NO : -",
+        "CHANNEL : GT PERIODE CP: 28/12/2024 - 31/12/2024",
+        "REGION : KC0011 - BMW HO JAKARTA GROUP OUTLET :",
+        "SUB REGION : KC001102 - LAMPUNG",
+        "DISTRIBUTOR : 20DJFAJ001 - CV. Fajar Lestari Lampung",
+        "PROMO TYPE : 31. DISCOUNT PROMO - 31. DISCOUNT PROMO COMPENSATION :",
+        "SUB PROMO TYPE : 31D - DEAL KHUSUS",
+        "MECHANISM: '1. Deal Khusus",
+    ]
+    if outlets:
+        lines.append("List Toko Include (selectiontype=ISC)")
+    return lines
+
+
+def promo_tables():
+    discount = [
+        ["DISCOUNT PROMOTION", "", "", "", "", "", "", "", ""],
+        ["SKU", "UOM", "PRICE LIST\nSATP", "DISC %", "RBP DIST", "STRATA", "RBP STORE", "SHARE\nDIST %", "RBP NET INC PPN"],
+    ]
+    strata = [
+        ["STRATA DISCOUNT TABLE", "", "", "", "", "", "", "", ""],
+        ["SKU", "UOM", "MIN QTY / CTN", "DISC %", "RBP STORE OFF INV", "CUT PRICE", "", "SHARE\nDIST %", "RBP NET INC PPN"],
+        ["", "", "", "", "", "OTB", "PF", "", ""],
+    ]
+    commitment = [
+        ["SKU", "SALES COMITMENT", "", "TOTAL DISCOUNT", "TOTAL PRODUCT PROMO", "TOTAL OTB", "TOTAL PF", "TOTAL EST BUDGET\nPROMO"],
+        ["", "QTY IN CTN", "VALUE", "", "", "", "", ""],
+    ]
+    for sku, price, store, disc, min_qty, qty in SKUS:
+        discount.append([sku, "CTN1/BAG", price, disc, price, "V", store, "0,50", store])
+        strata.append([sku, "CTN1/BAG", min_qty, disc, store, "0,00", "-", "0,50", store])
+        commitment.append([sku, qty, "17.965.090,00", "510.000,00", "0,00", "-", "-", "510.000,00"])
+    return [discount, strata, commitment]
+
+
+def outlet_rows(seq, outlets):
+    for idx in range(1, outlets + 1):
+        yield [str(idx), f"C{seq:03d}{idx:07d}", f"TOKO SINTETIS {seq}-{idx}", f"JL. PASAR NO. {idx % 500 + 1} LAMPUNG"]
+
+
+def escape(text):
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class PageWriter:
+    def __init__(self):
+        self.pages = []
+        self.ops = None
+        self.y = None
+        self.new_page()
+
+    def new_page(self):
+        self.ops = []
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def text(self, x, y, text, size):
+        self.ops.append(f"BT /F1 {size} Tf {x:.2f} {y:.2f} Td ({escape(text)}) Tj ET")
+
+    def line(self, x0, y0, x1, y1):
+        self.ops.append(f"{x0:.2f} {y0:.2f} m {x1:.2f} {y1:.2f} l S")
+
+    def paragraph(self, lines):
+        for line in lines:
+            if self.y - TEXT_SIZE < MARGIN:
+                self.new_page()
+            self.y -= TEXT_SIZE * 1.4
+            self.text(MARGIN, self.y, line, TEXT_SIZE)
+
+    def table(self, rows, header_rows=0):
+        # Tabel dengan garis penuh (strategi "lines" pdfplumber); baris header diulang di setiap halaman
+        widths = column_widths(rows)
+        heights = [row_height(row) for row in rows]
+        self.y -= 10
+        drawn = 0
+        while drawn < len(rows):
+            batch = list(range(header_rows)) if drawn else []
+            available = self.y - MARGIN - sum(heights[idx] for idx in batch)
+            while drawn < len(rows) and heights[drawn] <= available:
+                batch.append(drawn)
+                available -= heights[drawn]
+                drawn += 1
+            if len(batch) <= header_rows and drawn < len(rows):
+                self.new_page()
+                continue
+            self._draw_rows([rows[idx] for idx in batch], [heights[idx] for idx in batch], widths)
+            if drawn < len(rows):
+                self.new_page()
+
+    def _draw_rows(self, rows, heights, widths):
+        top = self.y
+        left = MARGIN
+        right = left + sum(widths)
+        y = top
+        self.line(left, y, right, y)
+        for row, height in zip(rows, heights):
+            x = left
+            for cell, width in zip(row, widths):
+                for offset, line in enumerate(cell.split("\n")):
+                    self.text(x + CELL_PADDING, y - CELL_PADDING - CELL_SIZE * (offset + 1), line, CELL_SIZE)
+                x += width
+            y -= height
+            self.line(left, y, right, y)
+        x = left
+        for width in widths + [0]:
+            self.line(x, top, x, y)
+            x += width
+        self.y = y
+
+
+def column_widths(rows):
+    widths = [0] * max(len(row) for row in rows)
+    for row in rows:
+        for idx, cell in enumerate(row):
+            longest = max(len(line) for line in cell.split("\n"))
+            widths[idx] = max(widths[idx], longest * CELL_SIZE * CHAR_WIDTH + 2 * CELL_PADDING + 4)
+    scale = min(1.0, (PAGE_WIDTH - 2 * MARGIN) / sum(widths))
+    return [width * scale for width in widths]
+
+
+def row_height(row):
+    return max(cell.count("\n") + 1 for cell in row) * CELL_SIZE + 2 * CELL_PADDING + 2
+
+
+def build_document(seq=1, outlets=0):
+    writer = PageWriter()
+    writer.paragraph(header_lines(seq, outlets))
+    for table in promo_tables():
+        writer.table(table)
+    if outlets:
+        writer.paragraph(["LIST TOKO"])
+        writer.table([OUTLET_HEADER] + list(outlet_rows(seq, outlets)), header_rows=1)
+    return render_pdf(writer.pages)
+
+
+def render_pdf(pages):
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    page_tree = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    kids = []
+    for ops in pages:
+        stream = zlib.compress(("0.5 w\n" + "\n".join(ops)).encode("latin-1"))
+        content = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add((
+            f"<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>"
+        ).encode()))
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {page_tree} 0 R >>".encode()
+    objects[page_tree - 1] = f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def write_document(path, seq=1, outlets=0):
+    with open(path, 'wb') as pdf_file:
+        pdf_file.write(build_document(seq, outlets))
+    return path
@@ -0,0 +1,126 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from utils.config import BATCH_RESULTS_PATH, BATCH_RESULT_TTL, PDF_EXCLUDE_TABLE_ROWS
+from product_system.extraction_cache import file_sha256
+from product_system.models import OutletList
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Naikkan jika isi payload berubah; hasil versi lain dianggap tidak ada dan dokumennya diproses ulang
+PAYLOAD_VERSION = 1
+
+
+class StoredResult:
+    # Pengganti processor untuk dokumen yang hasilnya diambil dari batch sebelumnya. Yang disimpan
+    # hanya output generate_json (tanpa list_customer) dan daftar outlet, bukan objek processor,
+    # sehingga perubahan kelas processor/models setelah deploy tidak membuat hasil lama gagal dibaca.
+    def __init__(self, payload):
+        self.json_data = payload["json"]
+        outlets = OutletList()
+        outlets.ids = payload["outlets"]["ids"]
+        outlets.names = payload["outlets"]["names"]
+        self.data = {
+            "nomor": payload["nomor"],
+            "brand": payload["brand"],
+            "sub_promo_type": payload["sub_promo_type"],
+            "outlets": outlets,
+            "selection_type": None
+        }
+
+    def generate_json(self, list_customer):
+        # selectiontype dan list_customer ditentukan ulang oleh batch, posisi key tetap
+        json_data = dict(self.json_data)
+        json_data["selectiontype"] = self.data["selection_type"]
+        json_data["list_customer"] = [
+            {key: value for key, value in customer.items() if key != "isactive"}
+            for customer in list_customer
+        ]
+        return json_data
+
+
+def to_payload(processor):
+    data = processor.data
+    return {
+        "version": PAYLOAD_VERSION,
+        "nomor": data["nomor"],
+        "brand": data["brand"],
+        "sub_promo_type": data["sub_promo_type"],
+        "outlets": {"ids": data["outlets"].ids, "names": data["outlets"].names},
+        "json": processor.generate_json([])
+    }
+
+
+class BatchResultStore:
+    # Hasil per dokumen untuk mode keep_going (lihat StoredResult), disimpan per SHA-256 PDF dan
+    # nama file. Upload ulang batch yang sama hanya memproses dokumen yang sebelumnya gagal.
+    def __init__(self, db_path, ttl):
+        self.db_path = db_path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS batch_results (
+                    digest TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return closing(conn)
+
+    def key_for(self, pdf_path, filename):
+        # validate_data bisa mengambil SKU dari nama file, jadi PDF sama dengan nama lain diproses ulang
+        digest = f"{file_sha256(pdf_path)}:{filename}"
+        if PDF_EXCLUDE_TABLE_ROWS:
+            digest = f"{digest}:exclude_table_rows={PDF_EXCLUDE_TABLE_ROWS}"
+        return digest
+
+    def get(self, digest):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload FROM batch_results WHERE digest = ? AND created_at >= ?",
+                (digest, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            payload = json.loads(row[0])
+            if payload.get("version") != PAYLOAD_VERSION:
+                raise ValueError(f"versi {payload.get('version')}")
+            return StoredResult(payload)
+        except Exception as e:
+            # Hasil dari format lama (mis. processor yang di-pickle) atau rusak: dokumen diproses ulang
+            logger.warning("Discarding stored batch result %s: %s", digest, e)
+            self.discard([digest])
+            return None
+
+    def put(self, digest, processor):
+        payload = json.dumps(to_payload(processor), separators=(",", ":"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO batch_results (digest, payload, created_at) VALUES (?, ?, ?)",
+                (digest, payload, time.time())
+            )
+            conn.execute("DELETE FROM batch_results WHERE created_at < ?", (time.time() - self.ttl,))
+
+    def discard(self, digests):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM batch_results WHERE digest = ?", [(digest,) for digest in digests])
+
+
+_store = None
+
+
+def get_batch_result_store():
+    global _store
+    if _store is None:
+        _store = BatchResultStore(BATCH_RESULTS_PATH, BATCH_RESULT_TTL)
+    return _store
@@ -0,0 +1,241 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pdfplumber
+from utils.config import POOL_START_METHOD
+from utils.log import configure_logging
+from product_system import metrics, text_rules, tracing
+
+# Dimuat sekali di proses forkserver; proses pool di-fork dari situ dengan modul yang sudah terimpor
+FORKSERVER_PRELOAD = ["__main__", "product_system.multi_processor"]
+
+# Event pembatalan batch (fail-fast) di proses pool, dipasang oleh init_pool_worker
+CANCEL_EVENT = None
+
+
+def pool_context():
+    # fork dari proses yang menjalankan thread lain bisa mewarisi lock yang sedang dipegang thread tersebut
+    context = multiprocessing.get_context(POOL_START_METHOD)
+    if POOL_START_METHOD == "forkserver":
+        context.set_forkserver_preload(FORKSERVER_PRELOAD)
+    return context
+
+
+def init_pool_worker(cancel_event=None):
+    # Proses forkserver tidak menjalankan app.py (di gunicorn __main__ adalah skrip gunicorn),
+    # jadi handler dan level log dipasang di sini agar log INFO/DEBUG dari pool tidak hilang
+    global CANCEL_EVENT
+    CANCEL_EVENT = cancel_event
+    configure_logging()
+
+
+def check_cancelled():
+    # Dokumen yang sedang berjalan di pool batch berhenti di batas halaman berikutnya
+    if CANCEL_EVENT is not None and CANCEL_EVENT.is_set():
+        raise ValueError("Dihentikan karena dokumen lain dalam batch gagal.")
+
+
+def extract_page(page, exclude_table_rows=0):
+    check_cancelled()
+    start = time.perf_counter()
+    with tracing.span("extract_page", page=page.page_number):
+        text, tables = _extract_page(page, exclude_table_rows)
+    metrics.observe("pdf_stage_duration_seconds", time.perf_counter() - start, stage="extract_page")
+    metrics.inc("pdf_pages_total")
+    metrics.inc("pdf_tables_total", len(tables))
+    return text, tables
+
+
+def extract_page_tables(page):
+    # Mode teks-dulu: teks sudah dibaca lewat iter_page_texts, halaman ini hanya dicari tabelnya
+    check_cancelled()
+    start = time.perf_counter()
+    with tracing.span("extract_page", page=page.page_number):
+        with tracing.span("find_tables", page=page.page_number) as span:
+            tables = page.extract_tables()
+            span.set(tables=len(tables))
+    metrics.observe("pdf_stage_duration_seconds", time.perf_counter() - start, stage="extract_page")
+    metrics.inc("pdf_pages_total")
+    metrics.inc("pdf_tables_total", len(tables))
+    return tables
+
+
+def _extract_page(page, exclude_table_rows):
+    with tracing.span("find_tables", page=page.page_number) as span:
+        # Layout (chars, garis, rect) dihitung sekali lewat page.objects lalu dipakai
+        # bersama oleh extract_text dan find_tables
+        page.objects
+        found_tables = page.find_tables()
+        tables = [table.extract() for table in found_tables]
+        span.set(tables=len(tables))
+
+    # exclude_table_rows > 0: area tabel dengan minimal sekian baris dibuang dari teks bebas,
+    # isinya sudah dibaca lewat tabel sehingga parse_text tidak perlu memindai ulang.
+    # Tabel yang berisi field header tetap ikut di teks, berapa pun jumlah barisnya.
+    excluded_bboxes = []
+    if exclude_table_rows:
+        excluded_bboxes = [
+            found.bbox for found, table in zip(found_tables, tables)
+            if len(table) >= exclude_table_rows and not text_rules.has_header_field(table)
+        ]
+    with tracing.span("extract_text", page=page.page_number):
+        if excluded_bboxes:
+            text = page.filter(lambda obj: not _inside_any(obj, excluded_bboxes)).extract_text()
+        else:
+            text = page.extract_text()
+
+    # Lepas cache layout halaman ini agar tidak menumpuk sampai dokumen ditutup
+    page.close()
+    return text, tables
+
+
+def _inside_any(obj, bboxes):
+    center_x = (obj["x0"] + obj["x1"]) / 2
+    center_y = (obj["top"] + obj["bottom"]) / 2
+    for x0, top, x1, bottom in bboxes:
+        if x0 <= center_x <= x1 and top <= center_y <= bottom:
+            return True
+    return False
+
+
+def iter_pages(pdf_path, exclude_table_rows=0):
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            text, tables = extract_page(page, exclude_table_rows)
+            yield page.page_number, text, tables
+
+
+def iter_page_texts(pdf_path, pages=None):
+    # Hanya teks tanpa deteksi tabel, satu halaman per yield; pages membatasi ke sekian halaman awal
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[:pages]:
+            check_cancelled()
+            with tracing.span("extract_text", page=page.page_number):
+                text = page.extract_text()
+            page.close()
+            if text:
+                yield text
+
+
+def extract_text(pdf_path, pages=None):
+    return "\n".join(iter_page_texts(pdf_path, pages))
+
+
+def extract_header_text(pdf_path, pages=1):
+    # Teks halaman awal untuk membaca nomor/brand/area dengan murah
+    return extract_text(pdf_path, pages)
+
+
+def _iter_table_pages(pdf_path, single_pass):
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            tables = extract_page_tables(page)
+            if single_pass:
+                page.close()
+            yield page.page_number, None, tables
+
+
+def iter_document_tables(pdf_path, single_pass=True, workers=0, min_pages=8):
+    # Pasangan iter_document untuk mode teks-dulu: (page_number, None, tables) per halaman,
+    # dengan ekstraksi paralel dan metrik halaman/tabel yang sama
+    if workers > 1:
+        page_count = count_pages(pdf_path)
+        if page_count >= min_pages:
+            return _iter_pages_parallel(pdf_path, page_count, workers, 0, tables_only=True)
+    return _iter_table_pages(pdf_path, single_pass)
+
+
+def extract_document_tables(pdf_path, single_pass=True, workers=0, min_pages=8):
+    return [
+        table
+        for _, _, tables in iter_document_tables(pdf_path, single_pass, workers, min_pages)
+        for table in tables
+        if table and len(table) > 1
+    ]
+
+
+def count_pages(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_document(pdf_path, single_pass=True, workers=0, min_pages=8, exclude_table_rows=0):
+    # Generator (page_number, text, tables) per halaman sesuai mode ekstraksi
+    if workers > 1:
+        page_count = count_pages(pdf_path)
+        # Dokumen kecil tetap serial, overhead pool lebih mahal dari ekstraksinya
+        if page_count >= min_pages:
+            return _iter_pages_parallel(pdf_path, page_count, workers, exclude_table_rows)
+    if single_pass or exclude_table_rows:
+        return iter_pages(pdf_path, exclude_table_rows)
+    return _iter_pages_legacy(pdf_path)
+
+
+def extract_text_and_tables(pdf_path, single_pass=True, workers=0, min_pages=8, exclude_table_rows=0):
+    all_text = []
+    all_tables = []
+
+    pages = iter_document(pdf_path, single_pass, workers, min_pages, exclude_table_rows)
+    for _, text, tables in pages:
+        if text:
+            all_text.append(text)
+        for table in tables:
+            if table and len(table) > 1:
+                all_tables.append(table)
+
+    return "\n".join(all_text), all_tables
+
+
+@tracing.traced("extract_page_range")
+def _extract_page_range(pdf_path, start, end, exclude_table_rows, tables_only=False):
+    # Buka dokumen utuh lalu ambil potongan halaman, supaya doctop dan nomor
+    # halaman sama persis dengan jalur serial
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start:end]:
+            if tables_only:
+                tables = extract_page_tables(page)
+                page.close()
+                results.append((page.page_number, None, tables))
+                continue
+            text, tables = extract_page(page, exclude_table_rows)
+            results.append((page.page_number, text, tables))
+    # Berjalan di proses pool: kirim metrik sebelum proses kembali idle
+    metrics.flush()
+    return results
+
+
+def _iter_pages_parallel(pdf_path, page_count, workers, exclude_table_rows, tables_only=False):
+    workers = min(workers, page_count)
+    # Potongan lebih kecil dari jumlah worker agar halaman lampiran LIST TOKO
+    # yang berat tersebar merata
+    chunk_size = max(1, -(-page_count // (workers * 2)))
+    ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(), initializer=init_pool_worker) as pool:
+        # Span halaman di proses pool ditulis sebagai potongan trace request/job ini
+        trace_id = tracing.current_id()
+        futures = [
+            pool.submit(tracing.call_traced, trace_id, "page-pool", _extract_page_range, pdf_path, start, end, exclude_table_rows, tables_only)
+            for start, end in ranges
+        ]
+        # Hasil digabung sesuai urutan halaman, bukan urutan selesai
+        for future in futures:
+            yield from future.result()
+
+
+def _iter_pages_legacy(pdf_path):
+    # Mode lama: semua halaman tetap ter-cache sampai dokumen ditutup
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            check_cancelled()
+            start = time.perf_counter()
+            with tracing.span("extract_page", page=page.page_number):
+                with tracing.span("extract_text", page=page.page_number):
+                    text = page.extract_text()
+                with tracing.span("extract_tables", page=page.page_number):
+                    tables = page.extract_tables()
+            metrics.observe("pdf_stage_duration_seconds", time.perf_counter() - start, stage="extract_page")
+            metrics.inc("pdf_pages_total")
+            metrics.inc("pdf_tables_total", len(tables))
+            yield page.page_number, text, tables
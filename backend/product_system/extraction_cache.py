@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+from utils.config import EXTRACTION_CACHE_ENABLED, EXTRACTION_CACHE_PATH, EXTRACTION_CACHE_MAX_BYTES
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+STAT_NAMES = ("hits", "misses", "evictions")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    # Cache hasil ekstraksi (teks + tabel) per SHA-256 isi PDF. Disimpan di SQLite
+    # (mode WAL) supaya aman dipakai bersama oleh semua worker gunicorn.
+    def __init__(self, db_path, max_bytes):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extraction_cache (
+                    digest TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extraction_cache_access ON extraction_cache (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.executemany("INSERT OR IGNORE INTO cache_stats (name, value) VALUES (?, 0)", [(name,) for name in STAT_NAMES])
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return closing(conn)
+
+    def _bump(self, conn, name, amount=1):
+        conn.execute("UPDATE cache_stats SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, digest):
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload FROM extraction_cache WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                self._bump(conn, "misses")
+                return None
+            conn.execute("UPDATE extraction_cache SET last_access = ? WHERE digest = ?", (time.time(), digest))
+            self._bump(conn, "hits")
+        payload = json.loads(zlib.decompress(row[0]).decode('utf-8'))
+        return payload["text"], payload["tables"]
+
+    def put(self, digest, text, tables):
+        payload = zlib.compress(json.dumps({"text": text, "tables": tables}).encode('utf-8'))
+        if len(payload) > self.max_bytes:
+            return
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extraction_cache (digest, payload, size, last_access) VALUES (?, ?, ?, ?)",
+                    (digest, payload, len(payload), time.time())
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn):
+        # LRU berdasarkan ukuran total: hapus entri paling lama tidak diakses
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for digest, size in conn.execute("SELECT digest, size FROM extraction_cache ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM extraction_cache WHERE digest = ?", (digest,))
+            total -= size
+            evicted += 1
+        self._bump(conn, "evictions", evicted)
+
+    def digest_for(self, pdf_path, variant=None):
+        # variant membedakan mode ekstraksi yang menghasilkan teks berbeda untuk PDF yang sama
+        digest = file_sha256(pdf_path)
+        if variant:
+            digest = f"{digest}:{variant}"
+        return digest
+
+    def lookup(self, pdf_path, variant=None):
+        return self.get(self.digest_for(pdf_path, variant))
+
+    def get_or_extract(self, pdf_path, extract_fn, variant=None):
+        digest = self.digest_for(pdf_path, variant)
+        cached = self.get(digest)
+        if cached is not None:
+            logger.info("Extraction cache hit: %s", digest)
+            return cached
+        text, tables = extract_fn(pdf_path)
+        # Hasil kosong (PDF gagal dibaca) tidak disimpan
+        if text or tables:
+            self.put(digest, text, tables)
+        return text, tables
+
+    def stats(self):
+        with self._connect() as conn:
+            stats = dict(conn.execute("SELECT name, value FROM cache_stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()
+        stats["entries"] = entries
+        stats["bytes"] = size
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+_cache = None
+
+
+def get_extraction_cache():
+    global _cache
+    if not EXTRACTION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ExtractionCache(EXTRACTION_CACHE_PATH, EXTRACTION_CACHE_MAX_BYTES)
+    return _cache
+
+
+def lookup(pdf_path, variant=None):
+    cache = get_extraction_cache()
+    if cache is None:
+        return None
+    return cache.lookup(pdf_path, variant)
+
+
+def get_or_extract(pdf_path, extract_fn, variant=None):
+    cache = get_extraction_cache()
+    if cache is None:
+        return extract_fn(pdf_path)
+    return cache.get_or_extract(pdf_path, extract_fn, variant)
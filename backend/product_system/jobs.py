@@ -0,0 +1,279 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, nullcontext
+from utils.config import JOB_QUEUE_PATH, JOB_POLL_INTERVAL, JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS, JOB_RESULT_TTL, SAVE_DEBUG_CSV
+from product_system import metrics, output_index, outputs, profiling, tracing
+from utils.log import get_logger, debug_logging
+
+logger = get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JOB_KINDS = ("single", "multiple")
+
+
+class JobQueue:
+    # Antrian job upload di SQLite (mode WAL), dipakai bersama oleh semua worker gunicorn.
+    # Job tetap tersimpan jika proses mati; job "running" milik worker yang berhenti
+    # mengirim heartbeat diantrikan ulang oleh worker lain.
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    files TEXT NOT NULL,
+                    nomors TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    debug INTEGER NOT NULL DEFAULT 0,
+                    profile INTEGER NOT NULL DEFAULT 0,
+                    trace_id TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            # Antrian lama belum punya kolom debug/profile/trace_id
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in (("debug", "INTEGER NOT NULL DEFAULT 0"), ("profile", "INTEGER NOT NULL DEFAULT 0"), ("trace_id", "TEXT")):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS job_workers (worker_id TEXT PRIMARY KEY, heartbeat REAL NOT NULL)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.row_factory = sqlite3.Row
+        return closing(conn)
+
+    def enqueue(self, kind, files, debug=False, profile=False, trace_id=None):
+        # files: list of {"pdf_path", "csv_path", "filename"}, PDF sudah disimpan di UPLOAD_FOLDER
+        # debug/profile: log DEBUG dan profil cProfile saat job dijalankan (toggle per request)
+        # trace_id: trace request pengunggah, dilanjutkan dan ditulis oleh worker
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Jenis job tidak dikenal: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, files, debug, profile, trace_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(files), int(bool(debug)), int(bool(profile)), trace_id, time.time())
+            )
+        return job_id
+
+    def claim(self, worker_id):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, worker_id = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, worker_id, time.time(), row["id"])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self._to_dict(row)
+        job["status"] = RUNNING
+        job["attempts"] += 1
+        return job
+
+    def finish(self, job_id, nomors):
+        self._set_result(job_id, DONE, nomors=json.dumps(nomors))
+
+    def fail(self, job_id, error):
+        self._set_result(job_id, FAILED, error=error)
+
+    def _set_result(self, job_id, status, nomors=None, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, nomors = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, nomors, error, time.time(), job_id)
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, time.time() - JOB_RESULT_TTL)
+            )
+
+    def heartbeat(self, worker_id):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_workers (worker_id, heartbeat) VALUES (?, ?)",
+                (worker_id, time.time())
+            )
+
+    def requeue_stale(self):
+        # Job yang sedang berjalan di worker mati: antrikan ulang, atau gagalkan jika sudah terlalu sering
+        # dicoba atau PDF-nya sudah terhapus (worker mati setelah process_multiple_files membersihkan input)
+        cutoff = time.time() - JOB_STALE_SECONDS
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stale = conn.execute("""
+                    SELECT id, attempts, files FROM jobs
+                    WHERE status = ? AND worker_id NOT IN (
+                        SELECT worker_id FROM job_workers WHERE heartbeat >= ?
+                    )
+                """, (RUNNING, cutoff)).fetchall()
+                for row in stale:
+                    error = None
+                    if row["attempts"] >= JOB_MAX_ATTEMPTS:
+                        error = "Worker berhenti saat memproses job."
+                    elif not all(os.path.exists(file_info["pdf_path"]) for file_info in json.loads(row["files"])):
+                        error = "Worker berhenti saat memproses job dan file PDF sudah tidak tersedia, silakan upload ulang."
+                    if error:
+                        conn.execute(
+                            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                            (FAILED, error, time.time(), row["id"])
+                        )
+                    else:
+                        conn.execute("UPDATE jobs SET status = ?, worker_id = NULL WHERE id = ?", (QUEUED, row["id"]))
+                conn.execute("DELETE FROM job_workers WHERE heartbeat < ?", (cutoff,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(stale)
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def _to_dict(self, row):
+        job = dict(row)
+        job["files"] = json.loads(job["files"])
+        job["nomors"] = json.loads(job["nomors"]) if job["nomors"] else []
+        job["debug"] = bool(job.get("debug"))
+        job["profile"] = bool(job.get("profile"))
+        return job
+
+
+def run_job(job):
+    # Import di sini agar modul antrian tidak ikut memuat pdfplumber saat hanya membaca status
+    from product_system.processor import DocumentProcessor
+    from product_system.multi_processor import process_multiple_files
+
+    files = job["files"]
+    if job["kind"] == "single":
+        file_info = files[0]
+        try:
+            processor = DocumentProcessor()
+            json_data = processor.process(file_info["pdf_path"], file_info["csv_path"])
+            if not json_data:
+                raise ValueError("Data JSON kosong.")
+            nomor = outputs.nomor_from_json(json_data)
+            if not nomor:
+                raise ValueError("Nomor dokumen tidak ditemukan.")
+            outputs.save_json_output(json_data, nomor, output_index.parsed_fields(processor.data))
+            return [nomor]
+        finally:
+            outputs.remove_temp_files(file_info["pdf_path"], file_info["csv_path"], keep_csv=SAVE_DEBUG_CSV)
+
+    # process_multiple_files menghapus PDF/CSV sementara sendiri
+    json_outputs = process_multiple_files(files)
+    if not json_outputs:
+        raise ValueError("Data JSON kosong.")
+    nomors = []
+    for json_data, nomor, fields in json_outputs:
+        outputs.save_json_output(json_data, nomor, fields)
+        nomors.append(nomor)
+    return nomors
+
+
+class JobWorkerPool:
+    def __init__(self, queue, size):
+        self.queue = queue
+        self.size = size
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.threads = []
+
+    def start(self):
+        self.queue.heartbeat(self.worker_id)
+        self.queue.requeue_stale()
+        self.threads.append(threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True))
+        for idx in range(self.size):
+            self.threads.append(threading.Thread(target=self._work_loop, name=f"job-worker-{idx}", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def _heartbeat_loop(self):
+        interval = max(1, JOB_STALE_SECONDS // 3)
+        while True:
+            time.sleep(interval)
+            try:
+                self.queue.heartbeat(self.worker_id)
+                self.queue.requeue_stale()
+            except Exception as e:
+                logger.debug("Job heartbeat error: %s", e)
+
+    def _work_loop(self):
+        while True:
+            try:
+                job = self.queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error("Error claiming job: %s", e)
+                job = None
+            if job is None:
+                time.sleep(JOB_POLL_INTERVAL)
+                continue
+
+            logger.info("Running job %s (%s, attempt %s)", job['id'], job['kind'], job['attempts'])
+            try:
+                # Job tanpa permintaan profil tetap ikut sampling PROFILE_ENABLED (None)
+                # Trace request pengunggah dilanjutkan di sini (thread job-worker-N di baris proses yang sama)
+                trace = tracing.run(
+                    f"job_{job['kind']}", job["trace_id"], root_name=f"job {job['kind']}",
+                    job_id=job["id"], attempt=job["attempts"]
+                ) if job["trace_id"] else nullcontext()
+                with debug_logging(job["debug"]), profiling.request_profile(job["profile"] or None), trace:
+                    nomors = run_job(job)
+            except Exception as e:
+                logger.error("Job %s failed: %s", job['id'], e)
+                self.queue.fail(job["id"], str(e))
+            else:
+                logger.info("Job %s done: %s", job['id'], nomors)
+                self.queue.finish(job["id"], nomors)
+            metrics.flush()
+
+
+_queue = None
+_pool = None
+_lock = threading.Lock()
+
+
+def get_job_queue():
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(JOB_QUEUE_PATH)
+    return _queue
+
+
+def start_job_workers(size):
+    # Sekali per proses; dipanggil saat app dimuat di setiap worker gunicorn
+    global _pool
+    with _lock:
+        if _pool is None and size > 0:
+            _pool = JobWorkerPool(get_job_queue(), size)
+            _pool.start()
+    return _pool
@@ -0,0 +1,214 @@
+import atexit
+import functools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from utils.config import METRICS_ENABLED, METRICS_PATH, METRICS_FLUSH_INTERVAL
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# family -> (type, help)
+FAMILIES = {
+    "pdf_stage_duration_seconds": ("histogram", "Durasi per tahap pipeline (save_pdf, extract_page, serialize_tables, parse_text, parse_csv, validate_data, generate_json, write_json)."),
+    "pdf_documents_total": ("counter", "Dokumen yang selesai diproses."),
+    "pdf_pages_total": ("counter", "Halaman PDF yang diekstrak."),
+    "pdf_tables_total": ("counter", "Tabel yang diekstrak dari PDF."),
+    "pdf_outlets_total": ("counter", "Outlet (LIST TOKO) yang dibaca dari dokumen."),
+    "pdf_failures_total": ("counter", "Dokumen yang gagal diproses, per alasan."),
+    "pdf_batch_failures_total": ("counter", "Batch upload-multiple yang ditolak, per alasan."),
+}
+
+SUFFIX_ORDER = {"_bucket": 0, "_sum": 1, "_count": 2, "": 3}
+
+
+def format_labels(labels):
+    parts = []
+    for name in sorted(labels):
+        value = str(labels[name]).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return ",".join(parts)
+
+
+def failure_reason(error):
+    # Pesan tanpa detail setelah ":" (nama SKU/file) agar jumlah label tetap kecil
+    if not isinstance(error, ValueError):
+        return type(error).__name__
+    reason = str(error).split(":")[0].strip()
+    if reason.startswith("Error processing "):
+        # Dokumen gagal di dalam batch, penyebab per dokumen sudah dihitung di pdf_failures_total
+        reason = "Error processing"
+    return reason[:80] or "ValueError"
+
+
+class MetricStore:
+    # Metrik dikumpulkan di memori per proses lalu dijumlahkan ke SQLite (mode WAL), sehingga
+    # /metrics di worker gunicorn mana pun melaporkan total semua worker dan proses pool.
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metrics (
+                    family TEXT NOT NULL,
+                    suffix TEXT NOT NULL,
+                    labels TEXT NOT NULL,
+                    le TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (family, suffix, labels, le)
+                )
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return closing(conn)
+
+    def add(self, values):
+        # values: {(family, suffix, labels, le): increment}
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("""
+                    INSERT INTO metrics (family, suffix, labels, le, value) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (family, suffix, labels, le) DO UPDATE SET value = value + excluded.value
+                """, [key + (value,) for key, value in values.items()])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def render(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT family, suffix, labels, le, value FROM metrics").fetchall()
+        rows.sort(key=lambda row: (
+            row[0], row[2], SUFFIX_ORDER[row[1]], float(row[3].replace("+Inf", "inf")) if row[3] else 0
+        ))
+        lines = []
+        current = None
+        for family, suffix, labels, le, value in rows:
+            if family != current:
+                kind, help_text = FAMILIES.get(family, ("untyped", family))
+                lines.append(f"# HELP {family} {help_text}")
+                lines.append(f"# TYPE {family} {kind}")
+                current = family
+            if le:
+                labels = f'{labels},le="{le}"' if labels else f'le="{le}"'
+            sample = f"{family}{suffix}{{{labels}}}" if labels else f"{family}{suffix}"
+            lines.append(f"{sample} {int(value) if value.is_integer() else repr(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricBuffer:
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.time()
+
+    def _add(self, key, amount):
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def inc(self, family, amount, labels):
+        with self.lock:
+            self._add((family, "", format_labels(labels), ""), amount)
+        self._maybe_flush()
+
+    def observe(self, family, value, labels, buckets):
+        labels = format_labels(labels)
+        with self.lock:
+            for bucket in buckets:
+                if value <= bucket:
+                    self._add((family, "_bucket", labels, f"{bucket:g}"), 1)
+            self._add((family, "_bucket", labels, "+Inf"), 1)
+            self._add((family, "_sum", labels, ""), value)
+            self._add((family, "_count", labels, ""), 1)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.time() - self.last_flush >= METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            values = self.values
+            self.values = {}
+            self.last_flush = time.time()
+        if not values:
+            return
+        try:
+            get_metric_store().add(values)
+        except Exception as e:
+            logger.error("Error flushing metrics: %s", e)
+
+
+_store = None
+_buffer = MetricBuffer()
+
+
+def get_metric_store():
+    global _store
+    if _store is None:
+        _store = MetricStore(METRICS_PATH)
+    return _store
+
+
+def inc(family, amount=1, **labels):
+    if METRICS_ENABLED and amount:
+        _buffer.inc(family, amount, labels)
+
+
+def observe(family, value, buckets=STAGE_BUCKETS, **labels):
+    if METRICS_ENABLED:
+        _buffer.observe(family, value, labels, buckets)
+
+
+def count_failure(error, family="pdf_failures_total"):
+    inc(family, reason=failure_reason(error))
+
+
+class timed:
+    # Dipakai sebagai decorator method atau "with metrics.timed(stage):"
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __call__(self, fn):
+        stage = self.stage
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe("pdf_stage_duration_seconds", time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+
+def flush():
+    if METRICS_ENABLED:
+        _buffer.flush()
+
+
+def render():
+    flush()
+    return get_metric_store().render()
+
+
+def _reset_after_fork():
+    # Proses anak (pool ekstraksi/batch) mulai dengan buffer kosong agar nilai induk tidak terhitung dua kali
+    global _buffer
+    _buffer = MetricBuffer()
+
+
+atexit.register(flush)
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,68 @@
+class Strata:
+    __slots__ = ("breakfrom", "breakto", "disc", "share_disc")
+
+    def __init__(self, breakfrom, breakto, disc, share_disc):
+        self.breakfrom = breakfrom
+        self.breakto = breakto
+        self.disc = disc
+        self.share_disc = share_disc
+
+    def to_dict(self):
+        return {
+            "breakfrom": self.breakfrom,
+            "breakto": self.breakto,
+            "disc": self.disc,
+            "share_disc": self.share_disc
+        }
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class SkuEntry:
+    __slots__ = ("sku", "qty_allocated", "uom", "c_uom_id", "strata_discounts")
+
+    def __init__(self, sku, qty_allocated=0, uom=None, c_uom_id=None, strata_discounts=None):
+        self.sku = sku
+        self.qty_allocated = qty_allocated
+        self.uom = uom
+        self.c_uom_id = c_uom_id
+        self.strata_discounts = strata_discounts if strata_discounts is not None else []
+
+    def to_dict(self):
+        return {
+            "sku": self.sku,
+            "qty_allocated": self.qty_allocated,
+            "uom": self.uom,
+            "c_uom_id": self.c_uom_id,
+            "strata_discounts": [strata.to_dict() for strata in self.strata_discounts]
+        }
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class OutletList:
+    # Daftar toko bisa puluhan ribu baris, disimpan sebagai dua list paralel
+    # (bukan satu dict per outlet) dan baru dijadikan dict saat JSON dibuat
+    __slots__ = ("ids", "names")
+
+    def __init__(self):
+        self.ids = []
+        self.names = []
+
+    def append(self, c_bpartner_id, name):
+        self.ids.append(c_bpartner_id)
+        self.names.append(name)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return zip(self.ids, self.names)
+
+    def to_dicts(self):
+        return [{"c_bpartner_id": c_bpartner_id, "name": name} for c_bpartner_id, name in self]
+
+    def __repr__(self):
+        return repr(self.to_dicts())
@@ -1,13 +1,27 @@
-import pdfplumber
-import csv
-from datetime import datetime
 import re
 import json
+import logging
 import os
-from utils.config import AREA_MAPPING, UOM_MAPPING
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.config import UOM_MAPPING, PDF_SINGLE_PASS, PDF_EXTRACT_WORKERS, PDF_PARALLEL_MIN_PAGES, PDF_EXCLUDE_TABLE_ROWS, PDF_TEXT_FIRST, PDF_STREAMING, SAVE_DEBUG_CSV, BATCH_WORKERS, BATCH_MODE, BATCH_HEADER_SCAN, HEADER_SCAN_PAGES, OUTLET_ARTIFACTS
+from product_system import batch_results, extraction, extraction_cache, metrics, output_index, outputs, pipeline, profiling, table_classifier, table_io, text_rules, tracing
+from product_system.models import SkuEntry, Strata, OutletList
+from utils.log import get_logger, debug_enabled, call_with_debug
+
+logger = get_logger(__name__)
+
+UOM_VALUE_PATTERN = re.compile(r"\b(KG|LT|CTN|PCS)\b", re.IGNORECASE)
+QTY_VALUE_PATTERN = re.compile(r"\b\d+\s*(?:CTN|KG|LT|PCS)?\b", re.IGNORECASE)
+DISC_VALUE_PATTERN = re.compile(r"\b\d+\.?\d*\s*%", re.IGNORECASE)
+DIGITS_PATTERN = re.compile(r"\d+")
+
+# Mode ekstraksi yang menghasilkan teks berbeda untuk PDF yang sama disimpan terpisah di cache
+EXTRACTION_VARIANT = f"exclude_table_rows={PDF_EXCLUDE_TABLE_ROWS}" if PDF_EXCLUDE_TABLE_ROWS else None
 
 class MultiDocumentProcessor:
-    def __init__(self):
+    def __init__(self, page_workers=PDF_EXTRACT_WORKERS):
+        # page_workers: worker ekstraksi per halaman, 0 jika dokumen sudah diproses di dalam pool batch
+        self.page_workers = page_workers
         self.reset_data()
 
     def reset_data(self):
@@ -25,481 +39,309 @@ class MultiDocumentProcessor:
             "sku": None,
             "uom": None,
             "c_uom_id": None,
-            "outlets": [],
+            "outlets": OutletList(),
             "strata_discounts": [],
             "selection_type": None,
             "sku_data": []
         }
+        # Index SKU -> entri di sku_data, urutan list tetap dipakai untuk list_break
+        self.sku_index = {}
+
+    def add_sku_entry(self, sku_entry):
+        self.data["sku_data"].append(sku_entry)
+        self.sku_index.setdefault(sku_entry.sku, sku_entry)
+        return sku_entry
 
     def extract_text_and_tables(self, pdf_path):
-        all_text = []
-        all_tables = []
-        
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        all_text.append(text)
-                    
-                    tables = page.extract_tables()
-                    for table in tables:
-                        if table and len(table) > 1:
-                            all_tables.append(table)
+            return extraction.extract_text_and_tables(
+                pdf_path,
+                single_pass=PDF_SINGLE_PASS,
+                workers=self.page_workers,
+                min_pages=PDF_PARALLEL_MIN_PAGES,
+                exclude_table_rows=PDF_EXCLUDE_TABLE_ROWS
+            )
         except Exception as e:
-            print(f"Error extracting PDF from {pdf_path}: {str(e)}")
-            
-        return "\n".join(all_text), all_tables
+            logger.error("Error extracting PDF from %s: %s", pdf_path, e)
+            return "", []
+
+    def iter_pages(self, pdf_path):
+        return extraction.iter_document(
+            pdf_path,
+            single_pass=PDF_SINGLE_PASS,
+            workers=self.page_workers,
+            min_pages=PDF_PARALLEL_MIN_PAGES,
+            exclude_table_rows=PDF_EXCLUDE_TABLE_ROWS
+        )
+
+    def iter_table_pages(self, pdf_path):
+        return extraction.iter_document_tables(
+            pdf_path,
+            single_pass=PDF_SINGLE_PASS,
+            workers=self.page_workers,
+            min_pages=PDF_PARALLEL_MIN_PAGES
+        )
+
+    def extract_text_first(self, pdf_path):
+        # Field wajib dari teks dicek sebelum tabel diekstrak; ValueError diteruskan
+        # sehingga dokumen yang tidak lengkap tidak membayar ekstraksi tabel
+        try:
+            text = extraction.extract_text(pdf_path)
+        except Exception as e:
+            logger.error("Error extracting PDF text from %s: %s", pdf_path, e)
+            return "", []
+        self.parse_text(text)
+        self.text_parsed = True
+        self.validate_text_fields()
+        try:
+            tables = extraction.extract_document_tables(
+                pdf_path,
+                single_pass=PDF_SINGLE_PASS,
+                workers=self.page_workers,
+                min_pages=PDF_PARALLEL_MIN_PAGES
+            )
+        except Exception as e:
+            # Teks sudah terbaca: jangan dilaporkan sebagai dokumen kosong
+            logger.error("Error extracting PDF tables from %s: %s", pdf_path, e)
+            raise ValueError(f"Tabel dokumen tidak dapat dibaca: {e}")
+        return text, tables
 
+    @metrics.timed("serialize_tables")
+    @tracing.traced("serialize_tables")
     def save_tables_to_csv(self, tables, csv_path):
-        with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            for table in tables:
-                for row in table:
-                    writer.writerow(row)
-                writer.writerow(["---"] * len(table[0]))
+        table_io.write_tables_csv(tables, csv_path)
 
+    @metrics.timed("parse_text")
+    @tracing.traced("parse_text")
     def parse_text(self, text):
-        lines = text.split('\n')
-        for line in lines:
-            line = line.strip()
-
-            # Nomor extraction
-            nomor_match = re.search(r"CP\d{2}[A-Za-z]{3,5}\d{2,3}-\d+", line, re.IGNORECASE)
-            if nomor_match:
-                nomor = nomor_match.group(0)
-                nomor = nomor.replace("CP20DJFAJ001", "CP20DJFAJ01")
-                self.data["nomor"] = nomor
-
-            # Date extraction
-            date_match = re.search(r"(\d{2}/\d{2}/\d{4})\s*[-–]\s*(\d{2}/\d{2}/\d{4})", line, re.IGNORECASE)
-            if date_match:
-                try:
-                    start_date = datetime.strptime(date_match.group(1), "%d/%m/%Y")
-                    end_date = datetime.strptime(date_match.group(2), "%d/%m/%Y")
-                    self.data["valid_from"] = start_date.strftime("%Y%m%d")
-                    self.data["valid_to"] = end_date.strftime("%Y%m%d")
-                except Exception as e:
-                    print(f"Error parsing dates: {str(e)}")
-
-            # Brand extraction
-            brand_match = re.search(r"(?:BRAND|PRODUCT\s*BRAND)\s*[:=\s-]+\s*([A-Za-z\s]+)", line, re.IGNORECASE)
-            if brand_match:
-                brand = brand_match.group(1).strip().upper()
-                brand = re.split(r"\s*REF\s*CP\s*NO", brand, flags=re.IGNORECASE)[0].strip()
-                if brand and "REF CP NO" not in brand:
-                    self.data["brand"] = brand
-
-            # Distributor extraction
-            distributor_match = re.search(r"DISTRIBUTOR\s*[:=]?\s*([A-Z0-9-]+)\s*-\s*CV", line, re.IGNORECASE)
-            if distributor_match:
-                distributor_code = distributor_match.group(1)
-                area_code = distributor_code[-2:] if len(distributor_code) >= 2 else None
-                self.data["area_code"] = area_code
-                if area_code in AREA_MAPPING:
-                    self.data["area_name"] = AREA_MAPPING[area_code]["area_name"]
-                    self.data["ad_org_id"] = AREA_MAPPING[area_code]["ad_org_id"]
-
-            # Sub promo type extraction
-            if re.search(r"SUB\s*PROMO\s*TYPE\s*[:=]?", line, re.IGNORECASE):
-                match = re.search(r"SUB\s*PROMO\s*TYPE\s*[:=]?\s*\d{2}[A-Za-z]+\s*-\s*([A-Za-z\s]+)", line, re.IGNORECASE)
-                if match:
-                    self.data["sub_promo_type"] = match.group(1).strip().upper()
-
-            # Vendor cashback extraction
-            if re.search(r"INCLUDE\s*TRADING\s*TERM\s*☑", line, re.IGNORECASE):
-                self.data["vendor_cashback"] = "Y"
-            elif re.search(r"EXCLUDE\s*TRADING\s*TERM\s*☑", line, re.IGNORECASE):
-                self.data["vendor_cashback"] = "N"
-
-            # SKU extraction
-            sku_match = re.search(
-                r"(MILA FLOUR BAG @1KG|MILA TEPUNG(?: \d+KG)?|TEPUNG MILA|FORTUNE (?:PREMIUM RICE|PALM OIL )?(?:PLP|PCH|JRG) @\d+(\.\d+)?[KL]T)", 
-                line, 
-                re.IGNORECASE
-            )
-            if sku_match:
-                sku = sku_match.group(0)
-                found = False
-                for sku_entry in self.data["sku_data"]:
-                    if sku_entry["sku"] == sku:
-                        found = True
-                        break
-                if not found:
-                    self.data["sku_data"].append({
-                        "sku": sku,
-                        "qty_allocated": 0,
-                        "uom": None,
-                        "c_uom_id": None,
-                        "strata_discounts": []
-                    })
-                self.data["sku"] = sku
-                print(f"SKU found in text: {self.data['sku']}")
+        parser = text_rules.MULTI_DOCUMENT_RULES.start(self)
+        parser.feed(text.split('\n'))
+        self.finish_text(parser)
+
+    def finish_text(self, parser):
+        parser.finish()
+
+    @metrics.timed("parse_csv")
+    @tracing.traced("parse_csv")
+    def parse_csv(self, tables):
+        # tables: list/iterator tabel hasil extract_text_and_tables, atau path CSV lama
+        # Dicek sekali per dokumen, bukan per baris outlet
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for table_rows in tracing.iter_spans("parse_table", table_io.iter_tables(tables), lambda table_rows: {"rows": len(table_rows)}):
+            last_sku = None
+            last_uom = None
+
+            logger.debug("Processing table: %s", table_rows)
+            # Jenis tabel dan posisi kolom ditentukan sekali dari header, bukan per sel
+            layout = table_classifier.classify_multi_document_table(table_rows)
+            current_table = layout.kind
+
+            if current_table == table_classifier.SALES_COMMITMENT:
+                logger.debug("Detected SALES COMMITMENT table with headers: %s", layout.headers)
+                if layout.subheaders:
+                    logger.debug("Subheaders: %s", layout.subheaders)
+            elif current_table == table_classifier.STRATA_DISCOUNT:
+                self.data["strata_discounts"] = []
+                logger.debug("Detected STRATA DISCOUNT TABLE with headers: %s", layout.headers)
+            elif current_table == table_classifier.OUTLET_LIST:
+                logger.debug("Detected OUTLET LIST table with headers: %s", layout.headers)
+            else:
+                self.parse_headerless_table(table_rows)
+                continue
+
+            for row, columns in layout.rows(table_rows):
+                if current_table == table_classifier.SALES_COMMITMENT:
+                    qty_str = columns.get(row, layout.qty_header).strip()
+                    if not qty_str:
+                        value = columns.find(row, table_classifier.QTY_PATTERN)
+                        if value is not None:
+                            qty_str = value.strip()
+                    try:
+                        if qty_str:
+                            if '/' in qty_str:
+                                num, denom = map(int, qty_str.split('/'))
+                                qty = num if denom == 0 else num // denom
+                            else:
+                                qty = int(qty_str.replace('.', '')) if qty_str.replace('.', '').isdigit() else None
+                        else:
+                            qty = None
+                    except Exception as e:
+                        logger.warning("Error parsing QTY: %s", e)
+                        qty = None
+
+                    sku = self.find_sku(row, columns, layout)
+                    if sku:
+                        logger.debug("SKU found in SALES COMMITMENT table: %s", sku)
+
+                    uom = self.find_uom(row, columns, layout)
+                    if uom:
+                        logger.debug("UOM found in SALES COMMITMENT table: %s", uom)
+
+                    if sku and qty is not None:
+                        sku_entry = self.sku_index.get(sku)
+                        if sku_entry is not None:
+                            sku_entry.qty_allocated = qty
+                            if uom:
+                                sku_entry.uom = uom
+                                sku_entry.c_uom_id = UOM_MAPPING.get(uom, 1000000)
+                        else:
+                            self.add_sku_entry(SkuEntry(
+                                sku,
+                                qty_allocated=qty,
+                                uom=uom if uom else None,
+                                c_uom_id=UOM_MAPPING.get(uom, 1000000) if uom else None
+                            ))
+                        if self.data["qty_allocated"] is None:
+                            self.data["qty_allocated"] = qty
+                        if not self.data["sku"]:
+                            self.data["sku"] = sku
+                        if uom and not self.data["uom"]:
+                            self.data["uom"] = uom
+                            self.data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
+
+                elif current_table == table_classifier.STRATA_DISCOUNT:
+                    min_qty_str = columns.get(row, layout.min_qty_header).replace("'", "").strip()
+                    
+                    try:
+                        if '/' in min_qty_str:
+                            min_qty = int(min_qty_str.split('/')[0].strip())
+                            max_qty = None
+                        elif '-' in min_qty_str:
+                            lower_str, upper_str = map(str.strip, min_qty_str.split('-'))
+                            min_qty = int(lower_str) if lower_str.replace(',', '').isdigit() else 0
+                            max_qty = int(upper_str) if upper_str.replace(',', '').isdigit() else 0
+                        else:
+                            min_qty = int(min_qty_str) if min_qty_str.replace(',', '').isdigit() else 0
+                            max_qty = None
 
-            # UOM extraction from text (sebagai fallback)
-            if not self.data["uom"]:
-                uom_match = re.search(r"\b(\d*\.?\d+)?\s*(KG|LT|PC|PCS)\b", line, re.IGNORECASE)
-                if uom_match:
-                    uom = uom_match.group(2).upper()
-                    self.data["uom"] = uom
-                    self.data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
-                    print(f"UOM found in text: {self.data['uom']} (c_uom_id: {self.data['c_uom_id']})")
+                        if min_qty > 0:
+                            disc_str = columns.get(row, layout.disc_header).replace(",", ".").strip()
+                            disc = float(disc_str) if disc_str else 0.0
 
-        # Fallback: Jika brand masih tidak ditemukan
-        if not self.data["brand"]:
-            for line in lines:
-                brand_match = re.search(r"\b(MILA|FORTUNE|SARI MURNI)\b", line, re.IGNORECASE)
-                if brand_match and "REF CP NO" not in line.upper():
-                    self.data["brand"] = brand_match.group(1).strip().upper()
-                    break
+                            share_disc_str = columns.get(row, layout.share_disc_header).replace(",", ".").strip()
+                            share_disc = float(share_disc_str) if share_disc_str and share_disc_str != "-" else 0
 
-    def parse_csv(self, csv_path):
-        current_table = None
-        headers = []
-        subheaders = []
-        table_rows = []
-        last_sku = None
-        last_uom = None
-        
-        with open(csv_path, 'r', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                if row and row[0] == "---":
-                    if table_rows:
-                        qty_header = None
-                        min_qty_header = None
-                        disc_header = None
-                        share_disc_header = None
-                        sku_header = None
-                        uom_header = None
-                        header_row = None
-                        subheader_row = None
-                        data_start_idx = 0
-                        is_sales_commitment = False
-
-                        print(f"Processing table: {table_rows}")
-                        for idx, table_row in enumerate(table_rows):
-                            table_row = [cell.strip().replace("\n", " ") if cell else "" for cell in table_row]
-                            if any(re.search(r"SALES\s*COMITMENT", cell, re.IGNORECASE) for cell in table_row):
-                                is_sales_commitment = True
-                                header_row = table_rows[0]
-                                subheader_row = table_rows[1] if len(table_rows) > 1 else None
-                                data_start_idx = 2
-                                break
-                            for cell in table_row:
-                                if re.search(r"(MIN\s*QTY\s*/\s*CTN|MIN\s*QTY|MINIMUM\s*QUANTITY)", cell, re.IGNORECASE):
-                                    min_qty_header = cell
-                                    header_row = table_row
-                                    data_start_idx = idx + 1
-                                    break
-                            for cell in table_row:
-                                if re.search(r"(DISC\s*%|DISCOUNT\s*%|DISCOUNT)", cell, re.IGNORECASE):
-                                    disc_header = cell
-                                    header_row = table_row
-                                    data_start_idx = idx + 1
-                                    break
-                            for cell in table_row:
-                                if re.search(r"(SHARE\s*DIST\s*%|SHARE\s*DISCOUNT\s*%|SHARE\s*%|SHARE)", cell, re.IGNORECASE):
-                                    share_disc_header = cell
-                                    header_row = table_row
-                                    data_start_idx = idx + 1
-                                    break
-                            for cell in table_row:
-                                if re.search(r"(QTY\s*IN\s*CTN|QUANTITY\s*IN\s*CTN|QTY/CTN|QUANTITY|QTY|TOTAL\s*QTY)", cell, re.IGNORECASE):
-                                    qty_header = cell
-                                    header_row = table_row
-                                    data_start_idx = idx + 1
-                                    break
-                            for cell in table_row:
-                                if re.search(r"(SKU|PRODUCT|ITEM|NAMA\s*PRODUK|PRODUCT\s*NAME|ITEM\s*DESCRIPTION)", cell, re.IGNORECASE):
-                                    sku_header = cell
-                                    header_row = table_row
-                                    data_start_idx = idx + 1
-                                    break
-                            for cell in table_row:
-                                if re.search(r"(UOM|UNIT|SATUAN|MEASURE)", cell, re.IGNORECASE):
-                                    uom_header = cell
-                                    header_row = table_row
-                                    data_start_idx = idx + 1
-                                    break
-                            for cell in table_row:
-                                if re.search(r"(NO|ID OUTLET|NAMA OUTLET)", cell, re.IGNORECASE):
-                                    if "NO" in table_row and "ID OUTLET" in table_row:
-                                        current_table = "OUTLET LIST"
-                                        header_row = table_row
-                                        data_start_idx = idx + 1
-                                        break
-                            if min_qty_header or qty_header or sku_header or uom_header or current_table:
-                                break
-
-                        if is_sales_commitment:
-                            current_table = "SALES COMMITMENT"
-                            headers = header_row if header_row else table_rows[0]
-                            subheaders = subheader_row if subheader_row else []
-                            print(f"Detected SALES COMMITMENT table with headers: {headers}")
-                            print(f"Subheaders: {subheaders}")
-                        elif min_qty_header or disc_header or share_disc_header:
-                            current_table = "STRATA DISCOUNT TABLE"
-                            headers = header_row if header_row else table_rows[0]
-                            self.data["strata_discounts"] = []
-                            print(f"Detected STRATA DISCOUNT TABLE with headers: {headers}")
-                        elif qty_header or sku_header:
-                            current_table = "SALES COMMITMENT"
-                            headers = header_row if header_row else table_rows[0]
-                            print(f"Detected SALES COMMITMENT table with headers: {headers}")
-                        elif current_table == "OUTLET LIST":
-                            headers = header_row
-                            print(f"Detected OUTLET LIST table with headers: {headers}")
-                        else:
-                            current_table = None
-                            # Fallback: Coba cari SKU, QTY, atau diskon di baris data (tanpa header yang jelas)
-                            for row in table_rows:
-                                for cell in row:
-                                    cell = cell.strip() if cell else ""
-                                    # Cari SKU
-                                    sku_match = re.search(
-                                        r"(MILA FLOUR BAG @1KG|MILA TEPUNG(?: \d+KG)?|TEPUNG MILA|FORTUNE (?:PREMIUM RICE|PALM OIL )?(?:PLP|PCH|JRG) @\d+(\.\d+)?[KL]T)", 
-                                        cell, 
-                                        re.IGNORECASE
-                                    )
-                                    if sku_match:
-                                        sku = sku_match.group(0)
-                                        found = False
-                                        for sku_entry in self.data["sku_data"]:
-                                            if sku_entry["sku"] == sku:
-                                                found = True
-                                                break
-                                        if not found:
-                                            self.data["sku_data"].append({
-                                                "sku": sku,
-                                                "qty_allocated": 0,
-                                                "uom": None,
-                                                "c_uom_id": None,
-                                                "strata_discounts": []
-                                            })
-                                        if not self.data["sku"]:
-                                            self.data["sku"] = sku
-                                        print(f"SKU found in table (no header): {sku}")
-                                    # Cari QTY
-                                    qty_match = re.search(r"\b\d+\s*(?:CTN|KG|LT|PCS)?\b", cell, re.IGNORECASE)
-                                    if qty_match:
-                                        qty_str = qty_match.group(0).strip()
-                                        try:
-                                            qty = int(re.search(r"\d+", qty_str).group(0))
-                                            if self.data["qty_allocated"] is None:
-                                                self.data["qty_allocated"] = qty
-                                            print(f"QTY found in table (no header): {qty}")
-                                        except Exception as e:
-                                            print(f"Error parsing QTY in table (no header): {str(e)}")
-                                    # Cari diskon
-                                    disc_match = re.search(r"\b\d+\.?\d*\s*%", cell, re.IGNORECASE)
-                                    if disc_match:
-                                        disc_str = disc_match.group(0).replace("%", "").strip()
-                                        try:
-                                            disc = float(disc_str)
-                                            if self.data["sku_data"]:
-                                                self.data["sku_data"][0]["strata_discounts"].append({
-                                                    "breakfrom": 1,
-                                                    "breakto": None,
-                                                    "disc": disc,
-                                                    "share_disc": 0
-                                                })
-                                            print(f"Discount found in table (no header): {disc}")
-                                        except Exception as e:
-                                            print(f"Error parsing discount in table (no header): {str(e)}")
-
-                        if current_table:
-                            for row in table_rows[data_start_idx:]:
-                                if current_table == "SALES COMMITMENT" and subheaders:
-                                    while len(subheaders) < len(row):
-                                        subheaders.append("")
-                                    row_data = dict(zip(subheaders, row))
-                                    row_data["SKU"] = row[0] if row else ""
+                            uom = self.find_uom(row, columns, layout)
+                            if uom:
+                                logger.debug("UOM found in STRATA DISCOUNT table: %s", uom)
+
+                            sku = self.find_sku(row, columns, layout)
+                            if sku:
+                                logger.debug("SKU found in STRATA DISCOUNT table: %s", sku)
+                                last_sku = sku
+                                last_uom = uom
+                            else:
+                                sku = last_sku if last_sku else self.data["sku"]
+                                uom = last_uom if last_uom else self.data["uom"]
+
+                            if uom and sku:
+                                sku_entry = self.sku_index.get(sku)
+                                if sku_entry is not None:
+                                    sku_entry.uom = uom
+                                    sku_entry.c_uom_id = UOM_MAPPING.get(uom, 1000000)
+                                    sku_entry.strata_discounts.append(Strata(min_qty, max_qty, disc, share_disc))
                                 else:
-                                    row_data = dict(zip(headers, row))
-
-                                if current_table == "SALES COMMITMENT":
-                                    qty_str = row_data.get(qty_header, "").strip() if qty_header else ""
-                                    if not qty_str:
-                                        for key, value in row_data.items():
-                                            if re.search(r"(QTY\s*IN\s*CTN|QUANTITY\s*IN\s*CTN|QTY/CTN|QUANTITY|QTY|TOTAL\s*QTY)", key, re.IGNORECASE):
-                                                qty_str = value.strip()
-                                                break
-                                    try:
-                                        if qty_str:
-                                            if '/' in qty_str:
-                                                num, denom = map(int, qty_str.split('/'))
-                                                qty = num if denom == 0 else num // denom
-                                            else:
-                                                qty = int(qty_str.replace('.', '')) if qty_str.replace('.', '').isdigit() else None
-                                        else:
-                                            qty = None
-                                    except Exception as e:
-                                        print(f"Error parsing QTY: {str(e)}")
-                                        qty = None
-
-                                    sku = row_data.get(sku_header, "").replace("\n", " ").strip() if sku_header else ""
-                                    if not sku:
-                                        for key, value in row_data.items():
-                                            if re.search(r"(SKU|PRODUCT|ITEM|NAMA\s*PRODUK|PRODUCT\s*NAME|ITEM\s*DESCRIPTION)", key, re.IGNORECASE):
-                                                sku = value.replace("\n", " ").strip()
-                                                break
-                                    if sku:
-                                        print(f"SKU found in SALES COMMITMENT table: {sku}")
-
-                                    uom = row_data.get(uom_header, "").strip() if uom_header else ""
-                                    if not uom:
-                                        for key, value in row_data.items():
-                                            if re.search(r"(UOM|UNIT|SATUAN|MEASURE)", key, re.IGNORECASE):
-                                                uom = value.strip().upper()
-                                                break
-                                    if not uom:
-                                        # Fallback: Cari UOM berdasarkan pola di baris
-                                        for value in row_data.values():
-                                            uom_match = re.search(r"\b(KG|LT|CTN|PCS)\b", value, re.IGNORECASE)
-                                            if uom_match:
-                                                uom = uom_match.group(0).upper()
-                                                break
-                                    if uom:
-                                        print(f"UOM found in SALES COMMITMENT table: {uom}")
-
-                                    if sku and qty is not None:
-                                        found = False
-                                        for sku_entry in self.data["sku_data"]:
-                                            if sku_entry["sku"] == sku:
-                                                sku_entry["qty_allocated"] = qty
-                                                if uom:
-                                                    sku_entry["uom"] = uom
-                                                    sku_entry["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
-                                                found = True
-                                                break
-                                        if not found:
-                                            self.data["sku_data"].append({
-                                                "sku": sku,
-                                                "qty_allocated": qty,
-                                                "uom": uom if uom else None,
-                                                "c_uom_id": UOM_MAPPING.get(uom, 1000000) if uom else None,
-                                                "strata_discounts": []
-                                            })
-                                        if self.data["qty_allocated"] is None:
-                                            self.data["qty_allocated"] = qty
-                                        if not self.data["sku"]:
-                                            self.data["sku"] = sku
-                                        if uom and not self.data["uom"]:
-                                            self.data["uom"] = uom
-                                            self.data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
-
-                                elif current_table == "STRATA DISCOUNT TABLE":
-                                    min_qty_str = row_data.get(min_qty_header, "").replace("'", "").strip()
-                                    
-                                    try:
-                                        if '/' in min_qty_str:
-                                            min_qty = int(min_qty_str.split('/')[0].strip())
-                                            max_qty = None
-                                        elif '-' in min_qty_str:
-                                            lower_str, upper_str = map(str.strip, min_qty_str.split('-'))
-                                            min_qty = int(lower_str) if lower_str.replace(',', '').isdigit() else 0
-                                            max_qty = int(upper_str) if upper_str.replace(',', '').isdigit() else 0
-                                        else:
-                                            min_qty = int(min_qty_str) if min_qty_str.replace(',', '').isdigit() else 0
-                                            max_qty = None
-
-                                        if min_qty > 0:
-                                            disc_str = row_data.get(disc_header, "").replace(",", ".").strip() if disc_header else ""
-                                            disc = float(disc_str) if disc_str else 0.0
-
-                                            share_disc_str = row_data.get(share_disc_header, "").replace(",", ".").strip() if share_disc_header else ""
-                                            share_disc = float(share_disc_str) if share_disc_str and share_disc_str != "-" else 0
-
-                                            uom = row_data.get(uom_header, "").strip() if uom_header else ""
-                                            if not uom:
-                                                for key, value in row_data.items():
-                                                    if re.search(r"(UOM|UNIT|SATUAN|MEASURE)", key, re.IGNORECASE):
-                                                        uom = value.strip().upper()
-                                                        break
-                                            if not uom:
-                                                # Fallback: Cari UOM berdasarkan pola di baris
-                                                for value in row_data.values():
-                                                    uom_match = re.search(r"\b(KG|LT|CTN|PCS)\b", value, re.IGNORECASE)
-                                                    if uom_match:
-                                                        uom = uom_match.group(0).upper()
-                                                        break
-                                            if uom:
-                                                print(f"UOM found in STRATA DISCOUNT table: {uom}")
-
-                                            sku = row_data.get(sku_header, "").replace("\n", " ").strip() if sku_header else ""
-                                            if not sku:
-                                                for key, value in row_data.items():
-                                                    if re.search(r"(SKU|PRODUCT|ITEM|NAMA\s*PRODUK|PRODUCT\s*NAME|ITEM\s*DESCRIPTION)", key, re.IGNORECASE):
-                                                        sku = value.replace("\n", " ").strip()
-                                                        break
-                                            if sku:
-                                                print(f"SKU found in STRATA DISCOUNT table: {sku}")
-                                                last_sku = sku
-                                                last_uom = uom
-                                            else:
-                                                sku = last_sku if last_sku else self.data["sku"]
-                                                uom = last_uom if last_uom else self.data["uom"]
-
-                                            if uom and sku:
-                                                found = False
-                                                for sku_entry in self.data["sku_data"]:
-                                                    if sku_entry["sku"] == sku:
-                                                        sku_entry["uom"] = uom
-                                                        sku_entry["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
-                                                        sku_entry["strata_discounts"].append({
-                                                            "breakfrom": min_qty,
-                                                            "breakto": max_qty,
-                                                            "disc": disc,
-                                                            "share_disc": share_disc
-                                                        })
-                                                        found = True
-                                                        break
-                                                if not found:
-                                                    self.data["sku_data"].append({
-                                                        "sku": sku,
-                                                        "uom": uom,
-                                                        "c_uom_id": UOM_MAPPING.get(uom, 1000000),
-                                                        "strata_discounts": [{
-                                                            "breakfrom": min_qty,
-                                                            "breakto": max_qty,
-                                                            "disc": disc,
-                                                            "share_disc": share_disc
-                                                        }],
-                                                        "qty_allocated": self.data["qty_allocated"] if self.data["qty_allocated"] is not None else 0
-                                                    })
-                                                if not self.data["sku"]:
-                                                    self.data["sku"] = sku
-                                                    self.data["uom"] = uom
-                                                    self.data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
-                                                    self.data["strata_discounts"] = [{
-                                                        "breakfrom": min_qty,
-                                                        "breakto": max_qty,
-                                                        "disc": disc,
-                                                        "share_disc": share_disc
-                                                    }]
-
-                                    except (ValueError, TypeError) as e:
-                                        print(f"Error parsing STRATA DISCOUNT TABLE: {str(e)}")
-                                        continue
-
-                                elif current_table == "OUTLET LIST":
-                                    outlet_id = row_data.get("ID OUTLET", "").strip()
-                                    outlet_name = row_data.get("NAMA OUTLET", "").strip()
-                                    print(f"Processing OUTLET LIST row - ID: {outlet_id}, Name: {outlet_name}")
-                                    if outlet_id and outlet_name:
-                                        self.data["outlets"].append({"c_bpartner_id": outlet_id, "name": outlet_name})
-
-                    current_table = None
-                    headers = []
-                    subheaders = []
-                    table_rows = []
-                    last_sku = None
-                    last_uom = None
-                    continue
-
-                table_rows.append(row)
+                                    self.add_sku_entry(SkuEntry(
+                                        sku,
+                                        qty_allocated=self.data["qty_allocated"] if self.data["qty_allocated"] is not None else 0,
+                                        uom=uom,
+                                        c_uom_id=UOM_MAPPING.get(uom, 1000000),
+                                        strata_discounts=[Strata(min_qty, max_qty, disc, share_disc)]
+                                    ))
+                                if not self.data["sku"]:
+                                    self.data["sku"] = sku
+                                    self.data["uom"] = uom
+                                    self.data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
+                                    self.data["strata_discounts"] = [Strata(min_qty, max_qty, disc, share_disc)]
+
+                    except (ValueError, TypeError) as e:
+                        logger.warning("Error parsing STRATA DISCOUNT TABLE: %s", e)
+                        continue
+
+                elif current_table == table_classifier.OUTLET_LIST:
+                    outlet_id = columns.get(row, "ID OUTLET").strip()
+                    outlet_name = columns.get(row, "NAMA OUTLET").strip()
+                    if debug:
+                        logger.debug("Processing OUTLET LIST row - ID: %s, Name: %s", outlet_id, outlet_name)
+                    if outlet_id and outlet_name:
+                        self.data["outlets"].append(outlet_id, outlet_name)
+
+    def find_sku(self, row, columns, layout):
+        sku = columns.get(row, layout.sku_header).replace("\n", " ").strip()
+        if not sku:
+            value = columns.find(row, table_classifier.SKU_PATTERN)
+            if value is not None:
+                sku = value.replace("\n", " ").strip()
+        return sku
+
+    def find_uom(self, row, columns, layout):
+        uom = columns.get(row, layout.uom_header).strip()
+        if not uom:
+            value = columns.find(row, table_classifier.UOM_PATTERN)
+            if value is not None:
+                uom = value.strip().upper()
+        if not uom:
+            # Fallback: Cari UOM berdasarkan pola di baris
+            for value in columns.values(row):
+                uom_match = UOM_VALUE_PATTERN.search(value)
+                if uom_match:
+                    uom = uom_match.group(0).upper()
+                    break
+        return uom
+
+    def parse_headerless_table(self, table_rows):
+        # Fallback: Coba cari SKU, QTY, atau diskon di baris data (tanpa header yang jelas)
+        for row in table_rows:
+            for cell in row:
+                cell = cell.strip() if cell else ""
+                # Cari SKU
+                sku_match = text_rules.MULTI_SKU_RULE.pattern.search(cell)
+                if sku_match:
+                    sku = sku_match.group(0)
+                    if sku not in self.sku_index:
+                        self.add_sku_entry(SkuEntry(sku))
+                    if not self.data["sku"]:
+                        self.data["sku"] = sku
+                    logger.debug("SKU found in table (no header): %s", sku)
+                # Cari QTY
+                qty_match = QTY_VALUE_PATTERN.search(cell)
+                if qty_match:
+                    qty_str = qty_match.group(0).strip()
+                    try:
+                        qty = int(DIGITS_PATTERN.search(qty_str).group(0))
+                        if self.data["qty_allocated"] is None:
+                            self.data["qty_allocated"] = qty
+                        logger.debug("QTY found in table (no header): %s", qty)
+                    except Exception as e:
+                        logger.warning("Error parsing QTY in table (no header): %s", e)
+                # Cari diskon
+                disc_match = DISC_VALUE_PATTERN.search(cell)
+                if disc_match:
+                    disc_str = disc_match.group(0).replace("%", "").strip()
+                    try:
+                        disc = float(disc_str)
+                        if self.data["sku_data"]:
+                            self.data["sku_data"][0].strata_discounts.append(Strata(1, None, disc, 0))
+                        logger.debug("Discount found in table (no header): %s", disc)
+                    except Exception as e:
+                        logger.warning("Error parsing discount in table (no header): %s", e)
+
+    def validate_text_fields(self):
+        # Field yang hanya bisa berasal dari teks; dicek sebelum parse tabel
+        if not self.data["nomor"]:
+            raise ValueError("Nomor CP tidak ditemukan di dokumen.")
+
+        if not self.data["sub_promo_type"]:
+            raise ValueError("Sub promo type tidak ditemukan di dokumen.")
+
+        if not self.data["valid_from"] or not self.data["valid_to"]:
+            raise ValueError("Periode valid_from atau valid_to tidak ditemukan di dokumen.")
 
+        if not self.data["area_code"] or not self.data["area_name"] or not self.data["ad_org_id"]:
+            raise ValueError("Area code atau informasi area tidak ditemukan di dokumen.")
+
+    @metrics.timed("validate_data")
+    @tracing.traced("validate_data")
     def validate_data(self):
         if not self.data["nomor"]:
             raise ValueError("Nomor CP tidak ditemukan di dokumen.")
@@ -514,7 +356,7 @@ class MultiDocumentProcessor:
             raise ValueError("Periode valid_from atau valid_to tidak ditemukan di dokumen.")
         
         if self.data["qty_allocated"] is None:
-            print("Warning: QTY IN CTN tidak ditemukan di dokumen. Menggunakan nilai default.")
+            logger.warning("QTY IN CTN tidak ditemukan di dokumen. Menggunakan nilai default.")
             self.data["qty_allocated"] = 1
         
         if not self.data["vendor_cashback"]:
@@ -533,47 +375,61 @@ class MultiDocumentProcessor:
             )
             if sku_match:
                 sku = sku_match.group(0).replace("_", " ").strip()
-                self.data["sku_data"].append({
-                    "sku": sku,
-                    "qty_allocated": self.data["qty_allocated"],
-                    "uom": "KG",
-                    "c_uom_id": 1000000,
-                    "strata_discounts": []
-                })
+                self.add_sku_entry(SkuEntry(sku, qty_allocated=self.data["qty_allocated"], uom="KG", c_uom_id=1000000))
                 self.data["sku"] = sku
-                print(f"SKU extracted from filename: {sku}")
+                logger.debug("SKU extracted from filename: %s", sku)
             else:
                 raise ValueError("SKU tidak ditemukan di dokumen.")
         
         if not self.data["uom"] or not self.data["c_uom_id"]:
-            print("Warning: UOM tidak ditemukan di dokumen. Menggunakan nilai default.")
+            logger.warning("UOM tidak ditemukan di dokumen. Menggunakan nilai default.")
             self.data["uom"] = "KG"
             self.data["c_uom_id"] = 1000000
 
         # Pastikan setiap SKU memiliki strata_discounts
         for sku_entry in self.data["sku_data"]:
-            if not sku_entry["strata_discounts"]:
-                print(f"Warning: Strata discounts tidak ditemukan untuk SKU {sku_entry['sku']}. Menggunakan nilai default.")
-                sku_entry["strata_discounts"].append({
-                    "breakfrom": 1,
-                    "breakto": None,
-                    "disc": 0.0,
-                    "share_disc": 0.0
-                })
+            if not sku_entry.strata_discounts:
+                logger.warning("Strata discounts tidak ditemukan untuk SKU %s. Menggunakan nilai default.", sku_entry.sku)
+                sku_entry.strata_discounts.append(Strata(1, None, 0.0, 0.0))
+
+    def parse_extracted(self, pdf_path, csv_path, cached=None):
+        extract_fn = self.extract_text_and_tables
+        if PDF_TEXT_FIRST and not PDF_EXCLUDE_TABLE_ROWS:
+            extract_fn = self.extract_text_first
+        text, tables = cached or extraction_cache.get_or_extract(pdf_path, extract_fn, variant=EXTRACTION_VARIANT)
+        if not text and not tables:
+            raise ValueError("Dokumen kosong atau tidak dapat dibaca.")
 
-    def process(self, pdf_path, csv_path):
+        logger.debug("Extracted tables: %s", tables)
+        # CSV hanya ditulis sebagai artefak debug, parse_csv membaca tabel langsung dari memori
+        if csv_path and SAVE_DEBUG_CSV:
+            self.save_tables_to_csv(tables, csv_path)
+        if not self.text_parsed:
+            self.parse_text(text)
+            self.validate_text_fields()
+        self.parse_csv(tables)
+
+    def parse_stream(self, pdf_path, csv_path):
+        # Miss cache di mode streaming: halaman diproses satu per satu tanpa mengisi cache
+        pipeline.stream_document(
+            self,
+            pdf_path,
+            text_rules.MULTI_DOCUMENT_RULES,
+            csv_path=csv_path if csv_path and SAVE_DEBUG_CSV else None,
+            text_first=PDF_TEXT_FIRST and not PDF_EXCLUDE_TABLE_ROWS
+        )
+
+    def process(self, pdf_path, csv_path=None):
         self.current_pdf_path = pdf_path  # Simpan pdf_path untuk digunakan di validate_data
         self.reset_data()
+        self.text_parsed = False
         
-        print(f"Processing file: {pdf_path}")
-        text, tables = self.extract_text_and_tables(pdf_path)
-        if not text and not tables:
-            raise ValueError("Dokumen kosong atau tidak dapat dibaca.")
-        
-        print(f"Extracted tables: {tables}")
-        self.save_tables_to_csv(tables, csv_path)
-        self.parse_text(text)
-        self.parse_csv(csv_path)
+        logger.info("Processing file: %s", pdf_path)
+        cached = extraction_cache.lookup(pdf_path, EXTRACTION_VARIANT) if PDF_STREAMING else None
+        if PDF_STREAMING and cached is None:
+            self.parse_stream(pdf_path, csv_path)
+        else:
+            self.parse_extracted(pdf_path, csv_path, cached)
         
         self.validate_data()
         
@@ -585,6 +441,8 @@ class MultiDocumentProcessor:
             
         return self.data
 
+    @metrics.timed("generate_json")
+    @tracing.traced("generate_json")
     def generate_json(self, list_customer):
         self.validate_data()
 
@@ -647,8 +505,8 @@ class MultiDocumentProcessor:
 
             # Hitung nilai maksimum dari breakfrom untuk menentukan breakto secara dinamis
             max_breakfrom = max(
-                (strata["breakfrom"] for strata in sku_entry["strata_discounts"]),
-                default=sku_entry["qty_allocated"] if sku_entry["qty_allocated"] > 0 else 1
+                (strata.breakfrom for strata in sku_entry.strata_discounts),
+                default=sku_entry.qty_allocated if sku_entry.qty_allocated > 0 else 1
             )
             default_breakto = max_breakfrom if max_breakfrom > 0 else 1
 
@@ -664,12 +522,12 @@ class MultiDocumentProcessor:
                 "name": break_name,
                 "requirementtype": "MS",
                 "productselection": "IOP",
-                "c_uom_id": sku_entry["c_uom_id"],
-                "m_product_id": sku_entry["sku"],
+                "c_uom_id": sku_entry.c_uom_id,
+                "m_product_id": sku_entry.sku,
                 "m_product_category_id": None,
                 "budgettype": "GB",
                 "budgetcalculation": "QTY",
-                "qtyallocated": sku_entry["qty_allocated"],
+                "qtyallocated": sku_entry.qty_allocated,
                 "breakvalue": 0,
                 "breakdiscount": 0,
                 "isincludingsubordinate": "N",
@@ -692,7 +550,7 @@ class MultiDocumentProcessor:
             }
 
             # Vendor Cashback (DISC %)
-            if "strata_discounts" in sku_entry:
+            if sku_entry.strata_discounts is not None:
                 vendor_break = base_break.copy()
                 vendor_break["seqno"] = vendor_seqno
                 vendor_break["isshareddiscount"] = "N"
@@ -700,26 +558,26 @@ class MultiDocumentProcessor:
                 vendor_break["list_line"] = []
                 
                 # Tambahkan semua entri dari strata_discounts
-                sorted_strata = sorted(sku_entry["strata_discounts"], key=lambda x: x["breakfrom"])
+                sorted_strata = sorted(sku_entry.strata_discounts, key=lambda x: x.breakfrom)
                 
                 for i, strata in enumerate(sorted_strata):
-                    if strata["breakto"]:
-                        current_breakvalueto = strata["breakto"]
+                    if strata.breakto:
+                        current_breakvalueto = strata.breakto
                     elif i < len(sorted_strata) - 1:
-                        next_breakfrom = sorted_strata[i + 1]["breakfrom"]
+                        next_breakfrom = sorted_strata[i + 1].breakfrom
                         current_breakvalueto = next_breakfrom - 1
                     else:
                         # Untuk entri terakhir, gunakan qtyallocated
-                        current_breakvalueto = sku_entry["qty_allocated"]
+                        current_breakvalueto = sku_entry.qty_allocated
 
                     vendor_break["list_line"].append({
                         "m_discountschemabreak_id": 0,
                         "uns_dsbreakline_id": 0,
                         "name": break_name,
-                        "breakvalue": strata["breakfrom"],
+                        "breakvalue": strata.breakfrom,
                         "breakvalueto": current_breakvalueto,
-                        "qtyallocated": sku_entry["qty_allocated"],
-                        "breakdiscount": strata["disc"],
+                        "qtyallocated": sku_entry.qty_allocated,
+                        "breakdiscount": strata.disc,
                         "seconddiscount": 0,
                         "thirddiscount": 0,
                         "fourthdiscount": 0,
@@ -731,32 +589,32 @@ class MultiDocumentProcessor:
                 all_breaks.append(vendor_break)
 
             # Share Discount (SHARE DIST %)
-            if "strata_discounts" in sku_entry:
+            if sku_entry.strata_discounts is not None:
                 share_break = base_break.copy()
                 share_break["seqno"] = share_seqno
                 share_break["isshareddiscount"] = "Y"
                 share_break["isvendorcashback"] = "N"
                 share_break["list_line"] = []
                 
-                sorted_strata = sorted(sku_entry["strata_discounts"], key=lambda x: x["breakfrom"])
+                sorted_strata = sorted(sku_entry.strata_discounts, key=lambda x: x.breakfrom)
                 
                 # Untuk list_break terakhir per SKU (isshareddiscount: "Y"), hanya ambil satu entri
                 # Pilih entri pertama dengan share_disc > 0, atau entri pertama jika semua share_disc = 0
-                selected_strata = next((strata for strata in sorted_strata if strata["share_disc"] > 0), sorted_strata[0])
+                selected_strata = next((strata for strata in sorted_strata if strata.share_disc > 0), sorted_strata[0])
                 
                 # Aturan khusus untuk SKU @10KG dan share discount 0.5%
-                if sku_entry["sku"].endswith("@10KG") and selected_strata["share_disc"] == 0.5:
-                    current_breakvalue = selected_strata["breakfrom"]
+                if sku_entry.sku.endswith("@10KG") and selected_strata.share_disc == 0.5:
+                    current_breakvalue = selected_strata.breakfrom
                     current_breakvalueto = 4  # Aturan khusus: breakvalueto = 4
                 else:
                     # Jika breakdiscount adalah 1%, paksa breakvalue 1 dan breakvalueto 99
-                    if selected_strata["share_disc"] == 1:
+                    if selected_strata.share_disc == 1:
                         current_breakvalue = 1
                         current_breakvalueto = 99
                     else:
-                        current_breakvalue = selected_strata["breakfrom"]
-                        if selected_strata["breakto"]:
-                            current_breakvalueto = selected_strata["breakto"]
+                        current_breakvalue = selected_strata.breakfrom
+                        if selected_strata.breakto:
+                            current_breakvalueto = selected_strata.breakto
                         else:
                             # Tentukan breakvalueto secara dinamis berdasarkan sub_promo_type
                             if self.data["sub_promo_type"] == "STRATA DISCOUNT":
@@ -772,8 +630,8 @@ class MultiDocumentProcessor:
                     "name": break_name,
                     "breakvalue": current_breakvalue,
                     "breakvalueto": current_breakvalueto,
-                    "qtyallocated": sku_entry["qty_allocated"],
-                    "breakdiscount": selected_strata["share_disc"],
+                    "qtyallocated": sku_entry.qty_allocated,
+                    "breakdiscount": selected_strata.share_disc,
                     "seconddiscount": 0,
                     "thirddiscount": 0,
                     "fourthdiscount": 0,
@@ -788,27 +646,172 @@ class MultiDocumentProcessor:
         json_data["list_break"] = sorted(all_breaks, key=lambda x: x["seqno"])
         return json_data
     
-def process_multiple_files(files):
+@tracing.traced("process_document")
+def process_document(pdf_path, csv_path, page_workers=PDF_EXTRACT_WORKERS):
+    # Tahap per dokumen, tanpa state bersama sehingga aman dijalankan di proses lain
+    processor = MultiDocumentProcessor(page_workers=page_workers)
+    try:
+        with profiling.profile("document", [pdf_path], lambda: [processor.data["nomor"]]):
+            processor.process(pdf_path, csv_path)
+        metrics.inc("pdf_documents_total")
+        metrics.inc("pdf_outlets_total", len(processor.data["outlets"]))
+    except Exception as e:
+        metrics.count_failure(e)
+        return None, str(e)
+    finally:
+        # Bisa berjalan di proses pool batch: kirim metrik sebelum proses kembali idle
+        metrics.flush()
+    return processor, None
+
+BATCH_MODES = ("all", "fail_fast", "keep_going")
+
+def scan_header(pdf_path, pages=HEADER_SCAN_PAGES):
+    # Baca nomor, brand dan area dari teks halaman awal saja, tanpa ekstraksi tabel
+    processor = MultiDocumentProcessor()
+    text = extraction.extract_header_text(pdf_path, pages)
+    text_rules.HEADER_RULES.parse(processor, text.split('\n'))
+    return {
+        "nomor": processor.data["nomor"],
+        "brand": processor.data["brand"],
+        "area_code": processor.data["area_code"]
+    }
+
+@tracing.traced("header_scan")
+def check_batch_headers(files):
+    # Tolak batch lebih awal hanya jika konflik pasti; field yang tidak terbaca di header
+    # diserahkan ke validasi setelah dokumen diproses penuh
+    brands = set()
+    nomors = set()
+    for file in files:
+        try:
+            header = scan_header(file["pdf_path"])
+        except Exception as e:
+            logger.error("Header scan failed for %s: %s", file['filename'], e)
+            continue
+        logger.debug("Header scan %s: %s", file['filename'], header)
+        if header["brand"]:
+            brands.add(header["brand"])
+            if len(brands) > 1:
+                raise ValueError("Semua dokumen harus untuk brand yang sama.")
+        if header["nomor"]:
+            if header["nomor"] in nomors:
+                raise ValueError("Semua dokumen harus memiliki nomor CP yang berbeda.")
+            nomors.add(header["nomor"])
+
+class BatchCheck:
+    # Pemeriksaan fail-fast yang dijalankan setiap kali satu dokumen selesai
+    def __init__(self):
+        self.brand = None
+        self.nomors = set()
+
+    def check(self, file, processor, error):
+        if error is not None:
+            raise ValueError(f"Error processing {file['filename']}: {error}")
+        data = processor.data
+        if self.brand is None:
+            self.brand = data["brand"]
+        elif data["brand"] != self.brand:
+            raise ValueError("Semua dokumen harus untuk brand yang sama.")
+        if data["nomor"] in self.nomors:
+            raise ValueError("Semua dokumen harus memiliki nomor CP yang berbeda.")
+        self.nomors.add(data["nomor"])
+
+def process_documents(files, fail_fast=False, store=None, keys=None):
+    # Hasil dikembalikan sesuai urutan input, bukan urutan selesai.
+    # store/keys: hasil tersimpan dari batch sebelumnya (mode keep_going) dipakai ulang.
+    results = [None] * len(files)
+    check = BatchCheck() if fail_fast else None
+
+    pending = []
+    for idx, file in enumerate(files):
+        processor = store.get(keys[idx]) if store is not None else None
+        if processor is None:
+            pending.append(idx)
+            continue
+        logger.info("Reusing stored result for %s", file['filename'])
+        results[idx] = (processor, None)
+        if check is not None:
+            check.check(file, processor, None)
+
+    def finish(idx, result):
+        results[idx] = result
+        processor, error = result
+        if store is not None and error is None:
+            store.put(keys[idx], processor)
+        if check is not None:
+            check.check(files[idx], processor, error)
+
+    workers = min(BATCH_WORKERS, len(pending))
+    if workers <= 1:
+        for idx in pending:
+            finish(idx, process_document(files[idx]["pdf_path"], files[idx].get("csv_path")))
+        return results
+
+    # Fail-fast: dokumen yang belum mulai dibatalkan, yang sedang berjalan dihentikan lewat event
+    # yang dicek setiap halaman (proses pool tidak dimatikan paksa)
+    context = extraction.pool_context()
+    cancel = context.Event() if check is not None else None
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=extraction.init_pool_worker, initargs=(cancel,))
+    try:
+        # Ekstraksi per halaman dimatikan di dalam pool agar tidak membuat pool bertingkat.
+        # Toggle log DEBUG, profil dan trace batch ikut dikirim karena context var tidak menyeberang proses.
+        debug = debug_enabled()
+        profiled = profiling.active()
+        trace_id = tracing.current_id()
+        futures = {
+            pool.submit(
+                call_with_debug, debug, profiling.call_with_profile, profiled, tracing.call_traced, trace_id, "batch-pool",
+                process_document, files[idx]["pdf_path"], files[idx].get("csv_path"), 0
+            ): idx
+            for idx in pending
+        }
+        for future in as_completed(futures):
+            finish(futures[future], future.result())
+    except BaseException:
+        if cancel is not None:
+            cancel.set()
+        raise
+    finally:
+        # Selalu menunggu proses pool selesai: PDF input dihapus pemanggil setelah ini
+        pool.shutdown(wait=True, cancel_futures=True)
+    return results
+
+def process_multiple_files(files, mode=None):
+    # Profil batch mencakup seluruh batch di proses ini; dokumen yang jalan di pool diprofil per dokumen
     processors = []
-    temp_files = []
+    with profiling.profile("batch", [file["pdf_path"] for file in files], lambda: [p["data"]["nomor"] for p in processors]):
+        return _process_multiple_files(files, mode, processors)
+
+@tracing.traced("process_batch")
+def _process_multiple_files(files, mode, processors):
+    mode = mode or BATCH_MODE
+    temp_files = [(file["pdf_path"], file.get("csv_path")) for file in files]
     errors = []
 
     try:
-        # Proses setiap file
-        for file in files:
-            pdf_path = file["pdf_path"]
-            csv_path = file["csv_path"]
-            processor = MultiDocumentProcessor()
-            try:
-                data = processor.process(pdf_path, csv_path)
-                processors.append({
-                    "data": data,
-                    "filename": file["filename"],
-                    "processor": processor
-                })
-            except Exception as e:
-                errors.append(f"Error processing {file['filename']}: {str(e)}")
-            temp_files.append((pdf_path, csv_path))
+        if mode not in BATCH_MODES:
+            raise ValueError(f"Mode batch tidak dikenal: {mode}")
+
+        if BATCH_HEADER_SCAN and len(files) > 1:
+            check_batch_headers(files)
+
+        store = None
+        keys = None
+        if mode == "keep_going":
+            store = batch_results.get_batch_result_store()
+            keys = [store.key_for(file["pdf_path"], file["filename"]) for file in files]
+
+        # Proses setiap file (paralel per dokumen)
+        results = process_documents(files, fail_fast=mode == "fail_fast", store=store, keys=keys)
+        for file, (processor, error) in zip(files, results):
+            if error is not None:
+                errors.append(f"Error processing {file['filename']}: {error}")
+                continue
+            processors.append({
+                "data": processor.data,
+                "filename": file["filename"],
+                "processor": processor
+            })
 
         if errors:
             raise ValueError("\n".join(errors))
@@ -844,6 +847,23 @@ def process_multiple_files(files):
                 list_customer = outlets
                 break  # Ambil daftar outlet dari dokumen pertama yang memiliki outlets
 
+        # Mode outlet bersama: daftar outlet ditulis sekali, JSON per nomor hanya menyimpan referensinya
+        outlet_ref = None
+        if OUTLET_ARTIFACTS and list_customer:
+            outlet_ref = outputs.save_outlet_artifact(
+                {
+                    "m_discountschema_id": 0,
+                    "uns_discount_customer_id": 0,
+                    "m_discountschemabreak_id": 0,
+                    "ad_org_id": 0,
+                    "c_bpartner_id": c_bpartner_id,
+                    "name": name
+                }
+                for c_bpartner_id, name in list_customer
+            )
+            logger.info("Shared outlet list: %s", outlet_ref)
+            list_customer = []
+
         # Format list_customer untuk JSON
         list_customer_formatted = [
             {
@@ -851,27 +871,38 @@ def process_multiple_files(files):
                 "uns_discount_customer_id": 0,
                 "m_discountschemabreak_id": 0,
                 "ad_org_id": 0,
-                "c_bpartner_id": outlet["c_bpartner_id"],
-                "name": outlet["name"],
+                "c_bpartner_id": c_bpartner_id,
+                "name": name,
                 "isactive": "Y"
             }
-            for outlet in list_customer
+            for c_bpartner_id, name in list_customer
         ]
 
-        # Buat JSON untuk setiap dokumen dan kembalikan pasangan (json_data, nomor)
+        # Buat JSON untuk setiap dokumen dan kembalikan (json_data, nomor, field untuk index output)
         json_outputs = []
         for p in processors:
             processor = p["processor"]
             nomor = p["data"]["nomor"]
             json_data = processor.generate_json(list_customer_formatted)
-            json_outputs.append((json_data, nomor))
+            if outlet_ref is not None:
+                json_data = outputs.share_outlets(json_data, outlet_ref)
+            json_outputs.append((json_data, nomor, output_index.parsed_fields(p["data"])))
+
+        # Batch selesai, hasil tersimpan tidak diperlukan lagi
+        if store is not None:
+            store.discard(keys)
 
         return json_outputs
 
+    except Exception as e:
+        metrics.count_failure(e, "pdf_batch_failures_total")
+        raise
+
     finally:
         # Hapus file sementara
         for pdf_path, csv_path in temp_files:
             if os.path.exists(pdf_path):
                 os.remove(pdf_path)
-            if os.path.exists(csv_path):
+            # CSV debug sengaja dipertahankan untuk diperiksa
+            if csv_path and not SAVE_DEBUG_CSV and os.path.exists(csv_path):
                 os.remove(csv_path)
\ No newline at end of file
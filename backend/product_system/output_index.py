@@ -0,0 +1,265 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from utils.config import OUTPUT_INDEX_PATH, AREA_MAPPING
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# ad_orgtrx_id di list_org -> kode area
+AREA_BY_ORG_ID = {area["ad_org_id"]: area_code for area_code, area in AREA_MAPPING.items()}
+
+COLUMNS = (
+    "nomor", "name", "brand", "sub_promo_type", "validfrom", "validto", "area_code", "area_name",
+    "break_count", "outlet_count", "outlet_ref", "size", "mtime"
+)
+
+SCHEMA_VERSION = 2
+
+LIST_LIMIT = 50
+LIST_MAX_LIMIT = 500
+
+
+def parsed_fields(data):
+    # brand/sub_promo_type untuk filter diambil dari hasil parse processor, bukan dari name
+    return {"brand": data.get("brand"), "sub_promo_type": data.get("sub_promo_type")}
+
+
+def split_name(name, area_name, known_brands=()):
+    # Hanya untuk output yang diindeks tanpa hasil parse (file lama): name dari generate_json
+    # "{brand} {sub_promo_type} {area_name}" dipecah memakai brand yang sudah ada di index
+    name = (name or "").strip()
+    if area_name and name.endswith(area_name):
+        name = name[:-len(area_name)].strip()
+    if not name:
+        return {"brand": None, "sub_promo_type": None}
+    for brand in sorted(known_brands, key=len, reverse=True):
+        if name == brand or name.startswith(brand + " "):
+            return {"brand": brand, "sub_promo_type": name[len(brand):].strip() or None}
+    brand, _, sub_promo_type = name.partition(" ")
+    return {"brand": brand, "sub_promo_type": sub_promo_type.strip() or None}
+
+
+def summarize(json_data):
+    list_org = json_data.get("list_org") or [{}]
+    area_code = AREA_BY_ORG_ID.get(list_org[0].get("ad_orgtrx_id"))
+    area_name = AREA_MAPPING[area_code]["area_name"] if area_code else None
+    outlet_ref = None
+    if "list_customer_ref" in json_data:
+        outlet_count = json_data["list_customer_ref"]["count"]
+        outlet_ref = json_data["list_customer_ref"]["sha256"]
+    else:
+        outlet_count = len(json_data.get("list_customer") or [])
+    return {
+        "name": json_data.get("name"),
+        "validfrom": json_data.get("validfrom"),
+        "validto": json_data.get("validto"),
+        "area_code": area_code,
+        "area_name": area_name,
+        "break_count": len(json_data.get("list_break") or []),
+        "outlet_count": outlet_count,
+        "outlet_ref": outlet_ref
+    }
+
+
+class OutputIndex:
+    # Ringkasan per file JSON output (bukan isinya) untuk halaman index, disimpan di SQLite
+    # (mode WAL) supaya sama di semua worker gunicorn. size/mtime dipakai untuk mendeteksi
+    # file yang berubah di luar aplikasi.
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outputs (
+                    nomor TEXT PRIMARY KEY,
+                    name TEXT,
+                    brand TEXT,
+                    sub_promo_type TEXT,
+                    validfrom TEXT,
+                    validto TEXT,
+                    area_code TEXT,
+                    area_name TEXT,
+                    break_count INTEGER NOT NULL,
+                    outlet_count INTEGER NOT NULL,
+                    outlet_ref TEXT,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    indexed_at REAL NOT NULL
+                )
+            """)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                # Index versi lama belum punya brand/sub_promo_type/outlet_ref: tambah kolom, lalu
+                # paksa semua baris diindeks ulang oleh sync()
+                existing = {row["name"] for row in conn.execute("PRAGMA table_info(outputs)")}
+                for column in ("brand", "sub_promo_type", "outlet_ref"):
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE outputs ADD COLUMN {column} TEXT")
+                        conn.execute("UPDATE outputs SET size = -1")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outputs_mtime ON outputs (mtime, nomor)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outputs_brand ON outputs (brand, mtime)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outputs_area ON outputs (area_code, mtime)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outputs_sub_promo_type ON outputs (sub_promo_type, mtime)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outputs_validity ON outputs (validfrom, validto)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outputs_outlet_ref ON outputs (outlet_ref)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.row_factory = sqlite3.Row
+        return closing(conn)
+
+    def record(self, nomor, json_data, json_path, fields=None):
+        # fields: parsed_fields() dari processor yang membuat JSON ini (save_json_output)
+        stat = os.stat(json_path)
+        summary = summarize(json_data)
+        summary.update(fields if fields is not None else self.stored_fields(nomor, summary))
+        summary.update(nomor=nomor, size=stat.st_size, mtime=stat.st_mtime)
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO outputs ({', '.join(COLUMNS)}, indexed_at) "
+                f"VALUES ({', '.join('?' for _ in COLUMNS)}, ?)",
+                [summary[column] for column in COLUMNS] + [time.time()]
+            )
+        return summary
+
+    def stored_fields(self, nomor, summary):
+        # Diindeks ulang tanpa processor (sync/summaries, file berubah di luar aplikasi): nilai yang
+        # sudah tersimpan dipakai lagi; output yang belum pernah diindeks dipecah dari name
+        with self._connect() as conn:
+            row = conn.execute("SELECT brand, sub_promo_type FROM outputs WHERE nomor = ?", (nomor,)).fetchone()
+            if row is not None and row["brand"]:
+                return {"brand": row["brand"], "sub_promo_type": row["sub_promo_type"]}
+            known_brands = [
+                row["brand"] for row in conn.execute("SELECT DISTINCT brand FROM outputs WHERE brand IS NOT NULL")
+            ]
+        return split_name(summary["name"], summary["area_name"], known_brands)
+
+    def remove(self, nomor):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM outputs WHERE nomor = ?", (nomor,))
+
+    def outlet_refs(self):
+        # SHA-256 file outlet bersama yang masih dipakai setidaknya satu output
+        with self._connect() as conn:
+            rows = conn.execute("SELECT DISTINCT outlet_ref FROM outputs WHERE outlet_ref IS NOT NULL").fetchall()
+        return {row["outlet_ref"] for row in rows}
+
+    def get_many(self, nomors):
+        if not nomors:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM outputs WHERE nomor IN ({', '.join('?' for _ in nomors)})",
+                list(nomors)
+            ).fetchall()
+        return {row["nomor"]: dict(row) for row in rows}
+
+    def search(self, brand=None, area=None, sub_promo_type=None, valid_from=None, valid_to=None, cursor=None, limit=LIST_LIMIT):
+        # Urut terbaru dulu (mtime, nomor); cursor = posisi baris terakhir halaman sebelumnya.
+        # valid_from/valid_to: output yang periodenya beririsan dengan rentang tersebut (YYYYMMDD).
+        limit = max(1, min(limit, LIST_MAX_LIMIT))
+        where = []
+        params = []
+        if brand:
+            where.append("brand = ?")
+            params.append(brand.upper())
+        if area:
+            where.append("(area_code = ? OR area_name = ?)")
+            params.extend([area, area.upper()])
+        if sub_promo_type:
+            where.append("sub_promo_type = ?")
+            params.append(sub_promo_type.upper())
+        if valid_from:
+            where.append("validto >= ?")
+            params.append(valid_from)
+        if valid_to:
+            where.append("validfrom <= ?")
+            params.append(valid_to)
+        if cursor:
+            cursor_mtime, cursor_nomor = decode_cursor(cursor)
+            where.append("(mtime < ? OR (mtime = ? AND nomor < ?))")
+            params.extend([cursor_mtime, cursor_mtime, cursor_nomor])
+
+        query = f"SELECT {', '.join(COLUMNS)} FROM outputs"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY mtime DESC, nomor DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._connect() as conn:
+            rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1])
+        return rows, next_cursor
+
+    def sync(self, json_folder):
+        # Samakan index dengan isi folder sekali (saat aplikasi start): file baru/berubah diindeks,
+        # baris yang filenya sudah hilang dihapus
+        with self._connect() as conn:
+            indexed = {row["nomor"]: (row["size"], row["mtime"]) for row in conn.execute("SELECT nomor, size, mtime FROM outputs")}
+        seen = set()
+        for entry in os.scandir(json_folder):
+            if not entry.is_file() or not entry.name.endswith(".json"):
+                continue
+            nomor = entry.name[:-len(".json")]
+            seen.add(nomor)
+            stat = entry.stat()
+            if indexed.get(nomor) == (stat.st_size, stat.st_mtime):
+                continue
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as json_file:
+                    self.record(nomor, json.load(json_file), entry.path)
+            except Exception as e:
+                logger.error("Error indexing JSON file %s: %s", entry.path, e)
+        stale = [nomor for nomor in indexed if nomor not in seen]
+        if stale:
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM outputs WHERE nomor = ?", [(nomor,) for nomor in stale])
+
+    def summaries(self, nomors, json_folder):
+        # Ringkasan untuk nomor yang filenya ada. File yang belum terindeks (output lama) atau
+        # berubah sejak diindeks dibaca sekali lalu diindeks ulang; sisanya cukup os.stat.
+        indexed = self.get_many(nomors)
+        summaries = {}
+        for nomor in nomors:
+            json_path = os.path.join(json_folder, f"{nomor}.json")
+            try:
+                stat = os.stat(json_path)
+            except FileNotFoundError:
+                if nomor in indexed:
+                    self.remove(nomor)
+                continue
+            summary = indexed.get(nomor)
+            if summary is None or summary["size"] != stat.st_size or summary["mtime"] != stat.st_mtime:
+                with open(json_path, 'r', encoding='utf-8') as json_file:
+                    summary = self.record(nomor, json.load(json_file), json_path)
+            summaries[nomor] = summary
+        return summaries
+
+
+def encode_cursor(row):
+    return f"{row['mtime']!r}|{row['nomor']}"
+
+
+def decode_cursor(cursor):
+    mtime, separator, nomor = cursor.partition("|")
+    if not separator:
+        raise ValueError("Cursor tidak valid.")
+    return float(mtime), nomor
+
+
+_index = None
+
+
+def get_output_index():
+    global _index
+    if _index is None:
+        _index = OutputIndex(OUTPUT_INDEX_PATH)
+    return _index
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from utils.config import JSON_FOLDER, JSON_OUTPUT_INDENT, OUTLET_FOLDER
+from product_system import metrics, tracing
+from product_system.output_index import get_output_index
+
+# List yang bisa berisi puluhan ribu entri, ditulis per entri
+STREAMED_KEYS = ("list_customer", "list_break")
+
+# Pengganti list_customer di JSON yang memakai daftar outlet bersama
+OUTLET_REF_KEY = "list_customer_ref"
+
+# File outlet bersama ditulis sebelum JSON yang merujuknya terindeks; file tanpa rujukan
+# yang lebih muda dari ini belum dihapus oleh prune_outlet_artifacts
+OUTLET_ARTIFACT_GRACE = 3600
+
+
+def nomor_from_json(json_data):
+    # Nomor dokumen diambil dari nama list_break pertama
+    return json_data.get('list_break')[0].get('name').split()[0]
+
+
+def json_output_path(nomor):
+    return os.path.join(JSON_FOLDER, f"{nomor}.json")
+
+
+def write_json(json_data, json_file, indent=JSON_OUTPUT_INDENT):
+    for chunk in iter_json_chunks(json_data, indent):
+        json_file.write(chunk)
+
+
+def iter_json_chunks(json_data, indent=JSON_OUTPUT_INDENT):
+    # Skema top-level ditulis per key, list_customer/list_break per entri (boleh berupa iterator)
+    # sehingga dokumen tidak pernah di-encode sebagai satu string besar.
+    # indent > 0 menghasilkan byte yang sama dengan json.dump(..., indent=indent).
+    if indent:
+        pad = " " * indent
+        newline = "\n" + pad
+        key_sep = ": "
+    else:
+        pad = ""
+        newline = ""
+        key_sep = ":"
+
+    def encode(value, level):
+        if indent:
+            return json.dumps(value, indent=indent).replace("\n", "\n" + pad * level)
+        return json.dumps(value, separators=(",", ":"))
+
+    if not json_data:
+        yield "{}"
+        return
+    yield "{"
+    for idx, (key, value) in enumerate(json_data.items()):
+        if idx:
+            yield ","
+        yield newline + json.dumps(key) + key_sep
+        if key not in STREAMED_KEYS:
+            yield encode(value, 1)
+            continue
+        empty = True
+        for item in value:
+            yield "[" if empty else ","
+            yield newline + pad + encode(item, 2)
+            empty = False
+        yield "[]" if empty else newline + "]"
+    yield ("\n" if indent else "") + "}"
+
+
+@metrics.timed("write_json")
+@tracing.traced("write_json")
+def save_json_output(json_data, nomor, fields=None):
+    # fields: output_index.parsed_fields(processor.data), dipakai untuk filter brand/sub_promo_type
+    json_path = json_output_path(nomor)
+    previous_ref = indexed_outlet_ref(nomor)
+    with open(json_path, 'w', encoding='utf-8') as json_file:
+        write_json(json_data, json_file)
+    if not os.path.exists(json_path):
+        raise IOError("File tidak ditemukan setelah disimpan.")
+    summary = get_output_index().record(nomor, json_data, json_path, fields)
+    if previous_ref and previous_ref != summary["outlet_ref"]:
+        prune_outlet_artifacts()
+    return json_path
+
+
+def delete_json_output(nomor):
+    previous_ref = indexed_outlet_ref(nomor)
+    os.remove(json_output_path(nomor))
+    get_output_index().remove(nomor)
+    if previous_ref:
+        prune_outlet_artifacts()
+
+
+def indexed_outlet_ref(nomor):
+    summary = get_output_index().get_many([nomor]).get(nomor)
+    return summary["outlet_ref"] if summary else None
+
+
+def outlet_artifact_path(digest):
+    return os.path.join(OUTLET_FOLDER, f"{digest}.jsonl")
+
+
+@tracing.traced("write_outlet_list")
+def save_outlet_artifact(customers):
+    # Satu entri list_customer per baris; nama file = SHA-256 isi file sehingga batch
+    # dengan daftar outlet yang sama memakai file yang sama
+    os.makedirs(OUTLET_FOLDER, exist_ok=True)
+    tmp_path = os.path.join(OUTLET_FOLDER, f".{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    count = 0
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+            for customer in customers:
+                line = json.dumps(customer) + "\n"
+                digest.update(line.encode('utf-8'))
+                f.write(line)
+                count += 1
+        artifact_path = outlet_artifact_path(digest.hexdigest())
+        if os.path.exists(artifact_path):
+            # Dipakai lagi: perbarui mtime agar tidak dihapus prune sebelum JSON-nya terindeks
+            os.remove(tmp_path)
+            os.utime(artifact_path)
+        else:
+            os.replace(tmp_path, artifact_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"sha256": digest.hexdigest(), "count": count}
+
+
+def prune_outlet_artifacts():
+    # Hapus file outlet bersama yang tidak lagi dirujuk output mana pun di index
+    if not os.path.isdir(OUTLET_FOLDER):
+        return
+    referenced = get_output_index().outlet_refs()
+    cutoff = time.time() - OUTLET_ARTIFACT_GRACE
+    for entry in os.scandir(OUTLET_FOLDER):
+        if not entry.name.endswith(".jsonl") or entry.name[:-len(".jsonl")] in referenced:
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def iter_outlet_artifact(digest):
+    with open(outlet_artifact_path(digest), 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def share_outlets(json_data, outlet_ref):
+    # list_customer diganti referensi ke file outlet bersama, posisi key tetap
+    shared = {}
+    for key, value in json_data.items():
+        if key == "list_customer":
+            shared[OUTLET_REF_KEY] = outlet_ref
+        else:
+            shared[key] = value
+    return shared
+
+
+def expand_json(json_data):
+    # Kebalikan share_outlets: format lama yang berdiri sendiri. list_customer berupa iterator
+    # yang dibaca dari file outlet, untuk ditulis lewat write_json/iter_json_chunks
+    if OUTLET_REF_KEY not in json_data:
+        return json_data
+    expanded = {}
+    for key, value in json_data.items():
+        if key == OUTLET_REF_KEY:
+            expanded["list_customer"] = iter_outlet_artifact(value["sha256"])
+        else:
+            expanded[key] = value
+    return expanded
+
+
+def remove_temp_files(pdf_path, csv_path=None, keep_csv=False):
+    if pdf_path and os.path.exists(pdf_path):
+        os.remove(pdf_path)
+    if csv_path and not keep_csv and os.path.exists(csv_path):
+        os.remove(csv_path)
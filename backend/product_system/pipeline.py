@@ -0,0 +1,81 @@
+import os
+import tempfile
+from product_system import extraction, table_io
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def iter_page_tables(pages, parser, counts, text_parsed=False):
+    # halaman -> baris teks (langsung ke parser) dan tabel (diteruskan ke tahap berikutnya).
+    # text_parsed: mode teks-dulu, halaman hanya berisi tabel dan teksnya sudah terbaca
+    pages = iter(pages)
+    while True:
+        try:
+            _, text, tables = next(pages)
+        except StopIteration:
+            return
+        except Exception as e:
+            logger.error("Error extracting PDF: %s", e)
+            if text_parsed:
+                raise ValueError(f"Tabel dokumen tidak dapat dibaca: {e}")
+            raise ValueError("Dokumen kosong atau tidak dapat dibaca.")
+        if text:
+            counts["text_pages"] += 1
+            parser.feed(text.split('\n'))
+        for table in tables:
+            if table and len(table) > 1:
+                counts["tables"] += 1
+                yield table
+
+
+def stream_document(processor, pdf_path, rules, csv_path=None, text_first=False):
+    # Pipeline per halaman: memori puncak satu halaman ditambah hasil yang terkumpul di processor.
+    # Tabel baru bisa diparse setelah semua teks selesai (field dari teks menang atas field dari tabel),
+    # jadi di mode satu pass tabel ditampung di file sementara lalu dibaca ulang per tabel.
+    # csv_path: jika diisi, artefak CSV debug ditulis dari tabel yang sama.
+    parser = rules.start(processor)
+
+    if text_first:
+        # Dua pass: teks dulu, tabel hanya dibaca jika field wajib dari teks lengkap
+        stream_text(processor, pdf_path, parser)
+        pages = processor.iter_table_pages(pdf_path)
+    else:
+        pages = processor.iter_pages(pdf_path)
+
+    fd, spool_path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    try:
+        counts = {"text_pages": 0, "tables": 0}
+        table_io.write_tables_jsonl(iter_page_tables(pages, parser, counts, text_parsed=text_first), spool_path)
+        if not text_first and not counts["text_pages"] and not counts["tables"]:
+            raise ValueError("Dokumen kosong atau tidak dapat dibaca.")
+        if csv_path:
+            table_io.write_tables_csv(table_io.iter_jsonl_tables(spool_path), csv_path)
+        if not text_first:
+            processor.finish_text(parser)
+            processor.validate_text_fields()
+        processor.parse_csv(table_io.iter_jsonl_tables(spool_path))
+    finally:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+
+
+def stream_text(processor, pdf_path, parser):
+    # Pass teks mode teks-dulu; dokumen tanpa teks sama sekali ditolak sebelum tabel dibaca
+    texts = extraction.iter_page_texts(pdf_path)
+    text_pages = 0
+    while True:
+        try:
+            text = next(texts)
+        except StopIteration:
+            break
+        except Exception as e:
+            logger.error("Error extracting PDF: %s", e)
+            raise ValueError("Dokumen kosong atau tidak dapat dibaca.")
+        text_pages += 1
+        parser.feed(text.split('\n'))
+    if not text_pages:
+        raise ValueError("Dokumen kosong atau tidak dapat dibaca.")
+    processor.finish_text(parser)
+    processor.validate_text_fields()
@@ -1,9 +1,17 @@
-import pdfplumber
-import csv
-from datetime import datetime
 import re
 import json
-from utils.config import AREA_MAPPING, UOM_MAPPING
+import logging
+from utils.config import UOM_MAPPING, PDF_SINGLE_PASS, PDF_EXTRACT_WORKERS, PDF_PARALLEL_MIN_PAGES, PDF_EXCLUDE_TABLE_ROWS, PDF_TEXT_FIRST, PDF_STREAMING, SAVE_DEBUG_CSV
+from product_system import extraction, extraction_cache, metrics, pipeline, profiling, table_classifier, table_io, text_rules, tracing
+from product_system.models import SkuEntry, Strata, OutletList
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+SKU_BRAND_PATTERN = re.compile(r"([A-Z]+)(?:\s+(?:PREMIUM RICE|PALM OIL))?(?:\s+(?:PLP|PCH|JRG))?(?:\s*@)", re.IGNORECASE)
+
+# Mode ekstraksi yang menghasilkan teks berbeda untuk PDF yang sama disimpan terpisah di cache
+EXTRACTION_VARIANT = f"exclude_table_rows={PDF_EXCLUDE_TABLE_ROWS}" if PDF_EXCLUDE_TABLE_ROWS else None
 
 class DocumentProcessor:
     def __init__(self):
@@ -24,410 +32,295 @@ class DocumentProcessor:
             "sku": None,
             "uom": None,
             "c_uom_id": None,
-            "outlets": [],
+            "outlets": OutletList(),
             "strata_discounts": [],
             "selection_type": None,
             "sku_data": []
         }
-        print("Data reset:", self.data)
+        # Index SKU -> entri di sku_data, urutan list tetap dipakai untuk list_break
+        self.sku_index = {}
+        logger.debug("Data reset: %s", self.data)
+
+    def add_sku_entry(self, sku_entry):
+        self.data["sku_data"].append(sku_entry)
+        self.sku_index.setdefault(sku_entry.sku, sku_entry)
+        return sku_entry
 
     def extract_text_and_tables(self, pdf_path):
-        all_text = []
-        all_tables = []
-        
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        all_text.append(text)
-                    
-                    tables = page.extract_tables()
-                    for table in tables:
-                        if table and len(table) > 1:
-                            all_tables.append(table)
+            return extraction.extract_text_and_tables(
+                pdf_path,
+                single_pass=PDF_SINGLE_PASS,
+                workers=PDF_EXTRACT_WORKERS,
+                min_pages=PDF_PARALLEL_MIN_PAGES,
+                exclude_table_rows=PDF_EXCLUDE_TABLE_ROWS
+            )
         except Exception as e:
-            print(f"Error extracting PDF: {str(e)}")
-            
-        return "\n".join(all_text), all_tables
+            logger.error("Error extracting PDF: %s", e)
+            return "", []
+
+    def iter_pages(self, pdf_path):
+        return extraction.iter_document(
+            pdf_path,
+            single_pass=PDF_SINGLE_PASS,
+            workers=PDF_EXTRACT_WORKERS,
+            min_pages=PDF_PARALLEL_MIN_PAGES,
+            exclude_table_rows=PDF_EXCLUDE_TABLE_ROWS
+        )
+
+    def iter_table_pages(self, pdf_path):
+        return extraction.iter_document_tables(
+            pdf_path,
+            single_pass=PDF_SINGLE_PASS,
+            workers=PDF_EXTRACT_WORKERS,
+            min_pages=PDF_PARALLEL_MIN_PAGES
+        )
+
+    def extract_text_first(self, pdf_path):
+        # Field wajib dari teks dicek sebelum tabel diekstrak; ValueError diteruskan
+        # sehingga dokumen yang tidak lengkap tidak membayar ekstraksi tabel
+        try:
+            text = extraction.extract_text(pdf_path)
+        except Exception as e:
+            logger.error("Error extracting PDF text: %s", e)
+            return "", []
+        self.parse_text(text)
+        self.text_parsed = True
+        self.validate_text_fields()
+        try:
+            tables = extraction.extract_document_tables(
+                pdf_path,
+                single_pass=PDF_SINGLE_PASS,
+                workers=PDF_EXTRACT_WORKERS,
+                min_pages=PDF_PARALLEL_MIN_PAGES
+            )
+        except Exception as e:
+            # Teks sudah terbaca: jangan dilaporkan sebagai dokumen kosong
+            logger.error("Error extracting PDF tables: %s", e)
+            raise ValueError(f"Tabel dokumen tidak dapat dibaca: {e}")
+        return text, tables
 
+    @metrics.timed("serialize_tables")
+    @tracing.traced("serialize_tables")
     def save_tables_to_csv(self, tables, csv_path):
-        with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
+        if logger.isEnabledFor(logging.DEBUG):
             for table in tables:
-                print(f"Extracted table: {table}")
-                for row in table:
-                    writer.writerow(row)
-                writer.writerow(["---"] * len(table[0]))
+                logger.debug("Extracted table: %s", table)
+        table_io.write_tables_csv(tables, csv_path)
 
+    @metrics.timed("parse_text")
+    @tracing.traced("parse_text")
     def parse_text(self, text):
-        print(f"Extracted text:\n{text}\n")
-        lines = text.split('\n')
-        for line in lines:
-            line = line.strip()
-            print(f"Processing line: '{line}'")
-
-            # Nomor extraction
-            nomor_match = re.search(r"CP\d{2}[A-Za-z]{3,5}\d{2,3}-\d+", line, re.IGNORECASE)
-            if nomor_match:
-                nomor = nomor_match.group(0)
-                nomor = nomor.replace("CP20DJFAJ001", "CP20DJFAJ01")
-                self.data["nomor"] = nomor
-                print(f"Extracted nomor: {self.data['nomor']}")
-
-            # Date extraction
-            date_match = re.search(r"(\d{2}/\d{2}/\d{4})\s*[-–]\s*(\d{2}/\d{2}/\d{4})", line, re.IGNORECASE)
-            if date_match:
-                try:
-                    start_date = datetime.strptime(date_match.group(1), "%d/%m/%Y")
-                    end_date = datetime.strptime(date_match.group(2), "%d/%m/%Y")
-                    self.data["valid_from"] = start_date.strftime("%Y%m%d")
-                    self.data["valid_to"] = end_date.strftime("%Y%m%d")
-                    print(f"Extracted valid_from: {self.data['valid_from']}, valid_to: {self.data['valid_to']}")
-                except Exception as e:
-                    print(f"Error parsing dates: {str(e)}")
-
-            # Brand extraction
-            brand_match = re.search(r"(?:BRAND|PRODUCT\s*BRAND)\s*[:=\s-]+\s*([A-Za-z\s]+)", line, re.IGNORECASE)
-            if brand_match:
-                brand = brand_match.group(1).strip().upper()
-                brand = re.split(r"\s*REF\s*CP\s*NO", brand, flags=re.IGNORECASE)[0].strip()
-                if brand and "REF CP NO" not in brand:
-                    self.data["brand"] = brand
-                    print(f"Extracted brand: {self.data['brand']}")
-
-            # Distributor extraction
-            distributor_match = re.search(r"DISTRIBUTOR\s*[:=]?\s*([A-Z0-9-]+)\s*-\s*CV", line, re.IGNORECASE)
-            if distributor_match:
-                distributor_code = distributor_match.group(1)
-                area_code = distributor_code[-2:] if len(distributor_code) >= 2 else None
-                self.data["area_code"] = area_code
-                if area_code in AREA_MAPPING:
-                    self.data["area_name"] = AREA_MAPPING[area_code]["area_name"]
-                    self.data["ad_org_id"] = AREA_MAPPING[area_code]["ad_org_id"]
-                print(f"Extracted area_code: {self.data['area_code']}, area_name: {self.data['area_name']}, ad_org_id: {self.data['ad_org_id']}")
-
-            # Sub promo type extraction
-            if re.search(r"SUB\s*PROMO\s*TYPE\s*[:=]?", line, re.IGNORECASE):
-                match = re.search(r"SUB\s*PROMO\s*TYPE\s*[:=]?\s*\d{2}[A-Za-z]+\s*-\s*([A-Za-z\s]+)", line, re.IGNORECASE)
-                if match:
-                    self.data["sub_promo_type"] = match.group(1).strip().upper()
-                    print(f"Extracted sub_promo_type: {self.data['sub_promo_type']}")
-
-            # Vendor cashback extraction
-            if re.search(r"INCLUDE\s*TRADING\s*TERM\s*☑", line, re.IGNORECASE):
-                self.data["vendor_cashback"] = "Y"
-                print(f"Extracted vendor_cashback: {self.data['vendor_cashback']}")
-            elif re.search(r"EXCLUDE\s*TRADING\s*TERM\s*☑", line, re.IGNORECASE):
-                self.data["vendor_cashback"] = "N"
-                print(f"Extracted vendor_cashback: {self.data['vendor_cashback']}")
-
-            # Selection type extraction
-            if re.search(r"list toko include \(selectiontype=ISC\)", line, re.IGNORECASE):
-                self.data["selection_type"] = "ISC"
-                print(f"Extracted selection_type: {self.data['selection_type']}")
-            elif re.search(r"list customer exclude \(selectiontype=ESC\)", line, re.IGNORECASE):
-                self.data["selection_type"] = "ESC"
-                print(f"Extracted selection_type: {self.data['selection_type']}")
-
-            # SKU extraction
-            sku_match = re.search(r"(MILA FLOUR BAG @1KG|FORTUNE (?:PREMIUM RICE|PALM OIL )?(?:PLP|PCH|JRG) @\d+(\.\d+)?[KL]T)", line, re.IGNORECASE)
-            if sku_match:
-                self.data["sku"] = sku_match.group(0)
-                print(f"Extracted sku: {self.data['sku']}")
-
-        # Fallback: Jika brand masih tidak ditemukan
+        logger.debug("Extracted text:\n%s\n", text)
+        parser = text_rules.DOCUMENT_RULES.start(self)
+        parser.feed(text.split('\n'))
+        self.finish_text(parser)
+
+    def finish_text(self, parser):
+        parser.finish()
+        logger.debug(
+            "Extracted nomor: %s, brand: %s, valid_from: %s, valid_to: %s, area_code: %s, "
+            "sub_promo_type: %s, vendor_cashback: %s, selection_type: %s, sku: %s",
+            self.data['nomor'], self.data['brand'], self.data['valid_from'], self.data['valid_to'],
+            self.data['area_code'], self.data['sub_promo_type'], self.data['vendor_cashback'],
+            self.data['selection_type'], self.data['sku']
+        )
         if not self.data["brand"]:
-            for line in lines:
-                brand_match = re.search(r"\b(MILA|FORTUNE|SARI MURNI)\b", line, re.IGNORECASE)
-                if brand_match and "REF CP NO" not in line.upper():
-                    self.data["brand"] = brand_match.group(1).strip().upper()
-                    print(f"Extracted brand from text fallback: {self.data['brand']}")
-                    break
-            if not self.data["brand"]:
-                print("Warning: No brand detected in primary or fallback text search")
+            logger.warning("No brand detected in primary or fallback text search")
     
-    def parse_csv(self, csv_path):
-        current_table = None
-        headers = []
-        subheaders = []
-        table_rows = []
-        last_sku = None
-        last_uom = None
-        
+    @metrics.timed("parse_csv")
+    @tracing.traced("parse_csv")
+    def parse_csv(self, tables):
+        # tables: list/iterator tabel hasil extract_text_and_tables, atau path CSV lama
         try:
-            with open(csv_path, 'r', encoding='utf-8') as csvfile:
-                reader = csv.reader(csvfile)
-                for row in reader:
-                    if row and row[0] == "---":
-                        if table_rows:
-                            qty_header = None
-                            min_qty_header = None
-                            header_row = None
-                            subheader_row = None
-                            data_start_idx = 0
-                            is_sales_commitment = False
-
-                            for idx, table_row in enumerate(table_rows):
-                                table_row = [cell.strip().replace("\n", " ") if cell else "" for cell in table_row]
-                                if any(re.search(r"SALES\s*COMITMENT", cell, re.IGNORECASE) for cell in table_row):
-                                    is_sales_commitment = True
-                                    header_row = table_rows[0]
-                                    subheader_row = table_rows[1] if len(table_rows) > 1 else None
-                                    data_start_idx = 2
-                                    break
-                                for cell in table_row:
-                                    if re.search(r"(QTY\s*IN\s*CTN|QUANTITY\s*IN\s*CTN|QTY/CTN)", cell, re.IGNORECASE):
-                                        qty_header = cell
-                                        header_row = table_row
-                                        data_start_idx = idx + 1
-                                        break
-                                for cell in table_row:
-                                    if re.search(r"(MIN\s*QTY\s*/\s*CTN|MIN\s*QTY)", cell, re.IGNORECASE):
-                                        min_qty_header = cell
-                                        header_row = table_row
-                                        data_start_idx = idx + 1
-                                        break
-                                if qty_header or min_qty_header:
-                                    break
-
-                            if is_sales_commitment:
-                                current_table = "SALES COMMITMENT"
-                                headers = header_row if header_row else table_rows[0]
-                                subheaders = subheader_row if subheader_row else []
-                                print(f"Detected SALES COMMITMENT table with headers: {headers}")
-                                print(f"Subheaders: {subheaders}")
-                            elif qty_header:
-                                current_table = "SALES COMMITMENT"
-                                headers = header_row if header_row else table_rows[0]
-                                print(f"Detected SALES COMMITMENT table with headers: {headers}")
-                            elif min_qty_header:
-                                current_table = "STRATA DISCOUNT TABLE"
-                                headers = header_row if header_row else table_rows[0]
-                                self.data["strata_discounts"] = []
-                                print(f"Detected STRATA DISCOUNT TABLE with headers: {headers}")
-                            elif any("DISCOUNT PROMOTION" in cell for cell in table_rows[0]) or any("PRICE LIST" in cell for cell in table_rows[0]):
-                                current_table = "DISCOUNT PROMOTION"
-                                headers = table_rows[0]
-                                print(f"Detected DISCOUNT PROMOTION table with headers: {headers}")
-                            elif any("MIX ITEM" in cell for cell in table_rows[0]):
-                                current_table = "PRODUCT PROMOTION"
-                                headers = table_rows[0]
-                                print(f"Detected PRODUCT PROMOTION table with headers: {headers}")
-                            elif "NO" in table_rows[0] and "ID OUTLET" in table_rows[0]:
-                                current_table = "OUTLET LIST"
-                                headers = table_rows[0]
-                                print(f"Detected OUTLET LIST table with headers: {headers}")
+            for table_rows in tracing.iter_spans("parse_table", table_io.iter_tables(tables), lambda table_rows: {"rows": len(table_rows)}):
+                last_sku = None
+                last_uom = None
+
+                # Jenis tabel dan posisi kolom ditentukan sekali dari header, bukan per sel
+                layout = table_classifier.classify_document_table(table_rows)
+                current_table = layout.kind
+
+                if current_table == table_classifier.SALES_COMMITMENT:
+                    logger.debug("Detected SALES COMMITMENT table with headers: %s", layout.headers)
+                    if layout.subheaders:
+                        logger.debug("Subheaders: %s", layout.subheaders)
+                elif current_table == table_classifier.STRATA_DISCOUNT:
+                    self.data["strata_discounts"] = []
+                    logger.debug("Detected STRATA DISCOUNT TABLE with headers: %s", layout.headers)
+                elif current_table == table_classifier.DISCOUNT_PROMOTION:
+                    logger.debug("Detected DISCOUNT PROMOTION table with headers: %s", layout.headers)
+                elif current_table == table_classifier.PRODUCT_PROMOTION:
+                    logger.debug("Detected PRODUCT PROMOTION table with headers: %s", layout.headers)
+                elif current_table == table_classifier.OUTLET_LIST:
+                    logger.debug("Detected OUTLET LIST table with headers: %s", layout.headers)
+                else:
+                    logger.debug("No relevant table detected in: %s", table_rows)
+                    continue
+
+                for row, columns in layout.rows(table_rows):
+                    if current_table == table_classifier.SALES_COMMITMENT:
+                        qty_str = columns.get(row, "QTY IN CTN").strip()
+                        if not qty_str:
+                            value = columns.find(row, table_classifier.DOCUMENT_QTY_PATTERN)
+                            if value is not None:
+                                qty_str = value.strip()
+                        try:
+                            if qty_str:
+                                if '/' in qty_str:
+                                    num, denom = map(int, qty_str.split('/'))
+                                    qty = num if denom == 0 else num // denom
+                                else:
+                                    qty = int(qty_str.replace('.', '')) if qty_str.replace('.', '').isdigit() else None
+                            else:
+                                qty = None
+                        except Exception as e:
+                            logger.warning("Error parsing QTY IN CTN: %s", e)
+                            qty = None
+
+                        sku = columns.get(row, "SKU").replace("\n", " ").strip()
+                        logger.debug("Processing SKU: %s, QTY: %s", sku, qty)
+                        if sku and qty is not None:
+                            sku_entry = self.sku_index.get(sku)
+                            if sku_entry is not None:
+                                sku_entry.qty_allocated = qty
+                                logger.debug("Updated qty_allocated for SKU %s: %s", sku, qty)
                             else:
-                                current_table = None
-                                print(f"No relevant table detected in: {table_rows}")
-
-                            if current_table:
-                                for row in table_rows[data_start_idx:]:
-                                    if current_table == "SALES COMMITMENT" and subheaders:
-                                        while len(subheaders) < len(row):
-                                            subheaders.append("")
-                                        row_data = dict(zip(subheaders, row))
-                                        row_data["SKU"] = row[0] if row else ""
+                                self.add_sku_entry(SkuEntry(sku, qty_allocated=qty))
+                                logger.debug("Added new SKU %s with qty_allocated: %s", sku, qty)
+                            if self.data["qty_allocated"] is None:
+                                self.data["qty_allocated"] = qty
+                                logger.debug("Set main qty_allocated: %s", self.data['qty_allocated'])
+                            if not self.data["brand"]:
+                                brand_match = SKU_BRAND_PATTERN.match(sku)
+                                if brand_match:
+                                    self.data["brand"] = brand_match.group(1).strip().upper()
+                                    logger.debug("Fallback brand from SKU: %s", self.data['brand'])
+
+                    elif current_table == table_classifier.STRATA_DISCOUNT:
+                        min_qty_str = columns.get(row, "MIN QTY / CTN").replace("'", "").strip()
+                        
+                        try:
+                            if '-' in min_qty_str:
+                                lower_str, upper_str = map(str.strip, min_qty_str.split('-'))
+                                if '/' in lower_str:
+                                    num, denom = map(int, lower_str.split('/'))
+                                    min_qty = num if denom == 0 else num // denom
+                                else:
+                                    min_qty = int(lower_str) if lower_str.replace(',', '').isdigit() else 0
+                                
+                                if '/' in upper_str:
+                                    num, denom = map(int, upper_str.split('/'))
+                                    max_qty = num if denom == 0 else num // denom
+                                else:
+                                    max_qty = int(upper_str) if upper_str.replace(',', '').isdigit() else 0
+                            else:
+                                if '/' in min_qty_str:
+                                    num, denom = map(int, min_qty_str.split('/'))
+                                    min_qty = num if denom == 0 else num // denom
+                                else:
+                                    min_qty = int(min_qty_str) if min_qty_str.replace(',', '').isdigit() else 0
+                                max_qty = None
+
+                            if min_qty > 0:
+                                disc_str = columns.get(row, "DISC %").replace(",", ".").strip()
+                                disc = float(disc_str) if disc_str else 0.0
+
+                                share_disc_str = columns.get(row, "SHARE DIST %").replace(",", ".").strip()
+                                try:
+                                    share_disc = float(share_disc_str) if share_disc_str and share_disc_str != "-" else 0
+                                except ValueError:
+                                    share_disc = 0
+
+                                uom = columns.get(row, "UOM").strip()
+                                sku = columns.get(row, "SKU").replace("\n", " ").strip()
+                                if sku:
+                                    last_sku = sku
+                                    last_uom = uom
+                                else:
+                                    sku = last_sku
+                                    uom = last_uom
+
+                                if uom and sku:
+                                    sku_entry = self.sku_index.get(sku)
+                                    if sku_entry is not None:
+                                        sku_entry.uom = uom
+                                        sku_entry.c_uom_id = UOM_MAPPING.get(uom, 1000000)
+                                        if disc > 0 or share_disc > 0:
+                                            sku_entry.strata_discounts.append(Strata(min_qty, max_qty, disc, share_disc))
                                     else:
-                                        row_data = dict(zip(headers, row))
-                                    print(f"Row data: {row_data}")
-
-                                    if current_table == "SALES COMMITMENT":
-                                        qty_str = row_data.get("QTY IN CTN", "").strip()
-                                        if not qty_str:
-                                            for key, value in row_data.items():
-                                                if re.search(r"(QTY\s*IN\s*CTN|QUANTITY\s*IN\s*CTN|QTY/CTN)", key, re.IGNORECASE):
-                                                    qty_str = value.strip()
-                                                    break
-                                        try:
-                                            if qty_str:
-                                                if '/' in qty_str:
-                                                    num, denom = map(int, qty_str.split('/'))
-                                                    qty = num if denom == 0 else num // denom
-                                                else:
-                                                    qty = int(qty_str.replace('.', '')) if qty_str.replace('.', '').isdigit() else None
-                                            else:
-                                                qty = None
-                                        except Exception as e:
-                                            print(f"Error parsing QTY IN CTN: {str(e)}")
-                                            qty = None
-
-                                        sku = row_data.get("SKU", "").replace("\n", " ").strip()
-                                        print(f"Processing SKU: {sku}, QTY: {qty}")
-                                        if sku and qty is not None:
-                                            found = False
-                                            for sku_entry in self.data["sku_data"]:
-                                                if sku_entry["sku"] == sku:
-                                                    sku_entry["qty_allocated"] = qty
-                                                    found = True
-                                                    print(f"Updated qty_allocated for SKU {sku}: {qty}")
-                                                    break
-                                            if not found:
-                                                self.data["sku_data"].append({
-                                                    "sku": sku,
-                                                    "qty_allocated": qty,
-                                                    "uom": None,
-                                                    "c_uom_id": None,
-                                                    "strata_discounts": []
-                                                })
-                                                print(f"Added new SKU {sku} with qty_allocated: {qty}")
-                                            if self.data["qty_allocated"] is None:
-                                                self.data["qty_allocated"] = qty
-                                                print(f"Set main qty_allocated: {self.data['qty_allocated']}")
-                                            if not self.data["brand"]:
-                                                brand_match = re.match(r"([A-Z]+)(?:\s+(?:PREMIUM RICE|PALM OIL))?(?:\s+(?:PLP|PCH|JRG))?(?:\s*@)", sku, re.IGNORECASE)
-                                                if brand_match:
-                                                    self.data["brand"] = brand_match.group(1).strip().upper()
-                                                    print(f"Fallback brand from SKU: {self.data['brand']}")
-
-                                    elif current_table == "STRATA DISCOUNT TABLE":
-                                        min_qty_str = row_data.get("MIN QTY / CTN", "").replace("'", "").strip()
-                                        
-                                        try:
-                                            if '-' in min_qty_str:
-                                                lower_str, upper_str = map(str.strip, min_qty_str.split('-'))
-                                                if '/' in lower_str:
-                                                    num, denom = map(int, lower_str.split('/'))
-                                                    min_qty = num if denom == 0 else num // denom
-                                                else:
-                                                    min_qty = int(lower_str) if lower_str.replace(',', '').isdigit() else 0
-                                                
-                                                if '/' in upper_str:
-                                                    num, denom = map(int, upper_str.split('/'))
-                                                    max_qty = num if denom == 0 else num // denom
-                                                else:
-                                                    max_qty = int(upper_str) if upper_str.replace(',', '').isdigit() else 0
-                                            else:
-                                                if '/' in min_qty_str:
-                                                    num, denom = map(int, min_qty_str.split('/'))
-                                                    min_qty = num if denom == 0 else num // denom
-                                                else:
-                                                    min_qty = int(min_qty_str) if min_qty_str.replace(',', '').isdigit() else 0
-                                                max_qty = None
-
-                                            if min_qty > 0:
-                                                disc_str = row_data.get("DISC %", "").replace(",", ".").strip()
-                                                disc = float(disc_str) if disc_str else 0.0
-
-                                                share_disc_str = row_data.get("SHARE DIST %", "").replace(",", ".").strip()
-                                                try:
-                                                    share_disc = float(share_disc_str) if share_disc_str and share_disc_str != "-" else 0
-                                                except ValueError:
-                                                    share_disc = 0
-
-                                                uom = row_data.get("UOM", "").strip()
-                                                sku = row_data.get("SKU", "").replace("\n", " ").strip()
-                                                if sku:
-                                                    last_sku = sku
-                                                    last_uom = uom
-                                                else:
-                                                    sku = last_sku
-                                                    uom = last_uom
-
-                                                if uom and sku:
-                                                    found = False
-                                                    for sku_entry in self.data["sku_data"]:
-                                                        if sku_entry["sku"] == sku:
-                                                            sku_entry["uom"] = uom
-                                                            sku_entry["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
-                                                            sku_entry["strata_discounts"] = sku_entry.get("strata_discounts", [])
-                                                            if disc > 0 or share_disc > 0:
-                                                                sku_entry["strata_discounts"].append({
-                                                                    "breakfrom": min_qty,
-                                                                    "breakto": max_qty,
-                                                                    "disc": disc,
-                                                                    "share_disc": share_disc
-                                                                })
-                                                            found = True
-                                                            break
-                                                    if not found:
-                                                        strata_discounts = []
-                                                        if disc > 0 or share_disc > 0:
-                                                            strata_discounts.append({
-                                                                "breakfrom": min_qty,
-                                                                "breakto": max_qty,
-                                                                "disc": disc,
-                                                                "share_disc": share_disc
-                                                            })
-                                                        self.data["sku_data"].append({
-                                                            "sku": sku,
-                                                            "uom": uom,
-                                                            "c_uom_id": UOM_MAPPING.get(uom, 1000000),
-                                                            "strata_discounts": strata_discounts,
-                                                            "qty_allocated": 0
-                                                        })
-                                                    if not self.data["sku"]:
-                                                        self.data["sku"] = sku
-                                                        self.data["uom"] = uom
-                                                        self.data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
-                                                        if disc > 0 or share_disc > 0:
-                                                            self.data["strata_discounts"] = [{
-                                                                "breakfrom": min_qty,
-                                                                "breakto": max_qty,
-                                                                "disc": disc,
-                                                                "share_disc": share_disc
-                                                            }]
-                                                    print(f"Set UOM: {self.data['uom']}, c_uom_id: {self.data['c_uom_id']}")
-                                                if not self.data["brand"] and sku:
-                                                    brand_match = re.match(r"([A-Z]+)(?:\s+(?:PREMIUM RICE|PALM OIL))?(?:\s+(?:PLP|PCH|JRG))?(?:\s*@)", sku, re.IGNORECASE)
-                                                    if brand_match:
-                                                        self.data["brand"] = brand_match.group(1).strip().upper()
-                                                        print(f"Fallback brand from SKU: {self.data['brand']}")
-
-                                        except (ValueError, TypeError) as e:
-                                            print(f"Error parsing STRATA DISCOUNT TABLE: {str(e)}")
-                                            continue
-
-                                    elif current_table == "DISCOUNT PROMOTION":
-                                        uom = row_data.get("UOM", "").strip()
-                                        sku = row_data.get("SKU", "").replace("\n", " ").strip()
-                                        if uom and sku:
-                                            found = False
-                                            for sku_entry in self.data["sku_data"]:
-                                                if sku_entry["sku"] == sku:
-                                                    sku_entry["uom"] = uom
-                                                    sku_entry["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
-                                                    found = True
-                                                    break
-                                            if not found:
-                                                self.data["sku_data"].append({
-                                                    "sku": sku,
-                                                    "uom": uom,
-                                                    "c_uom_id": UOM_MAPPING.get(uom, 1000000),
-                                                    "qty_allocated": 0,
-                                                    "strata_discounts": []
-                                                })
-                                            if not self.data["uom"]:
-                                                self.data["uom"] = uom
-                                                self.data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
-                                                print(f"Set UOM: {self.data['uom']}, c_uom_id: {self.data['c_uom_id']}")
-                                        if not self.data["brand"] and sku:
-                                            brand_match = re.match(r"([A-Z]+)(?:\s+(?:PREMIUM RICE|PALM OIL))?(?:\s+(?:PLP|PCH|JRG))?(?:\s*@)", sku, re.IGNORECASE)
-                                            if brand_match:
-                                                self.data["brand"] = brand_match.group(1).strip().upper()
-                                                print(f"Fallback brand from SKU: {self.data['brand']}")
-
-                                    elif current_table == "OUTLET LIST":
-                                        outlet_id = row_data.get("ID OUTLET", "").strip()
-                                        outlet_name = row_data.get("NAMA OUTLET", "").strip()
-                                        if outlet_id and outlet_name:
-                                            self.data["outlets"].append({"c_bpartner_id": outlet_id, "name": outlet_name})
-
-                        current_table = None
-                        headers = []
-                        subheaders = []
-                        table_rows = []
-                        last_sku = None
-                        last_uom = None
-                        continue
-
-                    table_rows.append(row)
+                                        strata_discounts = []
+                                        if disc > 0 or share_disc > 0:
+                                            strata_discounts.append(Strata(min_qty, max_qty, disc, share_disc))
+                                        self.add_sku_entry(SkuEntry(
+                                            sku,
+                                            uom=uom,
+                                            c_uom_id=UOM_MAPPING.get(uom, 1000000),
+                                            strata_discounts=strata_discounts
+                                        ))
+                                    if not self.data["sku"]:
+                                        self.data["sku"] = sku
+                                        self.data["uom"] = uom
+                                        self.data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
+                                        if disc > 0 or share_disc > 0:
+                                            self.data["strata_discounts"] = [Strata(min_qty, max_qty, disc, share_disc)]
+                                    logger.debug("Set UOM: %s, c_uom_id: %s", self.data['uom'], self.data['c_uom_id'])
+                                if not self.data["brand"] and sku:
+                                    brand_match = SKU_BRAND_PATTERN.match(sku)
+                                    if brand_match:
+                                        self.data["brand"] = brand_match.group(1).strip().upper()
+                                        logger.debug("Fallback brand from SKU: %s", self.data['brand'])
+
+                        except (ValueError, TypeError) as e:
+                            logger.warning("Error parsing STRATA DISCOUNT TABLE: %s", e)
+                            continue
+
+                    elif current_table == table_classifier.DISCOUNT_PROMOTION:
+                        uom = columns.get(row, "UOM").strip()
+                        sku = columns.get(row, "SKU").replace("\n", " ").strip()
+                        if uom and sku:
+                            sku_entry = self.sku_index.get(sku)
+                            if sku_entry is not None:
+                                sku_entry.uom = uom
+                                sku_entry.c_uom_id = UOM_MAPPING.get(uom, 1000000)
+                            else:
+                                self.add_sku_entry(SkuEntry(sku, uom=uom, c_uom_id=UOM_MAPPING.get(uom, 1000000)))
+                            if not self.data["uom"]:
+                                self.data["uom"] = uom
+                                self.data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
+                                logger.debug("Set UOM: %s, c_uom_id: %s", self.data['uom'], self.data['c_uom_id'])
+                        if not self.data["brand"] and sku:
+                            brand_match = SKU_BRAND_PATTERN.match(sku)
+                            if brand_match:
+                                self.data["brand"] = brand_match.group(1).strip().upper()
+                                logger.debug("Fallback brand from SKU: %s", self.data['brand'])
+
+                    elif current_table == table_classifier.OUTLET_LIST:
+                        outlet_id = columns.get(row, "ID OUTLET").strip()
+                        outlet_name = columns.get(row, "NAMA OUTLET").strip()
+                        if outlet_id and outlet_name:
+                            self.data["outlets"].append(outlet_id, outlet_name)
 
         except Exception as e:
-            print(f"Error parsing CSV: {str(e)}")
+            logger.error("Error parsing tables: %s", e)
             raise
 
+    def validate_text_fields(self):
+        # Field yang hanya bisa berasal dari teks; dicek sebelum parse tabel
+        if not self.data["nomor"]:
+            raise ValueError("Nomor CP tidak ditemukan di dokumen.")
+
+        if not self.data["sub_promo_type"]:
+            raise ValueError("Sub promo type tidak ditemukan di dokumen.")
+
+        if not self.data["valid_from"] or not self.data["valid_to"]:
+            raise ValueError("Periode valid_from atau valid_to tidak ditemukan di dokumen.")
+
+        if not self.data["area_code"] or not self.data["area_name"] or not self.data["ad_org_id"]:
+            raise ValueError("Area code atau informasi area tidak ditemukan di dokumen.")
+
+    @metrics.timed("validate_data")
+    @tracing.traced("validate_data")
     def validate_data(self):
         if not self.data["nomor"]:
             raise ValueError("Nomor CP tidak ditemukan di dokumen.")
@@ -463,20 +356,20 @@ class DocumentProcessor:
             self.data["selection_type"] = "IA"
 
         for sku_entry in self.data["sku_data"]:
-            if "uom" not in sku_entry or not sku_entry["uom"]:
-                raise ValueError(f"UOM tidak ditemukan untuk SKU: {sku_entry['sku']}")
-            if "c_uom_id" not in sku_entry or not sku_entry["c_uom_id"]:
-                raise ValueError(f"c_uom_id tidak ditemukan untuk SKU: {sku_entry['sku']}")
-            if "qty_allocated" not in sku_entry or sku_entry["qty_allocated"] is None:
-                raise ValueError(f"qty_allocated tidak ditemukan untuk SKU: {sku_entry['sku']}")
-            if "strata_discounts" not in sku_entry:
-                sku_entry["strata_discounts"] = []  # Allow empty strata_discounts
-
+            if not sku_entry.uom:
+                raise ValueError(f"UOM tidak ditemukan untuk SKU: {sku_entry.sku}")
+            if not sku_entry.c_uom_id:
+                raise ValueError(f"c_uom_id tidak ditemukan untuk SKU: {sku_entry.sku}")
+            if sku_entry.qty_allocated is None:
+                raise ValueError(f"qty_allocated tidak ditemukan untuk SKU: {sku_entry.sku}")
+
+    @metrics.timed("generate_json")
+    @tracing.traced("generate_json")
     def generate_json(self):
         try:
             self.validate_data()
 
-            print(f"Before generating JSON - brand: {self.data['brand']}, area_name: {self.data['area_name']}, sub_promo_type: {self.data['sub_promo_type']}")
+            logger.debug("Before generating JSON - brand: %s, area_name: %s, sub_promo_type: %s", self.data['brand'], self.data['area_name'], self.data['sub_promo_type'])
 
             name_description = f"{self.data['brand']} {self.data['sub_promo_type']} {self.data['area_name']}".strip()
 
@@ -519,15 +412,15 @@ class DocumentProcessor:
                 "list_break": []
             }
 
-            print(f"Generated name_description: {name_description}")
+            logger.debug("Generated name_description: %s", name_description)
 
             break_name = f"{self.data['nomor']} {self.data['brand']} {self.data['sub_promo_type']} {self.data['area_name']}".strip()
 
             for idx, sku_entry in enumerate(self.data["sku_data"]):
-                if "1LT" in sku_entry["sku"] or "0.8LT" in sku_entry["sku"]:
+                if "1LT" in sku_entry.sku or "0.8LT" in sku_entry.sku:
                     vendor_seqno = 10
                     share_seqno = 20
-                elif "2LT" in sku_entry["sku"] or "1.8LT" in sku_entry["sku"]:
+                elif "2LT" in sku_entry.sku or "1.8LT" in sku_entry.sku:
                     vendor_seqno = 30
                     share_seqno = 40
                 else:
@@ -535,7 +428,7 @@ class DocumentProcessor:
                     share_seqno = 60
 
                 # Default breakvalueto adalah qtyallocated
-                breakvalueto = sku_entry["qty_allocated"]
+                breakvalueto = sku_entry.qty_allocated
 
                 base_break = {
                     "m_discountschema_id": 0,
@@ -553,13 +446,13 @@ class DocumentProcessor:
                     "productselection": "IOP",
                     "salestype": None,
                     "saleslevel": None,
-                    "c_uom_id": sku_entry["c_uom_id"],
-                    "m_product_id": sku_entry["sku"],
+                    "c_uom_id": sku_entry.c_uom_id,
+                    "m_product_id": sku_entry.sku,
                     "m_product_category_id": None,
                     "vendor_id": None,
                     "budgettype": "GB",
                     "budgetcalculation": "QTY",
-                    "qtyallocated": sku_entry["qty_allocated"],
+                    "qtyallocated": sku_entry.qty_allocated,
                     "breakvalue": 0,
                     "breakdiscount": 0,
                     "isincludingsubordinate": "N",
@@ -582,7 +475,7 @@ class DocumentProcessor:
                 }
 
                 # Vendor Cashback (DISC %)
-                if any(strata["disc"] > 0 for strata in sku_entry["strata_discounts"]):
+                if any(strata.disc > 0 for strata in sku_entry.strata_discounts):
                     vendor_break = base_break.copy()
                     vendor_break["seqno"] = vendor_seqno
                     vendor_break["isshareddiscount"] = "N"
@@ -590,14 +483,14 @@ class DocumentProcessor:
                     vendor_break["list_line"] = []
                     
                     # Urutkan strata_discounts berdasarkan breakfrom
-                    sorted_strata = sorted(sku_entry["strata_discounts"], key=lambda x: x["breakfrom"])
+                    sorted_strata = sorted(sku_entry.strata_discounts, key=lambda x: x.breakfrom)
                     
                     for i, strata in enumerate(sorted_strata):
-                        if strata["disc"] > 0:
+                        if strata.disc > 0:
                             # Tentukan breakvalueto
                             if i < len(sorted_strata) - 1:
                                 # Jika bukan strata terakhir, breakvalueto adalah breakfrom strata berikutnya - 1
-                                next_breakfrom = sorted_strata[i + 1]["breakfrom"]
+                                next_breakfrom = sorted_strata[i + 1].breakfrom
                                 current_breakvalueto = next_breakfrom - 1
                             else:
                                 # Jika strata terakhir, gunakan qtyallocated
@@ -607,10 +500,10 @@ class DocumentProcessor:
                                 "m_discountschemabreak_id": 0,
                                 "uns_dsbreakline_id": 0,
                                 "name": break_name,
-                                "breakvalue": strata["breakfrom"],
+                                "breakvalue": strata.breakfrom,
                                 "breakvalueto": current_breakvalueto,
-                                "qtyallocated": sku_entry["qty_allocated"],
-                                "breakdiscount": strata["disc"],
+                                "qtyallocated": sku_entry.qty_allocated,
+                                "breakdiscount": strata.disc,
                                 "seconddiscount": 0,
                                 "thirddiscount": 0,
                                 "fourthdiscount": 0,
@@ -622,7 +515,7 @@ class DocumentProcessor:
                     json_data["list_break"].append(vendor_break)
 
                 # Share Discount (SHARE DIST %)
-                if any(strata["share_disc"] > 0 for strata in sku_entry["strata_discounts"]):
+                if any(strata.share_disc > 0 for strata in sku_entry.strata_discounts):
                     share_break = base_break.copy()
                     share_break["seqno"] = share_seqno
                     share_break["isshareddiscount"] = "Y"
@@ -630,18 +523,18 @@ class DocumentProcessor:
                     share_break["list_line"] = []
                     
                     # Urutkan strata_discounts berdasarkan breakfrom
-                    sorted_strata = sorted(sku_entry["strata_discounts"], key=lambda x: x["breakfrom"])
+                    sorted_strata = sorted(sku_entry.strata_discounts, key=lambda x: x.breakfrom)
                     
                     # Cari rentang pertama yang memiliki share_disc > 0
                     share_disc_range = None
                     for strata in sorted_strata:
-                        if strata["share_disc"] > 0:
+                        if strata.share_disc > 0:
                             share_disc_range = strata
                             break
                     
                     if share_disc_range:
                         # Untuk Share Discount, breakvalueto selalu qtyallocated
-                        share_breakfrom = share_disc_range["breakfrom"]
+                        share_breakfrom = share_disc_range.breakfrom
                         share_breakvalueto = breakvalueto
 
                         share_break["list_line"].append({
@@ -650,8 +543,8 @@ class DocumentProcessor:
                             "name": break_name,
                             "breakvalue": share_breakfrom,
                             "breakvalueto": share_breakvalueto,
-                            "qtyallocated": sku_entry["qty_allocated"],
-                            "breakdiscount": share_disc_range["share_disc"],
+                            "qtyallocated": sku_entry.qty_allocated,
+                            "breakdiscount": share_disc_range.share_disc,
                             "seconddiscount": 0,
                             "thirddiscount": 0,
                             "fourthdiscount": 0,
@@ -667,24 +560,54 @@ class DocumentProcessor:
             return json_data
             
         except Exception as e:
-            print(f"Error generating JSON: {str(e)}")
+            logger.error("Error generating JSON: %s", e)
             raise
 
-    def process(self, pdf_path, csv_path):
-        self.reset_data()
-        
-        try:
-            text, tables = self.extract_text_and_tables(pdf_path)
-            if not text and not tables:
-                raise ValueError("Dokumen kosong atau tidak dapat dibaca.")
-            
+    def parse_extracted(self, pdf_path, csv_path, cached=None):
+        extract_fn = self.extract_text_and_tables
+        if PDF_TEXT_FIRST and not PDF_EXCLUDE_TABLE_ROWS:
+            extract_fn = self.extract_text_first
+        text, tables = cached or extraction_cache.get_or_extract(pdf_path, extract_fn, variant=EXTRACTION_VARIANT)
+        if not text and not tables:
+            raise ValueError("Dokumen kosong atau tidak dapat dibaca.")
+
+        # CSV hanya ditulis sebagai artefak debug, parse_csv membaca tabel langsung dari memori
+        if csv_path and SAVE_DEBUG_CSV:
             self.save_tables_to_csv(tables, csv_path)
+        if not self.text_parsed:
             self.parse_text(text)
-            self.parse_csv(csv_path)
-            
-            json_data = self.generate_json()
-            return json_data
-        except Exception as e:
-            print(f"Processing error: {str(e)}")
-            raise
+            self.validate_text_fields()
+        self.parse_csv(tables)
+
+    def parse_stream(self, pdf_path, csv_path):
+        # Miss cache di mode streaming: halaman diproses satu per satu tanpa mengisi cache
+        pipeline.stream_document(
+            self,
+            pdf_path,
+            text_rules.DOCUMENT_RULES,
+            csv_path=csv_path if csv_path and SAVE_DEBUG_CSV else None,
+            text_first=PDF_TEXT_FIRST and not PDF_EXCLUDE_TABLE_ROWS
+        )
+
+    @tracing.traced("process_document")
+    def process(self, pdf_path, csv_path=None):
+        self.reset_data()
+        self.text_parsed = False
+        
+        with profiling.profile("single", [pdf_path], lambda: [self.data["nomor"]]):
+            try:
+                cached = extraction_cache.lookup(pdf_path, EXTRACTION_VARIANT) if PDF_STREAMING else None
+                if PDF_STREAMING and cached is None:
+                    self.parse_stream(pdf_path, csv_path)
+                else:
+                    self.parse_extracted(pdf_path, csv_path, cached)
+
+                json_data = self.generate_json()
+                metrics.inc("pdf_documents_total")
+                metrics.inc("pdf_outlets_total", len(self.data["outlets"]))
+                return json_data
+            except Exception as e:
+                logger.error("Processing error: %s", e)
+                metrics.count_failure(e)
+                raise
 
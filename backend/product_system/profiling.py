@@ -0,0 +1,174 @@
+import argparse
+import contextvars
+import cProfile
+import hashlib
+import io
+import os
+import pstats
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from utils.config import PROFILE_ENABLED, PROFILE_EVERY_N, PROFILE_FOLDER, PROFILE_TOP_N, PROFILE_MAX_FILES
+from utils.log import configure_logging, get_logger
+from product_system.extraction_cache import file_sha256
+
+logger = get_logger(__name__)
+
+# None = ikuti sampling PROFILE_ENABLED; True/False = sudah diputuskan (header admin, CLI, job, batch induk)
+PROFILE_REQUESTED = contextvars.ContextVar("profile_requested", default=None)
+# True di dalam blok yang sedang diprofil, agar pemanggilan bertingkat tidak membuat profil kedua
+_active = contextvars.ContextVar("profile_active", default=False)
+
+SAFE_NAME_PATTERN = re.compile(r"[^A-Za-z0-9_.+-]+")
+
+
+def should_profile():
+    if _active.get():
+        return False
+    requested = PROFILE_REQUESTED.get()
+    if requested is not None:
+        return requested
+    return PROFILE_ENABLED and random.randrange(PROFILE_EVERY_N) == 0
+
+
+def active():
+    return _active.get()
+
+
+@contextmanager
+def request_profile(requested):
+    token = PROFILE_REQUESTED.set(requested)
+    try:
+        yield
+    finally:
+        PROFILE_REQUESTED.reset(token)
+
+
+def call_with_profile(requested, fn, *args):
+    # Untuk ProcessPoolExecutor: keputusan profil batch induk dikirim sebagai argumen
+    token = _active.set(False)
+    try:
+        with request_profile(requested):
+            return fn(*args)
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def profile(label, pdf_paths, nomors_of):
+    # Bungkus satu pemrosesan dengan cProfile jika diminta/tersampel. nomors_of dipanggil setelah
+    # blok selesai (juga saat gagal) untuk menamai file; hash PDF dihitung di awal karena PDF
+    # sementara bisa sudah dihapus saat blok selesai.
+    if not should_profile():
+        yield
+        return
+
+    digests = [file_sha256(pdf_path) for pdf_path in pdf_paths if os.path.exists(pdf_path)]
+    token = _active.set(True)
+    profiler = cProfile.Profile()
+    status = "ok"
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        _active.reset(token)
+        try:
+            nomors = [nomor for nomor in nomors_of() if nomor]
+        except Exception:
+            nomors = []
+        try:
+            save_profile(profiler, label, nomors, list(zip(pdf_paths, digests)), elapsed, status)
+        except Exception as e:
+            logger.error("Error saving profile: %s", e)
+
+
+def save_profile(profiler, label, nomors, pdfs, elapsed, status):
+    # pdfs: list of (pdf_path, sha256)
+    os.makedirs(PROFILE_FOLDER, exist_ok=True)
+    if len(pdfs) == 1:
+        pdf_hash = pdfs[0][1][:12]
+    else:
+        pdf_hash = hashlib.sha256("".join(digest for _, digest in pdfs).encode()).hexdigest()[:12]
+    nomor_tag = nomors[0] if nomors else "unknown"
+    if len(nomors) > 1:
+        nomor_tag += f"+{len(nomors) - 1}"
+    name = SAFE_NAME_PATTERN.sub("_", f"{time.strftime('%Y%m%d_%H%M%S')}_{label}_{nomor_tag}_{pdf_hash}_{os.getpid()}")
+    base_path = os.path.join(PROFILE_FOLDER, name)
+
+    profiler.dump_stats(base_path + ".pstats")
+
+    summary = io.StringIO()
+    summary.write(f"label: {label}\nstatus: {status}\nelapsed: {elapsed:.3f}s\npid: {os.getpid()}\n")
+    summary.write(f"nomor: {', '.join(nomors) or '-'}\n")
+    for pdf_path, digest in pdfs:
+        summary.write(f"pdf: {os.path.basename(pdf_path)} sha256={digest}\n")
+    summary.write("\n")
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_N)
+    with open(base_path + ".txt", 'w', encoding='utf-8') as summary_file:
+        summary_file.write(summary.getvalue())
+
+    logger.info("Profile saved: %s.pstats (%.3fs, %s)", base_path, elapsed, status)
+    prune_profiles()
+    return base_path
+
+
+def prune_profiles():
+    entries = sorted(
+        (entry for entry in os.scandir(PROFILE_FOLDER) if entry.name.endswith(".pstats")),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in entries[:max(0, len(entries) - PROFILE_MAX_FILES)]:
+        for path in (entry.path, entry.path[:-len(".pstats")] + ".txt"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def main(argv=None):
+    # python -m product_system.profiling dokumen.pdf [dokumen2.pdf ...] (dari folder backend)
+    # Satu file diproses seperti /upload-single, lebih dari satu seperti /upload-multiple.
+    parser = argparse.ArgumentParser(description="Profil pemrosesan PDF dengan cProfile.")
+    parser.add_argument("pdfs", nargs="+", help="File PDF yang diproses")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    from product_system.processor import DocumentProcessor
+    from product_system.multi_processor import process_multiple_files
+
+    # process_multiple_files menghapus PDF input, jadi yang diproses adalah salinannya
+    work_dir = tempfile.mkdtemp(prefix="profile_")
+    try:
+        files = []
+        for idx, pdf in enumerate(args.pdfs):
+            pdf_path = os.path.join(work_dir, f"{idx}_{os.path.basename(pdf)}")
+            shutil.copy(pdf, pdf_path)
+            files.append({"pdf_path": pdf_path, "csv_path": None, "filename": os.path.basename(pdf)})
+        with request_profile(True):
+            if len(files) == 1:
+                DocumentProcessor().process(files[0]["pdf_path"])
+            else:
+                process_multiple_files(files)
+    except Exception as e:
+        # Profil dokumen yang gagal tetap ditulis (status: failed)
+        print(f"Processing failed: {str(e)}")
+        return 1
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        print(f"Profiles written to {PROFILE_FOLDER}")
+    return 0
+
+
+if __name__ == "__main__":
+    # Lewat modul yang sama dengan yang diimpor processor, bukan salinan __main__ (context var berbeda)
+    from product_system import profiling
+    sys.exit(profiling.main())
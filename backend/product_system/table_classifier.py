@@ -0,0 +1,201 @@
+import re
+from product_system import tracing
+
+SALES_COMMITMENT = "SALES COMMITMENT"
+STRATA_DISCOUNT = "STRATA DISCOUNT TABLE"
+DISCOUNT_PROMOTION = "DISCOUNT PROMOTION"
+PRODUCT_PROMOTION = "PRODUCT PROMOTION"
+OUTLET_LIST = "OUTLET LIST"
+
+SALES_COMMITMENT_PATTERN = re.compile(r"SALES\s*COMITMENT", re.IGNORECASE)
+
+# Header DocumentProcessor
+DOCUMENT_QTY_PATTERN = re.compile(r"(QTY\s*IN\s*CTN|QUANTITY\s*IN\s*CTN|QTY/CTN)", re.IGNORECASE)
+DOCUMENT_MIN_QTY_PATTERN = re.compile(r"(MIN\s*QTY\s*/\s*CTN|MIN\s*QTY)", re.IGNORECASE)
+
+# Header MultiDocumentProcessor (lebih longgar)
+MIN_QTY_PATTERN = re.compile(r"(MIN\s*QTY\s*/\s*CTN|MIN\s*QTY|MINIMUM\s*QUANTITY)", re.IGNORECASE)
+DISC_PATTERN = re.compile(r"(DISC\s*%|DISCOUNT\s*%|DISCOUNT)", re.IGNORECASE)
+SHARE_DISC_PATTERN = re.compile(r"(SHARE\s*DIST\s*%|SHARE\s*DISCOUNT\s*%|SHARE\s*%|SHARE)", re.IGNORECASE)
+QTY_PATTERN = re.compile(r"(QTY\s*IN\s*CTN|QUANTITY\s*IN\s*CTN|QTY/CTN|QUANTITY|QTY|TOTAL\s*QTY)", re.IGNORECASE)
+SKU_PATTERN = re.compile(r"(SKU|PRODUCT|ITEM|NAMA\s*PRODUK|PRODUCT\s*NAME|ITEM\s*DESCRIPTION)", re.IGNORECASE)
+UOM_PATTERN = re.compile(r"(UOM|UNIT|SATUAN|MEASURE)", re.IGNORECASE)
+
+
+def normalize_header_row(row):
+    return [cell.strip().replace("\n", " ") if cell else "" for cell in row]
+
+
+def first_match(cells, pattern):
+    for cell in cells:
+        if pattern.search(cell):
+            return cell
+    return None
+
+
+class ColumnIndex:
+    # Posisi kolom untuk satu daftar header, setara dengan dict(zip(headers, row)):
+    # header duplikat memakai kolom terakhir, urutan key mengikuti kemunculan pertama.
+    __slots__ = ("positions", "ordered", "_pattern_keys")
+
+    def __init__(self, keys, first_cell_as_sku=False):
+        positions = {}
+        ordered = []
+        for idx, key in enumerate(keys):
+            if key not in positions:
+                ordered.append(key)
+            positions[key] = idx
+        if first_cell_as_sku:
+            # Tabel SALES COMITMENT: SKU selalu diambil dari sel pertama
+            if "SKU" not in positions:
+                ordered.append("SKU")
+            positions["SKU"] = 0 if keys else None
+        self.positions = positions
+        self.ordered = ordered
+        self._pattern_keys = {}
+
+    def get(self, row, name):
+        idx = self.positions.get(name)
+        return "" if idx is None else row[idx]
+
+    def find(self, row, pattern):
+        # Nilai kolom pertama yang header-nya cocok dengan pattern, None jika tidak ada
+        if pattern not in self._pattern_keys:
+            self._pattern_keys[pattern] = first_match(self.ordered, pattern)
+        key = self._pattern_keys[pattern]
+        if key is None:
+            return None
+        return self.get(row, key)
+
+    def values(self, row):
+        for key in self.ordered:
+            yield self.get(row, key)
+
+
+class TableLayout:
+    __slots__ = (
+        "kind", "headers", "subheaders", "data_start_idx",
+        "qty_header", "min_qty_header", "disc_header", "share_disc_header", "sku_header", "uom_header",
+        "_columns"
+    )
+
+    def __init__(self, kind, headers=None, subheaders=None, data_start_idx=0, **header_names):
+        self.kind = kind
+        self.headers = headers or []
+        self.subheaders = subheaders or []
+        self.data_start_idx = data_start_idx
+        self.qty_header = header_names.get("qty_header")
+        self.min_qty_header = header_names.get("min_qty_header")
+        self.disc_header = header_names.get("disc_header")
+        self.share_disc_header = header_names.get("share_disc_header")
+        self.sku_header = header_names.get("sku_header")
+        self.uom_header = header_names.get("uom_header")
+        self._columns = {}
+
+    def columns(self, row):
+        # Index kolom di-resolve sekali per panjang baris, bukan per baris
+        length = len(row)
+        columns = self._columns.get(length)
+        if columns is None:
+            if self.kind == SALES_COMMITMENT and self.subheaders:
+                keys = self.subheaders + [""] * (length - len(self.subheaders))
+                columns = ColumnIndex(keys[:length], first_cell_as_sku=True)
+            else:
+                columns = ColumnIndex(self.headers[:length])
+            self._columns[length] = columns
+        return columns
+
+    def rows(self, table_rows):
+        for row in table_rows[self.data_start_idx:]:
+            yield row, self.columns(row)
+
+
+@tracing.traced("classify_table")
+def classify_document_table(table_rows):
+    qty_header = None
+    min_qty_header = None
+    header_row = None
+    data_start_idx = 0
+
+    for idx, raw_row in enumerate(table_rows):
+        table_row = normalize_header_row(raw_row)
+        if first_match(table_row, SALES_COMMITMENT_PATTERN) is not None:
+            return TableLayout(
+                SALES_COMMITMENT,
+                headers=table_rows[0],
+                subheaders=table_rows[1] if len(table_rows) > 1 else None,
+                data_start_idx=2
+            )
+        qty_header = first_match(table_row, DOCUMENT_QTY_PATTERN)
+        min_qty_header = first_match(table_row, DOCUMENT_MIN_QTY_PATTERN)
+        if qty_header or min_qty_header:
+            header_row = table_row
+            data_start_idx = idx + 1
+            break
+
+    if qty_header:
+        return TableLayout(SALES_COMMITMENT, headers=header_row, data_start_idx=data_start_idx, qty_header=qty_header)
+    if min_qty_header:
+        return TableLayout(STRATA_DISCOUNT, headers=header_row, data_start_idx=data_start_idx, min_qty_header=min_qty_header)
+
+    first_row = table_rows[0]
+    if any("DISCOUNT PROMOTION" in cell for cell in first_row) or any("PRICE LIST" in cell for cell in first_row):
+        return TableLayout(DISCOUNT_PROMOTION, headers=first_row)
+    if any("MIX ITEM" in cell for cell in first_row):
+        return TableLayout(PRODUCT_PROMOTION, headers=first_row)
+    if "NO" in first_row and "ID OUTLET" in first_row:
+        return TableLayout(OUTLET_LIST, headers=first_row)
+    return TableLayout(None)
+
+
+@tracing.traced("classify_table")
+def classify_multi_document_table(table_rows):
+    header_names = {}
+    header_row = None
+    data_start_idx = 0
+    is_outlet_list = False
+
+    for idx, raw_row in enumerate(table_rows):
+        table_row = normalize_header_row(raw_row)
+        if first_match(table_row, SALES_COMMITMENT_PATTERN) is not None:
+            return TableLayout(
+                SALES_COMMITMENT,
+                headers=table_rows[0],
+                subheaders=table_rows[1] if len(table_rows) > 1 else None,
+                data_start_idx=2,
+                **header_names
+            )
+
+        matched = False
+        for name, pattern in (
+            ("min_qty_header", MIN_QTY_PATTERN),
+            ("disc_header", DISC_PATTERN),
+            ("share_disc_header", SHARE_DISC_PATTERN),
+            ("qty_header", QTY_PATTERN),
+            ("sku_header", SKU_PATTERN),
+            ("uom_header", UOM_PATTERN),
+        ):
+            cell = first_match(table_row, pattern)
+            if cell is not None:
+                header_names[name] = cell
+                matched = True
+        if "NO" in table_row and "ID OUTLET" in table_row:
+            is_outlet_list = True
+            matched = True
+        if matched:
+            header_row = table_row
+            data_start_idx = idx + 1
+
+        # Header DISC/SHARE saja belum cukup, lanjut cari di baris berikutnya
+        if (header_names.get("min_qty_header") or header_names.get("qty_header") or header_names.get("sku_header")
+                or header_names.get("uom_header") or is_outlet_list):
+            break
+
+    headers = header_row if header_row else table_rows[0]
+    if header_names.get("min_qty_header") or header_names.get("disc_header") or header_names.get("share_disc_header"):
+        return TableLayout(STRATA_DISCOUNT, headers=headers, data_start_idx=data_start_idx, **header_names)
+    if header_names.get("qty_header") or header_names.get("sku_header"):
+        return TableLayout(SALES_COMMITMENT, headers=headers, data_start_idx=data_start_idx, **header_names)
+    if is_outlet_list:
+        return TableLayout(OUTLET_LIST, headers=header_row, data_start_idx=data_start_idx, **header_names)
+    return TableLayout(None, **header_names)
@@ -0,0 +1,55 @@
+import csv
+import json
+
+TABLE_SEPARATOR = "---"
+
+
+def normalize_table(table):
+    # Samakan dengan hasil baca CSV: sel kosong (None) menjadi string kosong
+    return [[cell if cell is not None else "" for cell in row] for row in table]
+
+
+def write_tables_csv(tables, csv_path):
+    # Artefak debug: satu tabel per blok, dipisah baris "---"
+    with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        for table in tables:
+            for row in table:
+                writer.writerow(row)
+            writer.writerow([TABLE_SEPARATOR] * len(table[0]))
+
+
+def iter_csv_tables(csv_path):
+    table_rows = []
+    with open(csv_path, 'r', encoding='utf-8') as csvfile:
+        for row in csv.reader(csvfile):
+            if row and row[0] == TABLE_SEPARATOR:
+                if table_rows:
+                    yield table_rows
+                table_rows = []
+                continue
+            table_rows.append(row)
+
+
+def write_tables_jsonl(tables, path):
+    # Spool tabel untuk pipeline streaming: satu tabel JSON per baris, isi sel (termasuk None) utuh
+    with open(path, 'w', encoding='utf-8') as f:
+        for table in tables:
+            f.write(json.dumps(table))
+            f.write("\n")
+
+
+def iter_jsonl_tables(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def iter_tables(source):
+    # source: list/iterator tabel hasil extract_text_and_tables, atau path CSV lama
+    if isinstance(source, str):
+        yield from iter_csv_tables(source)
+        return
+    for table in source:
+        if table:
+            yield normalize_table(table)
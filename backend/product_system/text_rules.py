@@ -0,0 +1,282 @@
+import re
+from datetime import datetime
+from utils.config import AREA_MAPPING, UOM_MAPPING
+from product_system.models import SkuEntry
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class TextRule:
+    # Satu aturan ekstraksi field dari satu baris teks.
+    # all_keywords/any_keywords: saringan murah (substring pada baris huruf besar) sebelum regex dijalankan.
+    # exclude_keywords: baris yang mengandung salah satunya dilewati.
+    # until_set: rule first-match-wins, berhenti dicari setelah field tersebut terisi.
+    # fallback_for: rule cadangan, baris pertama yang cocok baru dipakai setelah semua baris
+    #               diproses dan hanya jika field tersebut masih kosong.
+    __slots__ = ("name", "pattern", "action", "all_keywords", "any_keywords", "exclude_keywords", "until_set", "fallback_for")
+
+    def __init__(self, name, pattern, action, all_keywords=(), any_keywords=(), exclude_keywords=(), until_set=None, fallback_for=None):
+        self.name = name
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.action = action
+        self.all_keywords = tuple(keyword.upper() for keyword in all_keywords)
+        self.any_keywords = tuple(keyword.upper() for keyword in any_keywords)
+        self.exclude_keywords = tuple(keyword.upper() for keyword in exclude_keywords)
+        self.until_set = until_set
+        self.fallback_for = fallback_for
+
+    def could_match(self, upper_line):
+        for keyword in self.all_keywords:
+            if keyword not in upper_line:
+                return False
+        if self.any_keywords and not any(keyword in upper_line for keyword in self.any_keywords):
+            return False
+        for keyword in self.exclude_keywords:
+            if keyword in upper_line:
+                return False
+        return True
+
+
+class TextRuleEngine:
+    def __init__(self, rules):
+        self.rules = [rule for rule in rules if not rule.fallback_for]
+        self.fallback_rules = [rule for rule in rules if rule.fallback_for]
+
+    def parse(self, processor, lines):
+        parser = self.start(processor)
+        parser.feed(lines)
+        parser.finish()
+
+    def start(self, processor):
+        # Parser bertahap: baris bisa diberikan per halaman lewat feed(), lalu finish() sekali
+        return TextRuleParser(self, processor)
+
+
+class TextRuleParser:
+    def __init__(self, engine, processor):
+        self.processor = processor
+        self.rules = engine.rules
+        # Kandidat fallback dikumpulkan dalam pass yang sama, tidak perlu scan ulang semua baris
+        self.pending_fallbacks = list(engine.fallback_rules)
+        self.fallback_matches = []
+
+    def feed(self, lines):
+        processor = self.processor
+        data = processor.data
+        rules = self.rules
+        pending_fallbacks = self.pending_fallbacks
+        fallback_matches = self.fallback_matches
+
+        for line in lines:
+            line = line.strip()
+            upper_line = line.upper()
+            for rule in rules:
+                if rule.until_set and data[rule.until_set]:
+                    continue
+                if not rule.could_match(upper_line):
+                    continue
+                match = rule.pattern.search(line)
+                if match:
+                    rule.action(processor, match, line)
+
+            if pending_fallbacks:
+                for rule in list(pending_fallbacks):
+                    if data[rule.fallback_for]:
+                        # Field utama sudah terisi, fallback tidak akan dipakai lagi
+                        pending_fallbacks.remove(rule)
+                        continue
+                    if not rule.could_match(upper_line):
+                        continue
+                    match = rule.pattern.search(line)
+                    if match:
+                        fallback_matches.append((rule, match, line))
+                        pending_fallbacks.remove(rule)
+
+    def finish(self):
+        data = self.processor.data
+        for rule, match, line in self.fallback_matches:
+            if not data[rule.fallback_for]:
+                rule.action(self.processor, match, line)
+
+
+def normalize_nomor(nomor):
+    return nomor.replace("CP20DJFAJ001", "CP20DJFAJ01")
+
+
+def set_nomor(processor, match, line):
+    processor.data["nomor"] = normalize_nomor(match.group(0))
+
+
+def set_period(processor, match, line):
+    try:
+        start_date = datetime.strptime(match.group(1), "%d/%m/%Y")
+        end_date = datetime.strptime(match.group(2), "%d/%m/%Y")
+        processor.data["valid_from"] = start_date.strftime("%Y%m%d")
+        processor.data["valid_to"] = end_date.strftime("%Y%m%d")
+    except Exception as e:
+        logger.warning("Error parsing dates: %s", e)
+
+
+REF_CP_NO_PATTERN = re.compile(r"\s*REF\s*CP\s*NO", re.IGNORECASE)
+
+
+def set_brand(processor, match, line):
+    brand = match.group(1).strip().upper()
+    brand = REF_CP_NO_PATTERN.split(brand)[0].strip()
+    if brand and "REF CP NO" not in brand:
+        processor.data["brand"] = brand
+
+
+def set_area(processor, match, line):
+    distributor_code = match.group(1)
+    area_code = distributor_code[-2:] if len(distributor_code) >= 2 else None
+    processor.data["area_code"] = area_code
+    if area_code in AREA_MAPPING:
+        processor.data["area_name"] = AREA_MAPPING[area_code]["area_name"]
+        processor.data["ad_org_id"] = AREA_MAPPING[area_code]["ad_org_id"]
+
+
+def set_sub_promo_type(processor, match, line):
+    processor.data["sub_promo_type"] = match.group(1).strip().upper()
+
+
+INCLUDE_TRADING_TERM_PATTERN = re.compile(r"INCLUDE\s*TRADING\s*TERM\s*☑", re.IGNORECASE)
+
+
+def set_vendor_cashback(processor, match, line):
+    # INCLUDE didahulukan jika keduanya dicentang di baris yang sama
+    processor.data["vendor_cashback"] = "Y" if INCLUDE_TRADING_TERM_PATTERN.search(line) else "N"
+
+
+ISC_PATTERN = re.compile(r"list toko include \(selectiontype=ISC\)", re.IGNORECASE)
+
+
+def set_selection_type(processor, match, line):
+    processor.data["selection_type"] = "ISC" if ISC_PATTERN.search(line) else "ESC"
+
+
+def set_sku(processor, match, line):
+    processor.data["sku"] = match.group(0)
+
+
+def add_sku(processor, match, line):
+    sku = match.group(0)
+    if sku not in processor.sku_index:
+        processor.add_sku_entry(SkuEntry(sku))
+    processor.data["sku"] = sku
+    logger.debug("SKU found in text: %s", processor.data['sku'])
+
+
+def set_uom(processor, match, line):
+    uom = match.group(2).upper()
+    processor.data["uom"] = uom
+    processor.data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
+    logger.debug("UOM found in text: %s (c_uom_id: %s)", processor.data['uom'], processor.data['c_uom_id'])
+
+
+def set_fallback_brand(processor, match, line):
+    processor.data["brand"] = match.group(1).strip().upper()
+
+
+NOMOR_RULE = TextRule("nomor", r"CP\d{2}[A-Za-z]{3,5}\d{2,3}-\d+", set_nomor, all_keywords=("CP", "-"))
+PERIOD_RULE = TextRule("period", r"(\d{2}/\d{2}/\d{4})\s*[-–]\s*(\d{2}/\d{2}/\d{4})", set_period, all_keywords=("/",), any_keywords=("-", "–"))
+BRAND_RULE = TextRule("brand", r"(?:BRAND|PRODUCT\s*BRAND)\s*[:=\s-]+\s*([A-Za-z\s]+)", set_brand, all_keywords=("BRAND",))
+AREA_RULE = TextRule("area", r"DISTRIBUTOR\s*[:=]?\s*([A-Z0-9-]+)\s*-\s*CV", set_area, all_keywords=("DISTRIBUTOR", "CV"))
+SUB_PROMO_TYPE_RULE = TextRule(
+    "sub_promo_type",
+    r"SUB\s*PROMO\s*TYPE\s*[:=]?\s*\d{2}[A-Za-z]+\s*-\s*([A-Za-z\s]+)",
+    set_sub_promo_type,
+    all_keywords=("SUB", "PROMO", "TYPE")
+)
+VENDOR_CASHBACK_RULE = TextRule(
+    "vendor_cashback",
+    r"(?:INCLUDE|EXCLUDE)\s*TRADING\s*TERM\s*☑",
+    set_vendor_cashback,
+    all_keywords=("TRADING", "TERM", "☑")
+)
+SELECTION_TYPE_RULE = TextRule(
+    "selection_type",
+    r"list toko include \(selectiontype=ISC\)|list customer exclude \(selectiontype=ESC\)",
+    set_selection_type,
+    all_keywords=("(SELECTIONTYPE=",)
+)
+FALLBACK_BRAND_RULE = TextRule(
+    "brand_fallback",
+    r"\b(MILA|FORTUNE|SARI MURNI)\b",
+    set_fallback_brand,
+    any_keywords=("MILA", "FORTUNE", "SARI MURNI"),
+    exclude_keywords=("REF CP NO",),
+    fallback_for="brand"
+)
+
+# Field header yang hanya dibaca dari teks bebas
+HEADER_FIELD_RULES = (
+    NOMOR_RULE, PERIOD_RULE, BRAND_RULE, AREA_RULE, SUB_PROMO_TYPE_RULE, VENDOR_CASHBACK_RULE, SELECTION_TYPE_RULE
+)
+
+
+def has_header_field(table):
+    # True jika salah satu sel tabel berisi field header (mis. kotak REF DOC/PERIODE CP),
+    # tabel seperti ini tidak boleh dibuang dari teks untuk parse_text
+    for row in table:
+        for cell in row:
+            if not cell:
+                continue
+            for line in cell.split("\n"):
+                line = line.strip()
+                upper_line = line.upper()
+                for rule in HEADER_FIELD_RULES:
+                    if rule.could_match(upper_line) and rule.pattern.search(line):
+                        return True
+    return False
+
+
+# Aturan untuk DocumentProcessor (dokumen tunggal)
+DOCUMENT_RULES = TextRuleEngine([
+    NOMOR_RULE,
+    PERIOD_RULE,
+    BRAND_RULE,
+    AREA_RULE,
+    SUB_PROMO_TYPE_RULE,
+    VENDOR_CASHBACK_RULE,
+    SELECTION_TYPE_RULE,
+    TextRule(
+        "sku",
+        r"(MILA FLOUR BAG @1KG|FORTUNE (?:PREMIUM RICE|PALM OIL )?(?:PLP|PCH|JRG) @\d+(\.\d+)?[KL]T)",
+        set_sku,
+        all_keywords=("@",),
+        any_keywords=("MILA", "FORTUNE")
+    ),
+    FALLBACK_BRAND_RULE,
+])
+
+# Dipakai juga untuk mencari SKU di tabel tanpa header
+MULTI_SKU_RULE = TextRule(
+    "sku",
+    r"(MILA FLOUR BAG @1KG|MILA TEPUNG(?: \d+KG)?|TEPUNG MILA|FORTUNE (?:PREMIUM RICE|PALM OIL )?(?:PLP|PCH|JRG) @\d+(\.\d+)?[KL]T)",
+    add_sku,
+    any_keywords=("MILA", "FORTUNE")
+)
+
+# Aturan untuk MultiDocumentProcessor (banyak dokumen)
+MULTI_DOCUMENT_RULES = TextRuleEngine([
+    NOMOR_RULE,
+    PERIOD_RULE,
+    BRAND_RULE,
+    AREA_RULE,
+    SUB_PROMO_TYPE_RULE,
+    VENDOR_CASHBACK_RULE,
+    MULTI_SKU_RULE,
+    # UOM dari teks hanya sebagai fallback: baris pertama yang cocok menang
+    TextRule("uom", r"\b(\d*\.?\d+)?\s*(KG|LT|PC|PCS)\b", set_uom, any_keywords=("KG", "LT", "PC"), until_set="uom"),
+    FALLBACK_BRAND_RULE,
+])
+
+# Scan header batch: hanya field yang dibutuhkan untuk validasi silang dokumen.
+# Fallback brand sengaja tidak dipakai karena bisa berbeda dengan hasil dokumen penuh.
+HEADER_RULES = TextRuleEngine([
+    NOMOR_RULE,
+    BRAND_RULE,
+    AREA_RULE,
+])
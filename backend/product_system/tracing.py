@@ -0,0 +1,254 @@
+import contextvars
+import functools
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from utils.config import TRACE_FOLDER, TRACE_MAX_FILES
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Trace aktif untuk request/job/tugas pool saat ini; None = span tidak dicatat sama sekali
+CURRENT_TRACE = contextvars.ContextVar("current_trace", default=None)
+
+# Potongan event dari proses lain (pool, worker job) sebelum digabung oleh pemilik trace.
+# Potongan yang tidak pernah digabung (job hilang) dibersihkan setelah FRAGMENT_TTL detik.
+FRAGMENT_FOLDER = os.path.join(TRACE_FOLDER, ".fragments")
+FRAGMENT_TTL = 24 * 3600
+
+
+def now_us():
+    # Jam dinding dalam mikrodetik agar event dari proses berbeda bisa dijajarkan
+    return time.time_ns() // 1000
+
+
+class Trace:
+    # Kumpulan event Chrome trace (ph "X") milik satu proses untuk satu trace_id
+    def __init__(self, trace_id=None, label=None, process_name="app", root_name=None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.label = label
+        self.process_name = process_name
+        # Span pembungkus dari awal trace sampai selesai (mis. request atau job)
+        self.root_name = root_name
+        self.start = now_us()
+        self.events = []
+        self.threads = {}
+        # True jika pemrosesan diteruskan ke worker job: worker itu yang menulis file trace akhir
+        self.handed_off = False
+
+    def add_root_span(self, **args):
+        if self.root_name:
+            self.add_span(self.root_name, self.start, now_us(), args)
+
+    def add_span(self, name, start, end, args=None):
+        thread = threading.current_thread()
+        tid = threading.get_native_id()
+        self.threads.setdefault(tid, thread.name)
+        event = {"name": name, "ph": "X", "ts": start, "dur": end - start, "pid": os.getpid(), "tid": tid}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def _metadata(self):
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"{self.process_name} ({pid})"}}]
+        for tid, name in self.threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        return events
+
+    def write_fragment(self):
+        folder = os.path.join(FRAGMENT_FOLDER, self.trace_id)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl")
+        with open(path, 'w', encoding='utf-8') as fragment:
+            for event in self._metadata() + self.events:
+                fragment.write(json.dumps(event) + "\n")
+        self.events = []
+
+    def collect_events(self):
+        # Event sendiri ditambah potongan dari proses lain; potongan yang sudah dibaca dihapus
+        events = self._metadata() + self.events
+        folder = os.path.join(FRAGMENT_FOLDER, self.trace_id)
+        if os.path.isdir(folder):
+            for entry in os.scandir(folder):
+                with open(entry.path, 'r', encoding='utf-8') as fragment:
+                    events.extend(json.loads(line) for line in fragment if line.strip())
+        events.sort(key=lambda event: (event["ph"] != "M", event.get("ts", 0)))
+        shutil.rmtree(folder, ignore_errors=True)
+        self.events = []
+        return events
+
+    def finish(self, **info):
+        # Gabungkan event sendiri dengan potongan dari proses lain menjadi satu file trace
+        events = self.collect_events()
+
+        os.makedirs(TRACE_FOLDER, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d_%H%M%S')}_{self.label or 'trace'}_{self.trace_id}.json"
+        path = os.path.join(TRACE_FOLDER, name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as trace_file:
+            json.dump({
+                "traceEvents": events,
+                "displayTimeUnit": "ms",
+                "otherData": dict(info, trace_id=self.trace_id, label=self.label)
+            }, trace_file)
+        os.replace(tmp_path, path)
+        logger.info("Trace saved: %s", path)
+        prune_traces()
+        return path
+
+
+def prune_traces():
+    entries = sorted(
+        (entry for entry in os.scandir(TRACE_FOLDER) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in entries[:max(0, len(entries) - TRACE_MAX_FILES)]:
+        os.remove(entry.path)
+    if os.path.isdir(FRAGMENT_FOLDER):
+        cutoff = time.time() - FRAGMENT_TTL
+        for entry in os.scandir(FRAGMENT_FOLDER):
+            if entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class Span:
+    __slots__ = ("trace", "name", "args", "start")
+
+    def __init__(self, trace, name, args):
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = str(exc) or exc_type.__name__
+        self.trace.add_span(self.name, self.start, now_us(), self.args)
+        return False
+
+
+class NullSpan:
+    # Dipakai saat tidak ada trace aktif: tanpa jam, tanpa alokasi per span
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name, **args):
+    trace = CURRENT_TRACE.get()
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name, args)
+
+
+def traced(name):
+    # Decorator: seluruh pemanggilan fungsi/method menjadi satu span
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = CURRENT_TRACE.get()
+            if trace is None:
+                return fn(*args, **kwargs)
+            with Span(trace, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def iter_spans(name, items, describe=None):
+    # Satu span per item: waktu yang dipakai pemanggil untuk memproses item tersebut
+    # (di antara dua yield), terpisah dari waktu menghasilkan item berikutnya
+    trace = CURRENT_TRACE.get()
+    if trace is None:
+        yield from items
+        return
+    for index, item in enumerate(items):
+        args = {"index": index}
+        if describe is not None:
+            args.update(describe(item))
+        start = now_us()
+        try:
+            yield item
+        finally:
+            trace.add_span(name, start, now_us(), args)
+
+
+def current_id():
+    trace = CURRENT_TRACE.get()
+    return trace.trace_id if trace is not None else None
+
+
+def hand_off():
+    # Pemrosesan dilanjutkan worker job dengan trace_id yang sama; kembalikan id untuk disimpan di job.
+    # Event request ditulis sekarang, sebelum job diantrikan, agar selalu ada saat job menggabungkan trace.
+    trace = CURRENT_TRACE.get()
+    if trace is None:
+        return None
+    try:
+        trace.add_root_span()
+        trace.write_fragment()
+    except Exception as e:
+        logger.error("Error saving trace fragment %s: %s", trace.trace_id, e)
+    trace.handed_off = True
+    return trace.trace_id
+
+
+def begin(label, trace_id=None, process_name="app", root_name=None):
+    trace = Trace(trace_id, label, process_name, root_name)
+    return trace, CURRENT_TRACE.set(trace)
+
+
+def end(trace, token, **info):
+    CURRENT_TRACE.reset(token)
+    if trace.handed_off:
+        return
+    try:
+        trace.add_root_span(**info)
+        trace.finish(**info)
+    except Exception as e:
+        logger.error("Error saving trace %s: %s", trace.trace_id, e)
+
+
+@contextmanager
+def run(label, trace_id=None, process_name="app", root_name=None, **info):
+    trace, token = begin(label, trace_id, process_name, root_name)
+    try:
+        yield trace
+    finally:
+        end(trace, token, **info)
+
+
+def call_traced(trace_id, process_name, fn, *args):
+    # Untuk ProcessPoolExecutor: event tugas ini ditulis sebagai potongan trace_id milik proses induk
+    if trace_id is None:
+        return fn(*args)
+    trace, token = begin(None, trace_id, process_name)
+    try:
+        return fn(*args)
+    finally:
+        CURRENT_TRACE.reset(token)
+        try:
+            trace.write_fragment()
+        except Exception as e:
+            logger.error("Error saving trace fragment %s: %s", trace_id, e)
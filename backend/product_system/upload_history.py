@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+from utils.config import UPLOAD_HISTORY_PATH, UPLOAD_HISTORY_LIMIT
+
+
+class UploadHistory:
+    # Riwayat upload per browser di SQLite (mode WAL); cookie session hanya menyimpan id-nya.
+    # Upsert per (history_id, nomor) memakai primary key, riwayat dibatasi sekian nomor terakhir.
+    def __init__(self, db_path, limit):
+        self.db_path = db_path
+        self.limit = limit
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS upload_history (
+                    history_id TEXT NOT NULL,
+                    nomor TEXT NOT NULL,
+                    upload_time TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (history_id, nomor)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_upload_history_updated ON upload_history (history_id, updated_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.row_factory = sqlite3.Row
+        return closing(conn)
+
+    def remember(self, history_id, entries):
+        # entries: list of (nomor, upload_time). Nomor yang sudah ada hanya diperbarui waktunya
+        # dan tetap di posisi lamanya (rowid), sama seperti list di session sebelumnya.
+        if not entries:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("""
+                    INSERT INTO upload_history (history_id, nomor, upload_time, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (history_id, nomor) DO UPDATE SET upload_time = excluded.upload_time, updated_at = excluded.updated_at
+                """, [(history_id, nomor, upload_time, now) for nomor, upload_time in entries])
+                conn.execute("""
+                    DELETE FROM upload_history WHERE history_id = ? AND nomor NOT IN (
+                        SELECT nomor FROM upload_history WHERE history_id = ? ORDER BY updated_at DESC, rowid DESC LIMIT ?
+                    )
+                """, (history_id, history_id, self.limit))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def entries(self, history_id):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT nomor, upload_time FROM upload_history WHERE history_id = ? ORDER BY rowid", (history_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def forget(self, history_id, nomor):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM upload_history WHERE history_id = ? AND nomor = ?", (history_id, nomor))
+
+
+_history = None
+
+
+def get_upload_history():
+    global _history
+    if _history is None:
+        _history = UploadHistory(UPLOAD_HISTORY_PATH, UPLOAD_HISTORY_LIMIT)
+    return _history
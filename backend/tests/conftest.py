@@ -0,0 +1,60 @@
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+
+# python -m pytest tests (dari folder backend)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# utils.config dibaca saat modul diimpor, jadi database tes diarahkan ke folder sementara sebelum
+# modul aplikasi mana pun dimuat. Metrik, cache, profil, trace dan worker job dimatikan; tes yang
+# membutuhkannya membuat instance sendiri atau mengganti konstanta modul lewat monkeypatch.
+TEST_DATA_DIR = tempfile.mkdtemp(prefix="proyek_pdf_tests_")
+for name, filename in (
+    ("EXTRACTION_CACHE_PATH", "extraction_cache.db"),
+    ("BATCH_RESULTS_PATH", "batch_results.db"),
+    ("OUTPUT_INDEX_PATH", "outputs.db"),
+    ("UPLOAD_HISTORY_PATH", "upload_history.db"),
+    ("METRICS_PATH", "metrics.db"),
+    ("JOB_QUEUE_PATH", "jobs.db"),
+):
+    os.environ[name] = os.path.join(TEST_DATA_DIR, filename)
+os.environ["PROFILE_FOLDER"] = os.path.join(TEST_DATA_DIR, "profiles")
+os.environ["TRACE_FOLDER"] = os.path.join(TEST_DATA_DIR, "traces")
+os.environ.update({
+    "EXTRACTION_CACHE_ENABLED": "0",
+    "METRICS_ENABLED": "0",
+    "PROFILE_ENABLED": "0",
+    "TRACE_ENABLED": "0",
+    "JOB_WORKERS": "0",
+    "BATCH_WORKERS": "2",
+})
+
+SAMPLE_PDF = os.path.join(
+    BACKEND_DIR, 'database', 'product_system', 'uploads', '20250410_133930_CP20DJFAJ001-2400951_DK_BERAS_FORTUNE.pdf'
+)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def synthetic_pdf(tmp_path):
+    # Dokumen CP sintetis dari benchmarks/synthetic.py; outlets > 40 menghasilkan lampiran multi halaman
+    from benchmarks import synthetic
+
+    def write(seq=1, outlets=0, name=None):
+        return synthetic.write_document(str(tmp_path / (name or f"cp-{seq}-{outlets}.pdf")), seq, outlets)
+    return write
+
+
+@pytest.fixture
+def sample_pdf():
+    if not os.path.exists(SAMPLE_PDF):
+        pytest.skip("PDF sampel tidak tersedia")
+    return SAMPLE_PDF
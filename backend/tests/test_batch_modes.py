@@ -0,0 +1,99 @@
+import json
+import os
+import pickle
+import shutil
+import time
+import pytest
+from product_system import batch_results, multi_processor
+from product_system.batch_results import BatchResultStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BatchResultStore(str(tmp_path / "batch_results.db"), 3600)
+    monkeypatch.setattr(batch_results, "_store", store)
+    return store
+
+
+@pytest.fixture
+def batch(tmp_path, synthetic_pdf):
+    # Salinan baru setiap batch karena process_multiple_files menghapus PDF input
+    sources = {seq: synthetic_pdf(seq=seq, outlets=60 if seq == 1 else 0) for seq in (1, 2, 3)}
+
+    def make(broken=()):
+        files = []
+        for seq, source in sources.items():
+            pdf_path = str(tmp_path / f"upload-{seq}.pdf")
+            if seq in broken:
+                with open(pdf_path, "wb") as f:
+                    f.write(b"%PDF-1.4 rusak")
+            else:
+                shutil.copy(source, pdf_path)
+            files.append({"pdf_path": pdf_path, "csv_path": None, "filename": f"CP-{seq}.pdf"})
+        return files
+    return make
+
+
+def count_rows(store):
+    with store._connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM batch_results").fetchone()[0]
+
+
+def test_all_mode_reports_every_failed_document(batch):
+    files = batch(broken=(2, 3))
+    with pytest.raises(ValueError) as error:
+        multi_processor.process_multiple_files(files, mode="all")
+    assert "CP-2.pdf" in str(error.value) and "CP-3.pdf" in str(error.value)
+    assert not any(os.path.exists(file["pdf_path"]) for file in files)
+
+
+def test_fail_fast_stops_at_first_failure(batch):
+    files = batch(broken=(2, 3))
+    with pytest.raises(ValueError) as error:
+        multi_processor.process_multiple_files(files, mode="fail_fast")
+    message = str(error.value)
+    assert message.startswith("Error processing CP-")
+    assert len(message.split("\n")) == 1
+    assert not any(os.path.exists(file["pdf_path"]) for file in files)
+
+
+def test_fail_fast_without_failures_matches_all_mode(batch):
+    expected = multi_processor.process_multiple_files(batch(), mode="all")
+    assert json.dumps(multi_processor.process_multiple_files(batch(), mode="fail_fast")) == json.dumps(expected)
+    assert len({nomor for _, nomor, _ in expected}) == 3
+
+
+def test_keep_going_reuses_stored_results(batch, store, monkeypatch):
+    expected = multi_processor.process_multiple_files(batch(), mode="all")
+
+    with pytest.raises(ValueError):
+        multi_processor.process_multiple_files(batch(broken=(3,)), mode="keep_going")
+    assert count_rows(store) == 2
+
+    # Serial agar dokumen yang benar-benar diproses ulang bisa dihitung
+    processed = []
+    process_document = multi_processor.process_document
+
+    def counting(pdf_path, *args, **kwargs):
+        processed.append(os.path.basename(pdf_path))
+        return process_document(pdf_path, *args, **kwargs)
+    monkeypatch.setattr(multi_processor, "BATCH_WORKERS", 1)
+    monkeypatch.setattr(multi_processor, "process_document", counting)
+
+    result = multi_processor.process_multiple_files(batch(), mode="keep_going")
+    assert processed == ["upload-3.pdf"]
+    assert json.dumps(result) == json.dumps(expected)
+    assert count_rows(store) == 0
+
+
+def test_unreadable_stored_results_are_discarded(store, synthetic_pdf):
+    pdf_path = synthetic_pdf()
+    legacy = store.key_for(pdf_path, "lama.pdf")
+    old_version = store.key_for(pdf_path, "versi.pdf")
+    with store._connect() as conn:
+        conn.execute("INSERT INTO batch_results VALUES (?, ?, ?)", (legacy, pickle.dumps({"processor": 1}), time.time()))
+        conn.execute("INSERT INTO batch_results VALUES (?, ?, ?)", (old_version, json.dumps({"version": 0}), time.time()))
+
+    assert store.get(legacy) is None
+    assert store.get(old_version) is None
+    assert count_rows(store) == 0
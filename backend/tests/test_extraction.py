@@ -0,0 +1,67 @@
+import pytest
+from product_system import extraction, text_rules
+
+
+def collect(pages):
+    return [(page_number, text, tables) for page_number, text, tables in pages]
+
+
+def test_single_pass_matches_legacy_extraction(synthetic_pdf):
+    pdf_path = synthetic_pdf(outlets=200)
+    single_pass = collect(extraction.iter_document(pdf_path, single_pass=True))
+    legacy = collect(extraction.iter_document(pdf_path, single_pass=False))
+    assert len(single_pass) > 1
+    assert single_pass == legacy
+
+
+def test_parallel_pages_match_serial_order_and_content(synthetic_pdf):
+    pdf_path = synthetic_pdf(outlets=200)
+    serial = collect(extraction.iter_document(pdf_path))
+    parallel = collect(extraction.iter_document(pdf_path, workers=2, min_pages=1))
+    assert [page_number for page_number, _, _ in parallel] == list(range(1, len(serial) + 1))
+    assert parallel == serial
+
+
+def test_small_documents_stay_serial(synthetic_pdf, monkeypatch):
+    pdf_path = synthetic_pdf(outlets=0)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("pool dipakai untuk dokumen di bawah min_pages")
+    monkeypatch.setattr(extraction, "_iter_pages_parallel", fail)
+    assert collect(extraction.iter_document(pdf_path, workers=2, min_pages=8))
+
+
+def test_document_tables_match_full_extraction(synthetic_pdf):
+    pdf_path = synthetic_pdf(outlets=200)
+    _, tables = extraction.extract_text_and_tables(pdf_path)
+    assert extraction.extract_document_tables(pdf_path) == tables
+    assert extraction.extract_document_tables(pdf_path, workers=2, min_pages=1) == tables
+
+
+def test_text_only_pass_matches_full_extraction(synthetic_pdf):
+    pdf_path = synthetic_pdf(outlets=200)
+    text, _ = extraction.extract_text_and_tables(pdf_path)
+    assert extraction.extract_text(pdf_path) == text
+
+
+def test_has_header_field_detects_header_tables():
+    assert text_rules.has_header_field([["REF DOC: APP-1"], ["PERIODE CP: 28/12/2024 - 31/12/2024"]])
+    assert text_rules.has_header_field([["X", None], ["BRAND : FORTUNE"]])
+    assert not text_rules.has_header_field([["NO", "ID OUTLET"], ["1", "C0010000001"], [None, ""]])
+
+
+@pytest.mark.parametrize("exclude_table_rows", [1, 2, 3, 4])
+def test_excluded_tables_keep_header_fields_in_text(sample_pdf, exclude_table_rows):
+    # Kotak REF DOC/PERIODE CP (3 baris) tidak boleh ikut terbuang dari teks
+    text, tables = extraction.extract_text_and_tables(sample_pdf, exclude_table_rows=exclude_table_rows)
+    assert "PERIODE CP: 28/12/2024 - 31/12/2024" in text
+    assert tables == extraction.extract_text_and_tables(sample_pdf)[1]
+
+
+def test_large_tables_are_cropped_from_text(synthetic_pdf):
+    pdf_path = synthetic_pdf(outlets=120)
+    full_text, _ = extraction.extract_text_and_tables(pdf_path)
+    cropped_text, _ = extraction.extract_text_and_tables(pdf_path, exclude_table_rows=3)
+    assert "TOKO SINTETIS 1-120" in full_text
+    assert "TOKO SINTETIS 1-120" not in cropped_text
+    assert "PERIODE CP: 28/12/2024 - 31/12/2024" in cropped_text
@@ -0,0 +1,96 @@
+import json
+import random
+import string
+import time
+import zlib
+from product_system.extraction_cache import ExtractionCache
+
+
+def payload_size(text, tables):
+    return len(zlib.compress(json.dumps({"text": text, "tables": tables}).encode('utf-8')))
+
+
+def make_cache(tmp_path, max_bytes):
+    return ExtractionCache(str(tmp_path / "cache.db"), max_bytes)
+
+
+def test_hit_returns_stored_text_and_tables(tmp_path):
+    cache = make_cache(tmp_path, 1024 * 1024)
+    tables = [[["SKU", "UOM"], ["FORTUNE", None]]]
+    assert cache.get("a") is None
+    cache.put("a", "teks", tables)
+    assert cache.get("a") == ("teks", tables)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted_first(tmp_path):
+    size = payload_size("x" * 10, [])
+    cache = make_cache(tmp_path, size * 2)
+    cache.put("a", "a" * 10, [])
+    time.sleep(0.01)
+    cache.put("b", "b" * 10, [])
+    time.sleep(0.01)
+    # Akses "a" membuatnya lebih baru dari "b"
+    assert cache.get("a") is not None
+    time.sleep(0.01)
+    cache.put("c", "c" * 10, [])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ("a" * 10, [])
+    assert cache.get("c") == ("c" * 10, [])
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_eviction_removes_as_many_entries_as_needed(tmp_path):
+    small = payload_size("s", [])
+    cache = make_cache(tmp_path, small * 3)
+    for name in ("a", "b", "c"):
+        cache.put(name, "s", [])
+        time.sleep(0.01)
+    # Teks acak (sulit dikompres) yang payload-nya lebih besar dari dua entri kecil
+    rng = random.Random(0)
+    big_text = ""
+    while payload_size(big_text, []) <= small * 2:
+        big_text += rng.choice(string.ascii_letters)
+    assert payload_size(big_text, []) <= small * 3
+    cache.put("big", big_text, [])
+
+    assert [cache.get(name) is None for name in ("a", "b", "c")] == [True, True, True]
+    assert cache.get("big") == (big_text, [])
+    assert cache.stats()["evictions"] == 3
+
+
+def test_payload_larger_than_cache_is_not_stored(tmp_path):
+    cache = make_cache(tmp_path, 8)
+    cache.put("a", "teks yang terlalu besar untuk cache", [])
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_variants_are_cached_separately(tmp_path):
+    cache = make_cache(tmp_path, 1024 * 1024)
+    pdf_path = tmp_path / "doc.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 isi")
+    calls = []
+
+    def extract(variant_text):
+        def extract_fn(path):
+            calls.append(variant_text)
+            return variant_text, []
+        return extract_fn
+
+    assert cache.get_or_extract(str(pdf_path), extract("penuh")) == ("penuh", [])
+    assert cache.get_or_extract(str(pdf_path), extract("potong"), variant="exclude_table_rows=5") == ("potong", [])
+    assert cache.get_or_extract(str(pdf_path), extract("lain")) == ("penuh", [])
+    assert calls == ["penuh", "potong"]
+
+
+def test_empty_extraction_is_not_cached(tmp_path):
+    cache = make_cache(tmp_path, 1024 * 1024)
+    pdf_path = tmp_path / "kosong.pdf"
+    pdf_path.write_bytes(b"bukan pdf")
+    assert cache.get_or_extract(str(pdf_path), lambda path: ("", [])) == ("", [])
+    assert cache.stats()["entries"] == 0
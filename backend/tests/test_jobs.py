@@ -0,0 +1,122 @@
+import threading
+import time
+import pytest
+from product_system import jobs
+from product_system.jobs import JobQueue
+
+
+def make_queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.db"))
+
+
+def pdf_files(tmp_path, *names):
+    files = []
+    for name in names:
+        pdf_path = tmp_path / name
+        pdf_path.write_bytes(b"%PDF-1.4")
+        files.append({"pdf_path": str(pdf_path), "csv_path": str(tmp_path / (name + ".csv")), "filename": name})
+    return files
+
+
+def test_jobs_are_claimed_in_enqueue_order(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.enqueue("single", pdf_files(tmp_path, "a.pdf"), debug=True)
+    second = queue.enqueue("multiple", pdf_files(tmp_path, "b.pdf", "c.pdf"))
+
+    job = queue.claim("w1")
+    assert (job["id"], job["status"], job["attempts"], job["debug"]) == (first, jobs.RUNNING, 1, True)
+    assert queue.claim("w1")["id"] == second
+    assert queue.claim("w1") is None
+
+    queue.finish(first, ["CP20DJFAJ01-2400951"])
+    queue.fail(second, "Dokumen kosong")
+    assert queue.get(first)["nomors"] == ["CP20DJFAJ01-2400951"]
+    assert (queue.get(second)["status"], queue.get(second)["error"]) == (jobs.FAILED, "Dokumen kosong")
+
+
+def test_unknown_job_kind_is_rejected(tmp_path):
+    queue = make_queue(tmp_path)
+    with pytest.raises(ValueError):
+        queue.enqueue("batch", [])
+
+
+def test_each_job_is_claimed_by_one_worker(tmp_path):
+    queue = make_queue(tmp_path)
+    job_ids = {queue.enqueue("single", pdf_files(tmp_path, f"{idx}.pdf")) for idx in range(30)}
+    claimed = []
+    lock = threading.Lock()
+
+    def work(worker_id):
+        # Tiap thread memakai koneksi sendiri, seperti worker gunicorn yang berbeda
+        worker_queue = make_queue(tmp_path)
+        while True:
+            job = worker_queue.claim(worker_id)
+            if job is None:
+                return
+            with lock:
+                claimed.append(job["id"])
+
+    threads = [threading.Thread(target=work, args=(f"w{idx}",)) for idx in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(job_ids)
+
+
+def test_jobs_of_dead_workers_are_requeued(tmp_path):
+    queue = make_queue(tmp_path)
+    alive = queue.enqueue("single", pdf_files(tmp_path, "a.pdf"))
+    dead = queue.enqueue("single", pdf_files(tmp_path, "b.pdf"))
+    queue.heartbeat("alive")
+    queue.claim("alive")
+    queue.claim("dead")
+
+    assert queue.requeue_stale() == 1
+    assert queue.get(alive)["status"] == jobs.RUNNING
+    assert (queue.get(dead)["status"], queue.get(dead)["worker_id"]) == (jobs.QUEUED, None)
+    job = queue.claim("alive")
+    assert (job["id"], job["attempts"]) == (dead, 2)
+
+
+def test_stale_job_with_deleted_pdf_fails(tmp_path):
+    queue = make_queue(tmp_path)
+    files = pdf_files(tmp_path, "a.pdf", "b.pdf")
+    job_id = queue.enqueue("multiple", files)
+    queue.claim("dead")
+    (tmp_path / "b.pdf").unlink()
+
+    queue.requeue_stale()
+    job = queue.get(job_id)
+    assert job["status"] == jobs.FAILED
+    assert "sudah tidak tersedia" in job["error"]
+    assert queue.claim("alive") is None
+
+
+def test_stale_job_fails_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_MAX_ATTEMPTS", 2)
+    queue = make_queue(tmp_path)
+    job_id = queue.enqueue("single", pdf_files(tmp_path, "a.pdf"))
+    queue.claim("dead-1")
+    queue.requeue_stale()
+    queue.claim("dead-2")
+    queue.requeue_stale()
+
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == (jobs.FAILED, 2, "Worker berhenti saat memproses job.")
+
+
+def test_finished_jobs_are_pruned_after_ttl(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RESULT_TTL", 0.05)
+    queue = make_queue(tmp_path)
+    old = queue.enqueue("single", pdf_files(tmp_path, "a.pdf"))
+    pending = queue.enqueue("single", pdf_files(tmp_path, "b.pdf"))
+    queue.claim("w1")
+    queue.finish(old, ["CP1"])
+    time.sleep(0.1)
+
+    recent = queue.enqueue("single", pdf_files(tmp_path, "c.pdf"))
+    queue.fail(recent, "gagal")
+    assert queue.get(old) is None
+    assert queue.get(recent)["status"] == jobs.FAILED
+    assert queue.get(pending)["status"] == jobs.QUEUED
@@ -0,0 +1,146 @@
+import json
+import os
+import random
+import pytest
+from product_system import output_index
+from product_system.output_index import OutputIndex, parsed_fields, split_name
+
+BRANDS = ["FORTUNE", "MILA", "GOLDEN BIRD OIL"]
+SUB_PROMO_TYPES = ["DEAL KHUSUS", "STRATA DISCOUNT"]
+AREAS = [("01", 1000006, "PST"), ("03", 1000005, "KTB")]
+
+
+@pytest.fixture
+def index(tmp_path):
+    return OutputIndex(str(tmp_path / "outputs.db"))
+
+
+def write_output(index, folder, nomor, brand, sub_promo_type, area, validfrom, mtime, fields=True):
+    area_code, ad_org_id, area_name = area
+    json_data = {
+        "name": f"{brand} {sub_promo_type} {area_name}",
+        "validfrom": validfrom,
+        "validto": str(int(validfrom) + 30),
+        "list_org": [{"ad_orgtrx_id": ad_org_id}],
+        "list_customer": [],
+        "list_break": [{"name": f"{nomor} {brand}"}]
+    }
+    json_path = os.path.join(folder, f"{nomor}.json")
+    with open(json_path, 'w', encoding='utf-8') as json_file:
+        json.dump(json_data, json_file)
+    os.utime(json_path, (mtime, mtime))
+    data = {"brand": brand, "sub_promo_type": sub_promo_type}
+    return index.record(nomor, json_data, json_path, parsed_fields(data) if fields else None)
+
+
+@pytest.fixture
+def outputs(index, tmp_path):
+    # 60 output, mtime sengaja banyak yang sama agar cursor harus memakai nomor sebagai pemisah
+    rng = random.Random(11)
+    rows = []
+    for idx in range(60):
+        rows.append(write_output(
+            index, str(tmp_path), f"CP20DJFAJ01-{idx:07d}", rng.choice(BRANDS), rng.choice(SUB_PROMO_TYPES),
+            rng.choice(AREAS), f"202501{rng.randint(1, 28):02d}", 1700000000 + rng.randint(0, 5)
+        ))
+    return rows
+
+
+def collect_pages(search, limit):
+    items = []
+    cursor = None
+    while True:
+        page, cursor = search(cursor=cursor, limit=limit)
+        assert len(page) <= limit
+        items.extend(page)
+        if cursor is None:
+            return items
+
+
+@pytest.mark.parametrize("limit", [1, 7, 60, 500])
+def test_cursor_pages_cover_every_output_once(index, outputs, limit):
+    items = collect_pages(index.search, limit)
+    assert [item["nomor"] for item in items] == [
+        row["nomor"] for row in sorted(outputs, key=lambda row: (row["mtime"], row["nomor"]), reverse=True)
+    ]
+
+
+def test_filters_use_parsed_fields(index, outputs):
+    def search(**filters):
+        items = collect_pages(lambda **page: index.search(**filters, **page), 4)
+        return sorted(item["nomor"] for item in items)
+
+    def expected(predicate):
+        return sorted(row["nomor"] for row in outputs if predicate(row))
+
+    assert search(brand="golden bird oil") == expected(lambda row: row["brand"] == "GOLDEN BIRD OIL")
+    assert search(sub_promo_type="Deal Khusus") == expected(lambda row: row["sub_promo_type"] == "DEAL KHUSUS")
+    assert search(area="03") == search(area="ktb") == expected(lambda row: row["area_code"] == "03")
+    assert search(brand="MILA", area="PST") == expected(lambda row: row["brand"] == "MILA" and row["area_name"] == "PST")
+    assert search(valid_from="20250140", valid_to="20250150") == expected(
+        lambda row: row["validto"] >= "20250140" and row["validfrom"] <= "20250150"
+    )
+
+
+def test_outputs_without_parsed_fields_use_known_brands(index, tmp_path):
+    write_output(index, str(tmp_path), "CP1", "GOLDEN BIRD OIL", "DEAL KHUSUS", AREAS[0], "20250101", 1700000000)
+    legacy = write_output(index, str(tmp_path), "CP2", "GOLDEN BIRD OIL", "STRATA DISCOUNT", AREAS[0], "20250101", 1700000001, fields=False)
+    assert (legacy["brand"], legacy["sub_promo_type"]) == ("GOLDEN BIRD OIL", "STRATA DISCOUNT")
+
+    # Index ulang tanpa processor tetap memakai nilai yang sudah tersimpan
+    index.sync(str(tmp_path))
+    os.utime(tmp_path / "CP1.json", (1700000002, 1700000002))
+    index.sync(str(tmp_path))
+    assert index.get_many(["CP1"])["CP1"]["brand"] == "GOLDEN BIRD OIL"
+
+
+def test_split_name_prefers_longest_known_brand():
+    assert split_name("GOLDEN BIRD OIL DEAL KHUSUS PST", "PST", ["GOLDEN", "GOLDEN BIRD OIL"]) == {
+        "brand": "GOLDEN BIRD OIL", "sub_promo_type": "DEAL KHUSUS"
+    }
+    assert split_name("FORTUNE DEAL KHUSUS PST", "PST") == {"brand": "FORTUNE", "sub_promo_type": "DEAL KHUSUS"}
+    assert split_name("PST", "PST") == {"brand": None, "sub_promo_type": None}
+
+
+def test_invalid_cursor_is_rejected(index):
+    with pytest.raises(ValueError):
+        index.search(cursor="tanpa-pemisah")
+
+
+@pytest.fixture
+def client(index, outputs, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, "get_output_index", lambda: index)
+    return app_module.app.test_client()
+
+
+def test_api_outputs_pages_with_next_cursor(client, outputs):
+    nomors = []
+    cursor = None
+    while True:
+        query = {"limit": 9}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get('/api/outputs', query_string=query)
+        assert response.status_code == 200
+        body = response.get_json()
+        nomors.extend(item["nomor"] for item in body["items"])
+        assert all(item["download_url"].endswith(item["nomor"]) for item in body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(nomors) == sorted(row["nomor"] for row in outputs)
+    assert len(nomors) == len(set(nomors))
+
+
+@pytest.mark.parametrize("query", [
+    {"cursor": "tanpa-pemisah"},
+    {"cursor": "bukan-angka|CP1"},
+    {"limit": "banyak"},
+    {"valid_from": "2025-01-01"},
+    {"valid_to": "202501"},
+])
+def test_api_outputs_rejects_invalid_parameters(client, query):
+    response = client.get('/api/outputs', query_string=query)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
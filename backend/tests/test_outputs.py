@@ -0,0 +1,96 @@
+import io
+import json
+import random
+import pytest
+from product_system import outputs
+
+INDENTS = [0, 2, 4]
+
+
+def reference_dumps(json_data, indent):
+    if indent:
+        return json.dumps(json_data, indent=indent)
+    return json.dumps(json_data, separators=(",", ":"))
+
+
+def written(json_data, indent):
+    json_file = io.StringIO()
+    outputs.write_json(json_data, json_file, indent=indent)
+    return json_file.getvalue()
+
+
+def customers(count):
+    return [
+        {"c_bpartner_id": f"C{idx:07d}", "name": f"TOKO “SINTETIS” {idx} – Lampung", "ad_org_id": 0, "isactive": "Y"}
+        for idx in range(count)
+    ]
+
+
+def random_value(rng, depth=0):
+    choice = rng.randint(0, 7 if depth < 3 else 4)
+    if choice == 0:
+        return None
+    if choice == 1:
+        return rng.choice([True, False])
+    if choice == 2:
+        return rng.choice([0, -3, 1000000, 2.76, 0.5, 1e-7])
+    if choice in (3, 4):
+        return rng.choice(["", "FORTUNE", "ÉCLAIR ☑", "baris\nbaru", "\"kutip\"", "日本"])
+    if choice == 5:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    return {rng.choice(["a", "name", "ü", "list"]) + str(idx): random_value(rng, depth + 1) for idx in range(rng.randint(0, 3))}
+
+
+def random_document(rng):
+    json_data = {}
+    for key in ("name", "list_customer", "validfrom", "list_break", "extra"):
+        if rng.random() < 0.2:
+            continue
+        if key in outputs.STREAMED_KEYS:
+            json_data[key] = [random_value(rng, 1) for _ in range(rng.randint(0, 4))]
+        else:
+            json_data[key] = random_value(rng)
+    return json_data
+
+
+@pytest.mark.parametrize("indent", INDENTS)
+def test_streamed_output_matches_json_dumps(indent):
+    documents = [
+        {},
+        {"list_customer": [], "list_break": []},
+        {"name": "CP ☑", "list_customer": customers(3), "list_break": [{"name": "CP1 FORTUNE", "strata": [{}, []]}]},
+    ]
+    rng = random.Random(indent)
+    documents.extend(random_document(rng) for _ in range(300))
+    for json_data in documents:
+        assert written(json_data, indent) == reference_dumps(json_data, indent)
+
+
+@pytest.mark.parametrize("indent", INDENTS)
+def test_streamed_lists_may_be_iterators(indent):
+    json_data = {"name": "CP", "list_customer": customers(5), "list_break": [{"name": "CP1"}], "selectiontype": "ISC"}
+    lazy = dict(json_data, list_customer=iter(json_data["list_customer"]), list_break=(item for item in json_data["list_break"]))
+    assert written(lazy, indent) == reference_dumps(json_data, indent)
+    assert written(dict(json_data, list_customer=iter([])), indent) == reference_dumps(dict(json_data, list_customer=[]), indent)
+
+
+def test_generated_document_matches_json_dumps(synthetic_pdf):
+    from product_system.processor import DocumentProcessor
+    json_data = DocumentProcessor().process(synthetic_pdf(outlets=90))
+    for indent in INDENTS:
+        assert written(json_data, indent) == reference_dumps(json_data, indent)
+
+
+def test_shared_outlets_expand_to_original_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(outputs, "OUTLET_FOLDER", str(tmp_path / "outlets"))
+    list_customer = customers(50)
+    json_data = {"name": "CP", "list_customer": list_customer, "list_break": [{"name": "CP1"}]}
+
+    outlet_ref = outputs.save_outlet_artifact(iter(list_customer))
+    assert outlet_ref["count"] == 50
+    assert outputs.save_outlet_artifact(list_customer) == outlet_ref
+
+    shared = outputs.share_outlets(json_data, outlet_ref)
+    assert list(shared) == ["name", outputs.OUTLET_REF_KEY, "list_break"]
+    assert written(outputs.expand_json(shared), 2) == reference_dumps(json_data, 2)
+    assert outputs.expand_json(json_data) is json_data
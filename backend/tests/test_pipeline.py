@@ -0,0 +1,50 @@
+import json
+import pytest
+from product_system import multi_processor, processor
+from product_system.processor import DocumentProcessor
+from product_system.multi_processor import MultiDocumentProcessor
+
+# (PDF_STREAMING, PDF_TEXT_FIRST); (False, False) adalah jalur lama yang menjadi acuan
+MODES = [(False, True), (True, False), (True, True)]
+
+
+def set_mode(monkeypatch, streaming, text_first):
+    for module in (processor, multi_processor):
+        monkeypatch.setattr(module, "PDF_STREAMING", streaming)
+        monkeypatch.setattr(module, "PDF_TEXT_FIRST", text_first)
+
+
+def run_document(pdf_path):
+    return json.dumps(DocumentProcessor().process(pdf_path))
+
+
+def run_multi_document(pdf_path):
+    document = MultiDocumentProcessor()
+    data = document.process(pdf_path)
+    return json.dumps([document.generate_json([]), list(data["outlets"])])
+
+
+@pytest.fixture
+def documents(synthetic_pdf, sample_pdf):
+    # Sampel asli dan dokumen sintetis dengan lampiran outlet beberapa halaman
+    return [sample_pdf, synthetic_pdf(seq=7, outlets=90), synthetic_pdf(seq=8, outlets=0)]
+
+
+@pytest.mark.parametrize("streaming,text_first", MODES)
+def test_pipeline_modes_match_in_memory_extraction(documents, monkeypatch, streaming, text_first):
+    set_mode(monkeypatch, False, False)
+    expected = [(run_document(pdf_path), run_multi_document(pdf_path)) for pdf_path in documents]
+
+    set_mode(monkeypatch, streaming, text_first)
+    assert [(run_document(pdf_path), run_multi_document(pdf_path)) for pdf_path in documents] == expected
+
+
+@pytest.mark.parametrize("streaming,text_first", [(False, False)] + MODES)
+@pytest.mark.parametrize("content", [b"", b"%PDF-1.4 rusak"])
+def test_unreadable_pdf_is_rejected_in_every_mode(tmp_path, monkeypatch, streaming, text_first, content):
+    set_mode(monkeypatch, streaming, text_first)
+    pdf_path = tmp_path / "rusak.pdf"
+    pdf_path.write_bytes(content)
+    for document in (DocumentProcessor(), MultiDocumentProcessor()):
+        with pytest.raises(ValueError, match="Dokumen kosong"):
+            document.process(str(pdf_path))
@@ -0,0 +1,96 @@
+import random
+import re
+from product_system import table_classifier
+from product_system.table_classifier import ColumnIndex, TableLayout, SALES_COMMITMENT, STRATA_DISCOUNT
+
+KEYS = ["SKU", "UOM", "QTY IN CTN", "DISC %", "SHARE DIST %", "", None, "CUT PRICE"]
+QTY_PATTERN = re.compile(r"(QTY\s*IN\s*CTN|QUANTITY|QTY)", re.IGNORECASE)
+
+
+def reference_row(keys, row, first_cell_as_sku=False):
+    # Cara lama membaca baris: dict(zip(header, baris)), SKU tabel SALES COMITMENT dari sel pertama
+    row_data = dict(zip(keys, row))
+    if first_cell_as_sku:
+        row_data["SKU"] = row[0] if row else ""
+    return row_data
+
+
+def reference_find(row_data, pattern):
+    for key, value in row_data.items():
+        if key is not None and pattern.search(key):
+            return value
+    return None
+
+
+def random_case(rng):
+    length = rng.randint(0, 7)
+    keys = [rng.choice(KEYS) for _ in range(length)]
+    row = [rng.choice(["", None, "1", "CTN", "0,50", f"v{idx}"]) for idx in range(length)]
+    return keys, row
+
+
+def test_duplicate_headers_use_last_column_and_first_position():
+    columns = ColumnIndex(["SKU", "DISC %", "SKU", "UOM"])
+    row = ["A", "5", "B", "CTN"]
+    assert columns.get(row, "SKU") == "B"
+    assert columns.ordered == ["SKU", "DISC %", "UOM"]
+    assert list(columns.values(row)) == list(dict(zip(["SKU", "DISC %", "SKU", "UOM"], row)).values())
+
+
+def test_missing_header_reads_as_empty_string():
+    columns = ColumnIndex(["SKU"])
+    assert columns.get(["A"], "UOM") == ""
+
+
+def test_column_index_matches_dict_zip_semantics():
+    rng = random.Random(3)
+    for _ in range(2000):
+        keys, row = random_case(rng)
+        first_cell_as_sku = rng.random() < 0.3
+        columns = ColumnIndex(keys, first_cell_as_sku=first_cell_as_sku)
+        reference = reference_row(keys, row, first_cell_as_sku)
+
+        assert columns.ordered == list(reference.keys())
+        assert list(columns.values(row)) == list(reference.values())
+        for key in KEYS:
+            assert columns.get(row, key) == reference.get(key, "")
+        # find memakai key pertama yang cocok (urutan kemunculan) dan nilai kolom terakhirnya
+        ordered_without_none = [key for key in columns.ordered if key is not None]
+        if ordered_without_none == columns.ordered:
+            assert columns.find(row, QTY_PATTERN) == reference_find(reference, QTY_PATTERN)
+
+
+def test_sales_commitment_rows_pad_subheaders_like_before():
+    headers = ["SKU", "SALES COMITMENT", None, "TOTAL DISCOUNT"]
+    subheaders = [None, "QTY IN CTN", "VALUE"]
+    table = [headers, subheaders, ["RICE @5KG", "250/0", "1.000,00", "10,00", "extra"], ["RICE @10KG", "50/0"]]
+    layout = TableLayout(SALES_COMMITMENT, headers=headers, subheaders=subheaders, data_start_idx=2)
+
+    # Cara lama: subheaders diperpanjang dengan "" mengikuti baris terpanjang yang sudah dibaca
+    padded = list(subheaders)
+    for (row, columns), raw in zip(layout.rows(table), table[2:]):
+        while len(padded) < len(raw):
+            padded.append("")
+        reference = reference_row(padded, raw, first_cell_as_sku=True)
+        assert row is raw
+        assert list(columns.values(row)) == list(reference.values())
+        assert columns.get(row, "QTY IN CTN") == reference.get("QTY IN CTN", "")
+        assert columns.get(row, "SKU") == raw[0]
+
+
+def test_columns_are_resolved_once_per_row_length():
+    layout = TableLayout(STRATA_DISCOUNT, headers=["SKU", "UOM", "MIN QTY / CTN"], data_start_idx=1)
+    rows = [row_columns for _, row_columns in layout.rows([["h"], ["A", "B", "1"], ["C", "D", "2"], ["E", "F"]])]
+    assert rows[0] is rows[1]
+    assert rows[2] is not rows[0]
+    assert rows[2].ordered == ["SKU", "UOM"]
+
+
+def test_classifier_detects_synthetic_tables():
+    from benchmarks import synthetic
+    discount, strata, commitment = synthetic.promo_tables()
+    outlets = [synthetic.OUTLET_HEADER] + list(synthetic.outlet_rows(1, 3))
+    assert table_classifier.classify_multi_document_table(strata).kind == STRATA_DISCOUNT
+    assert table_classifier.classify_multi_document_table(commitment).kind == SALES_COMMITMENT
+    assert table_classifier.classify_document_table(outlets).kind == table_classifier.OUTLET_LIST
+    assert table_classifier.classify_document_table(discount).kind == table_classifier.DISCOUNT_PROMOTION
@@ -0,0 +1,210 @@
+import random
+import re
+from datetime import datetime
+import pytest
+from utils.config import AREA_MAPPING, UOM_MAPPING
+from product_system import extraction, text_rules
+from product_system.processor import DocumentProcessor
+from product_system.multi_processor import MultiDocumentProcessor
+
+
+# Referensi: parse_text sebelum aturan dipindah ke text_rules (regex dijalankan per baris, berurutan)
+def reference_common(data, line):
+    nomor_match = re.search(r"CP\d{2}[A-Za-z]{3,5}\d{2,3}-\d+", line, re.IGNORECASE)
+    if nomor_match:
+        data["nomor"] = nomor_match.group(0).replace("CP20DJFAJ001", "CP20DJFAJ01")
+
+    date_match = re.search(r"(\d{2}/\d{2}/\d{4})\s*[-–]\s*(\d{2}/\d{2}/\d{4})", line, re.IGNORECASE)
+    if date_match:
+        try:
+            start_date = datetime.strptime(date_match.group(1), "%d/%m/%Y")
+            end_date = datetime.strptime(date_match.group(2), "%d/%m/%Y")
+            data["valid_from"] = start_date.strftime("%Y%m%d")
+            data["valid_to"] = end_date.strftime("%Y%m%d")
+        except Exception:
+            pass
+
+    brand_match = re.search(r"(?:BRAND|PRODUCT\s*BRAND)\s*[:=\s-]+\s*([A-Za-z\s]+)", line, re.IGNORECASE)
+    if brand_match:
+        brand = brand_match.group(1).strip().upper()
+        brand = re.split(r"\s*REF\s*CP\s*NO", brand, flags=re.IGNORECASE)[0].strip()
+        if brand and "REF CP NO" not in brand:
+            data["brand"] = brand
+
+    distributor_match = re.search(r"DISTRIBUTOR\s*[:=]?\s*([A-Z0-9-]+)\s*-\s*CV", line, re.IGNORECASE)
+    if distributor_match:
+        distributor_code = distributor_match.group(1)
+        area_code = distributor_code[-2:] if len(distributor_code) >= 2 else None
+        data["area_code"] = area_code
+        if area_code in AREA_MAPPING:
+            data["area_name"] = AREA_MAPPING[area_code]["area_name"]
+            data["ad_org_id"] = AREA_MAPPING[area_code]["ad_org_id"]
+
+    if re.search(r"SUB\s*PROMO\s*TYPE\s*[:=]?", line, re.IGNORECASE):
+        match = re.search(r"SUB\s*PROMO\s*TYPE\s*[:=]?\s*\d{2}[A-Za-z]+\s*-\s*([A-Za-z\s]+)", line, re.IGNORECASE)
+        if match:
+            data["sub_promo_type"] = match.group(1).strip().upper()
+
+    if re.search(r"INCLUDE\s*TRADING\s*TERM\s*☑", line, re.IGNORECASE):
+        data["vendor_cashback"] = "Y"
+    elif re.search(r"EXCLUDE\s*TRADING\s*TERM\s*☑", line, re.IGNORECASE):
+        data["vendor_cashback"] = "N"
+
+
+def reference_fallback_brand(data, lines):
+    if not data["brand"]:
+        for line in lines:
+            brand_match = re.search(r"\b(MILA|FORTUNE|SARI MURNI)\b", line, re.IGNORECASE)
+            if brand_match and "REF CP NO" not in line.upper():
+                data["brand"] = brand_match.group(1).strip().upper()
+                break
+
+
+def reference_document(text):
+    data = DocumentProcessor().data
+    lines = text.split('\n')
+    for line in lines:
+        line = line.strip()
+        reference_common(data, line)
+        if re.search(r"list toko include \(selectiontype=ISC\)", line, re.IGNORECASE):
+            data["selection_type"] = "ISC"
+        elif re.search(r"list customer exclude \(selectiontype=ESC\)", line, re.IGNORECASE):
+            data["selection_type"] = "ESC"
+        sku_match = re.search(r"(MILA FLOUR BAG @1KG|FORTUNE (?:PREMIUM RICE|PALM OIL )?(?:PLP|PCH|JRG) @\d+(\.\d+)?[KL]T)", line, re.IGNORECASE)
+        if sku_match:
+            data["sku"] = sku_match.group(0)
+    reference_fallback_brand(data, lines)
+    return data
+
+
+def reference_multi_document(text):
+    data = MultiDocumentProcessor().data
+    lines = text.split('\n')
+    for line in lines:
+        line = line.strip()
+        reference_common(data, line)
+        sku_match = re.search(
+            r"(MILA FLOUR BAG @1KG|MILA TEPUNG(?: \d+KG)?|TEPUNG MILA|FORTUNE (?:PREMIUM RICE|PALM OIL )?(?:PLP|PCH|JRG) @\d+(\.\d+)?[KL]T)",
+            line,
+            re.IGNORECASE
+        )
+        if sku_match:
+            sku = sku_match.group(0)
+            if not any(sku_entry["sku"] == sku for sku_entry in data["sku_data"]):
+                data["sku_data"].append({"sku": sku, "qty_allocated": 0, "uom": None, "c_uom_id": None, "strata_discounts": []})
+            data["sku"] = sku
+        if not data["uom"]:
+            uom_match = re.search(r"\b(\d*\.?\d+)?\s*(KG|LT|PC|PCS)\b", line, re.IGNORECASE)
+            if uom_match:
+                uom = uom_match.group(2).upper()
+                data["uom"] = uom
+                data["c_uom_id"] = UOM_MAPPING.get(uom, 1000000)
+    reference_fallback_brand(data, lines)
+    return data
+
+
+EDGE_LINES = [
+    "",
+    "   ",
+    "NOMOR: CP20DJFAJ001-2400951",
+    "nomor cp21abc12-77 revisi",
+    "PERIODE CP: 28/12/2024 - 31/12/2024",
+    "PERIODE: 01/01/2025 – 31/01/2025",
+    "PERIODE: 32/13/2025 - 01/01/2026",
+    "BRAND : FORTUNE REF CP NO : -",
+    "brand: mila",
+    "PRODUCT BRAND - SARI MURNI",
+    "BRAND : REF CP NO : -",
+    "DISTRIBUTOR : 20DJFAJ001 - CV. Fajar Lestari Lampung",
+    "DISTRIBUTOR : 20DJFAJ002 - CV. Sumber",
+    "DISTRIBUTOR: X - CV",
+    "SUB PROMO TYPE : 31D - DEAL KHUSUS",
+    "SUB PROMO TYPE : STRATA",
+    "sub promo type = 12AB - strata discount",
+    "INCLUDE TRADING TERM ☑ EXCLUDE TRADING TERM ☐",
+    "INCLUDE TRADING TERM ☐ EXCLUDE TRADING TERM ☑",
+    "INCLUDE TRADING TERM ☑ EXCLUDE TRADING TERM ☑",
+    "List Toko Include (selectiontype=ISC)",
+    "List Customer Exclude (selectiontype=ESC)",
+    "FORTUNE PALM OIL PCH @2LT",
+    "FORTUNE PCH @1.8LT CTN12/PCH",
+    "MILA FLOUR BAG @1KG",
+    "MILA TEPUNG 25KG",
+    "TEPUNG MILA",
+    "FORTUNE PREMIUM RICE @5KG",
+    "ISI 12 PCS",
+    "5 LT",
+    "Dicetak oleh MILA",
+    "REF CP NO MILA",
+    "SARI MURNI minyak goreng",
+]
+
+
+def synthetic_texts():
+    from benchmarks import synthetic
+    texts = []
+    for seq, outlets in ((1, 0), (2, 5), (12345, 40)):
+        texts.append("\n".join(synthetic.header_lines(seq, outlets)))
+    return texts
+
+
+def snapshot(data):
+    # models (SkuEntry, OutletList) ke bentuk dict/list yang bisa dibandingkan
+    return dict(
+        data,
+        outlets=list(data["outlets"]),
+        sku_data=[sku_entry if isinstance(sku_entry, dict) else sku_entry.to_dict() for sku_entry in data["sku_data"]]
+    )
+
+
+def compare(text):
+    document = DocumentProcessor()
+    document.parse_text(text)
+    assert snapshot(document.data) == snapshot(reference_document(text))
+
+    multi = MultiDocumentProcessor()
+    multi.parse_text(text)
+    assert snapshot(multi.data) == snapshot(reference_multi_document(text))
+
+
+@pytest.mark.parametrize("line", EDGE_LINES)
+def test_single_line_matches_reference(line):
+    compare(line)
+
+
+def test_synthetic_headers_match_reference():
+    for text in synthetic_texts():
+        compare(text)
+
+
+def test_sample_and_multi_page_documents_match_reference(synthetic_pdf, sample_pdf):
+    compare(extraction.extract_text(sample_pdf))
+    compare(extraction.extract_text(synthetic_pdf(outlets=120)))
+
+
+def test_random_line_combinations_match_reference():
+    # Urutan baris menentukan nilai akhir (last wins, until_set, fallback), jadi diacak
+    rng = random.Random(5)
+    corpus = EDGE_LINES + [line for text in synthetic_texts() for line in text.split("\n")]
+    for _ in range(400):
+        compare("\n".join(rng.choice(corpus) for _ in range(rng.randint(1, 14))))
+
+
+def test_feeding_pages_separately_matches_whole_text():
+    # Mode streaming memberi baris per halaman ke parser yang sama
+    rng = random.Random(7)
+    for _ in range(100):
+        lines = [rng.choice(EDGE_LINES) for _ in range(rng.randint(2, 14))]
+        split = rng.randint(1, len(lines) - 1)
+
+        whole = MultiDocumentProcessor()
+        text_rules.MULTI_DOCUMENT_RULES.parse(whole, lines)
+
+        paged = MultiDocumentProcessor()
+        parser = text_rules.MULTI_DOCUMENT_RULES.start(paged)
+        parser.feed(lines[:split])
+        parser.feed(lines[split:])
+        parser.finish()
+
+        assert snapshot(paged.data) == snapshot(whole.data)
+
@@ -1,12 +1,12 @@
 import os
 
-# Konfigurasi folder
-UPLOAD_FOLDER = 'backend/product_system/product_uploads'
-CSV_OUTPUT_FOLDER = 'backend/product_system/csv_outputs'
-JSON_OUTPUT_FOLDER = 'backend/product_system/json_outputs'
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Direktori backend/
 
-for folder in [UPLOAD_FOLDER, CSV_OUTPUT_FOLDER, JSON_OUTPUT_FOLDER]:
-    os.makedirs(folder, exist_ok=True)
+# Folder kerja (dipakai bersama oleh app.py dan worker job)
+UPLOAD_FOLDER = os.path.join(BASE_DIR, 'database', 'product_system', 'uploads')
+CSV_FOLDER = os.path.join(BASE_DIR, 'database', 'product_system', 'csv_outputs')
+JSON_FOLDER = os.path.join(BASE_DIR, 'database', 'product_system', 'json_outputs')
+OUTLET_FOLDER = os.path.join(BASE_DIR, 'database', 'product_system', 'outlet_lists')
 
 AREA_MAPPING = {
     "01": {"ad_org_id": 1000006, "area_name": "PST"},
@@ -37,3 +37,118 @@ PRODUCT_ID_MAPPING = {
 # Nilai default jika mapping tidak ditemukan
 DEFAULT_UOM_ID = 1000000
 DEFAULT_PRODUCT_ID = 0
+
+# Ekstraksi PDF: teks dan tabel diambil dari layout yang sama, cache halaman dilepas per halaman
+PDF_SINGLE_PASS = os.getenv("PDF_SINGLE_PASS", "1") == "1"
+
+# Ekstraksi paralel per rentang halaman (0 = nonaktif); dokumen di bawah batas halaman tetap serial
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+# Buang area tabel dengan minimal sekian baris dari teks untuk parse_text (0 = nonaktif).
+# Tabel yang berisi field header (nomor, periode, brand, distributor, sub promo type, dst.) seperti
+# kotak REF DOC/PERIODE CP selalu tetap ikut di teks, berapa pun batasnya.
+PDF_EXCLUDE_TABLE_ROWS = int(os.getenv("PDF_EXCLUDE_TABLE_ROWS", "0"))
+
+# Ekstrak teks dulu dan cek field wajib (nomor, periode, sub promo type, area) sebelum
+# ekstraksi tabel. Dokumen valid membaca layout dua kali, jadi hanya berguna jika banyak
+# upload yang tidak lengkap. Tidak berlaku jika PDF_EXCLUDE_TABLE_ROWS aktif.
+PDF_TEXT_FIRST = os.getenv("PDF_TEXT_FIRST", "0") == "1"
+
+# Proses PDF per halaman (generator) tanpa menampung seluruh teks/tabel di memori.
+# Tabel ditampung sementara di file spool; hasil tidak disimpan ke cache ekstraksi, hit cache tetap dipakai.
+PDF_STREAMING = os.getenv("PDF_STREAMING", "0") == "1"
+
+# Cache hasil ekstraksi berdasarkan SHA-256 PDF, dibagi antar worker gunicorn
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "1") == "1"
+EXTRACTION_CACHE_PATH = os.getenv(
+    "EXTRACTION_CACHE_PATH",
+    os.path.join(BASE_DIR, 'database', 'product_system', 'extraction_cache.db')
+)
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Jumlah proses untuk memproses dokumen upload-multiple secara paralel (1 = serial). Setiap worker
+# gunicorn (WEB_CONCURRENCY, 4 sesuai Procfile) bisa membuat pool sendiri, jadi default-nya CPU dibagi
+# jumlah worker web agar beberapa batch bersamaan tidak membuat proses jauh melebihi jumlah CPU.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "4"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY))))
+
+# Cara memulai proses pool (ekstraksi per halaman dan batch). Pool dibuat dari proses yang sudah
+# menjalankan thread (worker job, heartbeat), jadi default-nya bukan fork.
+POOL_START_METHOD = os.getenv("POOL_START_METHOD", "forkserver")
+
+# Mode batch upload-multiple:
+#   all        - proses semua dokumen, lalu gagalkan batch jika ada yang error (perilaku lama)
+#   fail_fast  - hentikan sisa dokumen begitu satu gagal atau brand/nomor CP tidak konsisten
+#   keep_going - simpan hasil dokumen yang berhasil, upload ulang hanya memproses yang gagal
+BATCH_MODE = os.getenv("BATCH_MODE", "all")
+BATCH_RESULTS_PATH = os.getenv(
+    "BATCH_RESULTS_PATH",
+    os.path.join(BASE_DIR, 'database', 'product_system', 'batch_results.db')
+)
+BATCH_RESULT_TTL = int(os.getenv("BATCH_RESULT_TTL", str(7 * 24 * 3600)))
+
+# Scan header (teks halaman awal saja) sebelum ekstraksi penuh, agar batch dengan brand
+# berbeda atau nomor CP ganda langsung ditolak
+BATCH_HEADER_SCAN = os.getenv("BATCH_HEADER_SCAN", "1") == "1"
+HEADER_SCAN_PAGES = int(os.getenv("HEADER_SCAN_PAGES", "1"))
+
+# Tulis tabel hasil ekstraksi ke csv_outputs (hanya untuk debug, default mati)
+SAVE_DEBUG_CSV = os.getenv("SAVE_DEBUG_CSV", "0") == "1"
+
+# Indentasi file JSON output (0 = ringkas tanpa spasi/baris baru, lebih cepat untuk list_customer besar)
+JSON_OUTPUT_INDENT = int(os.getenv("JSON_OUTPUT_INDENT", "4"))
+
+# Upload-multiple: daftar outlet ditulis sekali sebagai file bersama (nama = SHA-256 isinya)
+# dan JSON per nomor hanya menyimpan referensinya di "list_customer_ref"
+OUTLET_ARTIFACTS = os.getenv("OUTLET_ARTIFACTS", "0") == "1"
+
+# Index ringkasan file JSON output (nomor, periode, area, jumlah break/outlet) untuk halaman index
+OUTPUT_INDEX_PATH = os.getenv("OUTPUT_INDEX_PATH", os.path.join(BASE_DIR, 'database', 'product_system', 'outputs.db'))
+
+# Riwayat upload per browser disimpan di server (cookie hanya berisi id), dibatasi sekian nomor terakhir
+UPLOAD_HISTORY_PATH = os.getenv("UPLOAD_HISTORY_PATH", os.path.join(BASE_DIR, 'database', 'product_system', 'upload_history.db'))
+UPLOAD_HISTORY_LIMIT = int(os.getenv("UPLOAD_HISTORY_LIMIT", "200"))
+
+# Metrik per tahap untuk /metrics (format Prometheus). Tiap proses menampung di memori lalu
+# menjumlahkan ke SQLite bersama paling lambat setiap METRICS_FLUSH_INTERVAL detik.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_PATH = os.getenv("METRICS_PATH", os.path.join(BASE_DIR, 'database', 'product_system', 'metrics.db'))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+# Antrian job upload di SQLite; JOB_WORKERS = jumlah thread worker per proses (0 = proses langsung di request)
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(BASE_DIR, 'database', 'product_system', 'jobs.db'))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# Job "running" milik proses yang tidak mengirim heartbeat selama ini dianggap mati dan diantrikan ulang
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Job selesai/gagal dihapus dari antrian setelah sekian detik (status tidak bisa dicek lagi lewat /jobs)
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(7 * 24 * 3600)))
+
+# Level log aplikasi (DEBUG, INFO, WARNING, ...). Log per baris/tabel dan isi JSON hanya muncul di DEBUG.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Izinkan log DEBUG untuk satu request lewat ?debug=1 (atau field form debug=1) atau header X-Debug-Log: 1;
+# ikut berlaku untuk job upload yang dibuat oleh request tersebut. Siapa pun bisa mengirim toggle ini,
+# jadi default mati (nyalakan hanya di lingkungan pengembangan/internal).
+LOG_REQUEST_DEBUG = os.getenv("LOG_REQUEST_DEBUG", "0") == "1"
+
+# Profiling cProfile per dokumen/batch (.pstats + ringkasan top-N) ke PROFILE_FOLDER.
+# PROFILE_ENABLED=1: profil 1 dari setiap PROFILE_EVERY_N pemrosesan (sampling acak, aman dinyalakan di produksi).
+# Satu request bisa meminta profil lewat header X-Profile berisi PROFILE_ADMIN_TOKEN (kosong = header dimatikan).
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+PROFILE_EVERY_N = max(1, int(os.getenv("PROFILE_EVERY_N", "1")))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_FOLDER = os.getenv("PROFILE_FOLDER", os.path.join(BASE_DIR, 'database', 'product_system', 'profiles'))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "40"))
+# Profil terlama dihapus jika jumlahnya melebihi batas ini
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+# Trace span per request/job (format Chrome trace-event, buka di chrome://tracing atau Perfetto) ke TRACE_FOLDER.
+# TRACE_ENABLED=1: semua upload ditrace; selain itu hanya request dengan header X-Trace: 1 (jika TRACE_REQUEST_HEADER=1).
+# Header bisa dikirim siapa pun dan setiap trace menggeser trace lama, jadi default mati.
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "0") == "1"
+TRACE_REQUEST_HEADER = os.getenv("TRACE_REQUEST_HEADER", "0") == "1"
+TRACE_FOLDER = os.getenv("TRACE_FOLDER", os.path.join(BASE_DIR, 'database', 'product_system', 'traces'))
+# Trace terlama dihapus jika jumlahnya melebihi batas ini
+TRACE_MAX_FILES = int(os.getenv("TRACE_MAX_FILES", "200"))
@@ -0,0 +1,57 @@
+import contextvars
+import logging
+import sys
+from contextlib import contextmanager
+from utils.config import LOG_LEVEL
+
+# True selama request/job yang meminta log DEBUG (per thread/konteks, tidak mengubah level global)
+DEBUG_LOGGING = contextvars.ContextVar("debug_logging", default=False)
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s"
+
+
+class PipelineLogger(logging.Logger):
+    # Level DEBUG aktif jika level global mengizinkan atau request/job saat ini memintanya.
+    # Pesan memakai argumen %s, jadi saat tidak aktif tidak ada string yang diformat.
+    def isEnabledFor(self, level):
+        if level >= logging.DEBUG and DEBUG_LOGGING.get():
+            return True
+        return super().isEnabledFor(level)
+
+
+def get_logger(name):
+    # setLoggerClass bersifat global: dikembalikan lagi agar logger library lain tidak terpengaruh
+    logging.setLoggerClass(PipelineLogger)
+    try:
+        return logging.getLogger(name)
+    finally:
+        logging.setLoggerClass(logging.Logger)
+
+
+def configure_logging(level=LOG_LEVEL):
+    # Tetap ke stdout seperti print sebelumnya; handler tanpa level agar DEBUG per request lolos
+    root = logging.getLogger()
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def debug_enabled():
+    return DEBUG_LOGGING.get()
+
+
+@contextmanager
+def debug_logging(enabled):
+    token = DEBUG_LOGGING.set(bool(enabled))
+    try:
+        yield
+    finally:
+        DEBUG_LOGGING.reset(token)
+
+
+def call_with_debug(enabled, fn, *args):
+    # Untuk ProcessPoolExecutor: context var tidak ikut ke proses pool, jadi dikirim sebagai argumen
+    with debug_logging(enabled):
+        return fn(*args)